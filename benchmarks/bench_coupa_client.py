@@ -0,0 +1,100 @@
+# benchmarks/bench_coupa_client.py
+"""
+Measure CoupaClient latency against a local stand-in Coupa server:
+
+- list: paging through /expense_reports with a new connection per request
+  (module-level requests.get, as CoupaClient used to) versus the shared
+  keep-alive Session, and the async pipelined pager;
+- details: fetching /expense_reports/{id} one after another versus
+  concurrently with get_expense_report_details_async.
+
+Every new connection waits --connect-ms before it is served, standing in for
+DNS + TCP + TLS setup, and every response waits --latency-ms. Responses are
+gzip-compressed when the client accepts it. The shared Session and AsyncClient
+are warmed by one request first, as they are after a worker's first invocation.
+
+    python -m benchmarks.bench_coupa_client --reports 500 --connect-ms 30 --latency-ms 10
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import requests
+
+from benchmarks.fixtures import make_reports, make_server
+from core.coupa_client import COUPA_MAX_IN_FLIGHT, CoupaClient
+from core.http_client import HttpClient
+from core.rate_limit import HostRegistry, TokenBucket
+
+
+def list_without_session(client):
+    # The previous behaviour: module-level requests.get opens a new connection per page
+    request = (f"{client.base_url}/expense_reports", client.pagination.first_params())
+    count = 0
+    while request is not None:
+        url, params = request
+        response = requests.get(url, headers={**client.headers, 'Connection': 'close'}, params=params)
+        page = response.json()
+        count += len(page)
+        request = client.pagination.next_request(url, params, page)
+    return count
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+async def run_async(client, ids):
+    await client.get_expense_report_details_async(ids[:1])  # Warm the shared AsyncClient
+    _, list_ms = await timed_async(client.get_expense_reports_async())
+    _, details_ms = await timed_async(client.get_expense_report_details_async(ids))
+    return list_ms, details_ms
+
+
+async def timed_async(awaitable):
+    start = time.perf_counter()
+    result = await awaitable
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+
+def run(reports, connect_ms, latency_ms, details):
+    server = make_server(make_reports(reports), connect_ms, latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # A fresh, generous rate limiter so the shared default bucket does not pace the run
+    rate_limiters = HostRegistry(lambda: TokenBucket(rate=10000, max_rate=10000))
+    client = CoupaClient(api_key='bench', base_url=base_url,
+                         http_client=HttpClient(max_in_flight=COUPA_MAX_IN_FLIGHT, rate_limiters=rate_limiters))
+    ids = list(range(1, details + 1))
+    try:
+        _, unpooled_ms = timed(lambda: list_without_session(client))
+        client.session.get(f"{base_url}/expense_reports/1", headers=client.headers)  # Warm the shared Session
+        _, pooled_ms = timed(lambda: client.get_expense_reports())
+        _, serial_details_ms = timed(lambda: [client.session.get(f"{base_url}/expense_reports/{i}",
+                                                                 headers=client.headers).json() for i in ids])
+        async_ms, async_details_ms = asyncio.run(run_async(client, ids))
+    finally:
+        server.shutdown()
+    return {
+        'reports': reports,
+        'connect_ms': connect_ms,
+        'latency_ms': latency_ms,
+        'list_ms': {'new_connection_per_page': unpooled_ms, 'shared_session': pooled_ms, 'async': async_ms},
+        'details': details,
+        'details_ms': {'serial_session': serial_details_ms, 'async_concurrent': async_details_ms},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, default=500)
+    parser.add_argument('--details', type=int, default=100)
+    parser.add_argument('--connect-ms', type=int, default=30)
+    parser.add_argument('--latency-ms', type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.reports, args.connect_ms, args.latency_ms, args.details), indent=2))
@@ -0,0 +1,89 @@
+# benchmarks/bench_db_async.py
+"""
+Compare query throughput of the synchronous DBClient.execute_query path (one
+blocking call after another, as the sync function handler did) with
+DBClient.execute_query_async at several concurrency levels.
+
+A local SQLite file stands in for the database; every query calls a
+`sleep_ms` function so it has server-like latency.
+
+    python -m benchmarks.bench_db_async --concurrency 1 10 100 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+from core.db_client import DBClient
+
+
+def make_client(path, pool_size, latency_ms):
+    engine = create_engine(
+        f"sqlite:///{path}", poolclass=QueuePool, pool_size=pool_size, max_overflow=0,
+        connect_args={'check_same_thread': False}
+    )
+    client = DBClient.from_engine('bench', engine, {'pool_size': pool_size, 'max_overflow': 0})
+
+    @event.listens_for(client.engine, 'connect')
+    def register_sleep(dbapi_connection, _):
+        dbapi_connection.create_function('sleep_ms', 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+    with client.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("DELETE FROM users"))
+        connection.execute(text("INSERT INTO users (id, name) VALUES (:id, :name)"),
+                           [{'id': i, 'name': f'user{i}'} for i in range(100)])
+    client.query = text(f"SELECT id, name, sleep_ms({latency_ms}) AS waited FROM users WHERE id = :id")
+    return client
+
+
+def run_sync(client, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        client.execute_query(client.query, {'id': i % 100})
+    return time.perf_counter() - start
+
+
+async def run_async(client, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await client.execute_query_async(client.query, {'id': i % 100})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    return time.perf_counter() - start
+
+
+def run(concurrency_levels, requests, latency_ms):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in concurrency_levels:
+            client = make_client(os.path.join(directory, f'bench_{concurrency}.db'), concurrency, latency_ms)
+            sync_seconds = run_sync(client, requests)
+            async_seconds = asyncio.run(run_async(client, requests, concurrency))
+            client.engine.dispose()
+            client.executor.shutdown()
+            results.append({
+                'concurrency': concurrency,
+                'requests': requests,
+                'sync_requests_per_s': round(requests / sync_seconds, 1),
+                'async_requests_per_s': round(requests / async_seconds, 1),
+            })
+    return {'latency_ms': latency_ms, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.concurrency, args.requests, args.latency_ms), indent=2))
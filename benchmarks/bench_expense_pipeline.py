@@ -0,0 +1,101 @@
+# benchmarks/bench_expense_pipeline.py
+"""
+Measure the wf functions' ExpensePipeline on a temporary store of --rows reports:
+the first request (join and serialize), a repeat request served from the cached
+body (plain and gzip), a conditional request answered 304, and --concurrency
+simultaneous first requests, which share one build.
+
+    python -m benchmarks.bench_expense_pipeline --rows 100000 --concurrency 8
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.data_processor import DataProcessor
+from core.expense_pipeline import ExpensePipeline
+from core.expense_store import ExpenseReportStore
+from core.models import ExpenseReport
+
+
+class FakeCoupaClient:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def iter_expense_report_pages(self, updated_since=None):
+        pages, self.pages = self.pages, []
+        return iter(pages)
+
+
+def make_pipeline(directory, rows):
+    os.environ['REFERENCE_CACHE_DIR'] = directory
+    csv_path = os.path.join(directory, 'reference.csv')
+    pd.DataFrame({
+        'expense_id': np.random.default_rng(0).permutation(rows) + 1,
+        'csv_field1': [f'A{i}' for i in range(rows)],
+        'csv_field2': [f'B{i}' for i in range(rows)],
+    }).to_csv(csv_path, index=False)
+    reports = [ExpenseReport(id=i, amount=i / 100, description=f'Expense {i}', date='2024-04-15',
+                             updated_at='2024-04-15T10:00:00Z') for i in range(1, rows + 1)]
+    store = ExpenseReportStore(os.path.join(directory, 'store.sqlite'))
+    store.sync(FakeCoupaClient([reports]))
+    return ExpensePipeline(FakeCoupaClient([]), DataProcessor(csv_path), store)
+
+
+def timed_ms(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, round((time.perf_counter() - start) * 1000, 3)
+
+
+def concurrent_first_requests(pipeline, concurrency):
+    pipeline._bodies.clear()
+    builds = pipeline.build_count
+    barrier = threading.Barrier(concurrency)
+    latencies = []
+
+    def request():
+        barrier.wait()
+        latencies.append(timed_ms(pipeline.respond)[1])
+
+    threads = [threading.Thread(target=request) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'median_ms': statistics.median(latencies), 'builds': pipeline.build_count - builds}
+
+
+def run(rows, concurrency, repeat):
+    os.environ['COUPA_SYNC_INTERVAL'] = '3600'
+    with tempfile.TemporaryDirectory() as directory:
+        pipeline = make_pipeline(directory, rows)
+        pipeline.data_processor.read_csv()  # Reference table loaded, as after warm-up
+        first, first_ms = timed_ms(pipeline.respond)
+        etag = first.headers['ETag']
+        pipeline.respond(accept_encoding='gzip')
+        return {
+            'rows': rows,
+            'bytes': len(first.body),
+            'first_request_ms': first_ms,
+            'cached_ms': min(timed_ms(pipeline.respond)[1] for _ in range(repeat)),
+            'cached_gzip_ms': min(timed_ms(pipeline.respond, accept_encoding='gzip')[1] for _ in range(repeat)),
+            'not_modified_ms': min(timed_ms(pipeline.respond, if_none_match=etag)[1] for _ in range(repeat)),
+            'concurrent_first_requests': concurrent_first_requests(pipeline, concurrency),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.concurrency, args.repeat), indent=2))
@@ -0,0 +1,92 @@
+# benchmarks/bench_join.py
+"""
+Compare the previous DataProcessor.join_data response path (a dict per report,
+pd.merge, a JoinedData model per row, .dict() again and json.dumps) with the
+columnar DataProcessor.join_json path, from a list of ExpenseReport models and
+from a DataFrame as ExpenseReportStore.load_frame returns, and with --workers
+above 1 the partitioned process-pool join (timed after the pool has started).
+
+    python -m benchmarks.bench_join --rows 10000 100000 1000000 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import parallel_join
+from core.data_processor import DataProcessor
+from core.models import ExpenseReport, JoinedData
+
+
+def make_data(rows):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'amount': rng.integers(100, 100000, rows) / 100,
+        'description': [f'Expense {i}' for i in range(rows)],
+        'date': '2024-04-15',
+    })
+    csv_df = pd.DataFrame({
+        'expense_id': rng.permutation(rows) + 1,
+        'csv_field1': [f'A{i}' for i in range(rows)],
+        'csv_field2': [f'B{i}' for i in range(rows)],
+    })
+    reports = [ExpenseReport(**row) for row in frame.to_dict(orient='records')]
+    return reports, frame, csv_df
+
+
+def legacy_join(expense_reports, csv_df):
+    expense_df = pd.DataFrame([report.dict() for report in expense_reports])
+    joined_df = pd.merge(expense_df, csv_df, how='inner', left_on='id', right_on='expense_id')
+    joined_data = [JoinedData(**row) for row in joined_df.to_dict(orient='records')]
+    return json.dumps([data.dict() for data in joined_data])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def parallel_join_json(processor, frame, csv_df, workers):
+    lines = parallel_join.parallel_join_lines(processor.expense_frame(frame), csv_df, workers)
+    return (b'[' + b','.join(lines) + b']').decode('utf-8')
+
+
+def run(row_counts, legacy_max_rows, workers):
+    processor = DataProcessor(csv_path='')
+    parallel_join.PARALLEL_JOIN_THRESHOLD = float('inf')  # join_json stays in this process; parallel is timed apart
+    if workers > 1:
+        parallel_join.PARALLEL_JOIN_WORKERS = workers
+        # Start the pool outside the timings
+        _, frame, csv_df = make_data(1000)
+        parallel_join_json(processor, frame, csv_df, workers)
+    results = []
+    for rows in row_counts:
+        reports, frame, csv_df = make_data(rows)
+        result = {'rows': rows}
+        if rows <= legacy_max_rows:
+            _, result['legacy_s'] = timed(legacy_join, reports, csv_df)
+        _, result['columnar_from_models_s'] = timed(processor.join_json, reports, csv_df)
+        body, result['columnar_from_frame_s'] = timed(processor.join_json, frame, csv_df)
+        if workers > 1:
+            parallel_body, result['parallel_s'] = timed(parallel_join_json, processor, frame, csv_df, workers)
+            assert parallel_body == body
+        result['bytes'] = len(body.encode())
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max-rows', type=int, default=1000000,
+                        help='Skip the previous path above this size')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes for the parallel join; 1 skips it')
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.legacy_max_rows, args.workers), indent=2))
@@ -0,0 +1,87 @@
+# benchmarks/bench_result_formats.py
+"""
+Compare bytes on the wire and encode time of the dbqueryfunction response formats
+against the original records-of-dicts path (fetchall -> dict per row -> json.dumps).
+
+    python -m benchmarks.bench_result_formats --rows 100000 --columns 20
+"""
+import argparse
+import datetime
+import json
+import time
+
+from core.result_encoder import FORMATS, pa
+
+
+def make_rows(row_count, column_count):
+    base = datetime.date(2024, 1, 1)
+    columns = [f'column_{i}' for i in range(column_count)]
+    rows = []
+    for i in range(row_count):
+        row = []
+        for c in range(column_count):
+            kind = c % 4
+            if kind == 0:
+                row.append(i * column_count + c)
+            elif kind == 1:
+                row.append(f'value-{i}-{c}')
+            elif kind == 2:
+                row.append(i * 0.5 + c)
+            else:
+                row.append(str(base + datetime.timedelta(days=i % 365)))
+        rows.append(tuple(row))
+    return columns, rows
+
+
+def batched(rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+def encode_baseline(columns, rows):
+    results = [dict(zip(columns, row)) for row in rows]
+    return json.dumps({'status': 'success', 'data': results}).encode('utf-8')
+
+
+def measure(encode, repeat):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(encode())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'bytes': size, 'encode_ms': round(best * 1000, 2)}
+
+
+def run(row_count, column_count, batch_size, repeat):
+    columns, rows = make_rows(row_count, column_count)
+    results = {'baseline_records': measure(lambda: encode_baseline(columns, rows), repeat)}
+
+    for name, (encoder, _) in FORMATS.items():
+        if name == 'arrow' and not pa:
+            continue
+        results[name] = measure(lambda: b''.join(encoder(columns, batched(rows, batch_size))), repeat)
+
+    baseline = results['baseline_records']
+    for result in results.values():
+        result['bytes_ratio'] = round(result['bytes'] / baseline['bytes'], 3)
+        result['time_ratio'] = round(result['encode_ms'] / baseline['encode_ms'], 3)
+
+    return {
+        'rows': row_count,
+        'columns': column_count,
+        'batch_size': batch_size,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.columns, args.batch_size, args.repeat), indent=2))
@@ -0,0 +1,77 @@
+# benchmarks/bench_serialization.py
+"""
+Compare the previous response serialization (json.dumps(default=str)) with
+core.serialization.dumps on database-like rows carrying Decimal, datetime and
+date values, with the selected fast encoder and the standard library fallback,
+and the size and time of compressing the body as encode_response does.
+
+    python -m benchmarks.bench_serialization --rows 100000
+"""
+import argparse
+import datetime
+import decimal
+import json
+import time
+
+from core import serialization
+
+
+def make_rows(row_count):
+    base = datetime.datetime(2024, 1, 1, 8, 0)
+    return [{
+        'id': i,
+        'name': f'user{i}',
+        'email': f'user{i}@example.com',
+        'balance': decimal.Decimal(i) / 100,
+        'created_at': base + datetime.timedelta(minutes=i),
+        'birthday': (base + datetime.timedelta(days=i % 10000)).date(),
+        'score': i * 0.25,
+    } for i in range(row_count)]
+
+
+def baseline_dumps(obj):
+    return json.dumps(obj, default=str).encode('utf-8')
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, round(best * 1000, 2)
+
+
+def run(row_count, repeat):
+    response = {'status': 'success', 'data': make_rows(row_count)}
+    results = {}
+    encoders = {'baseline_json_default_str': baseline_dumps, 'stdlib_fallback': serialization._json_dumps,
+                serialization.ENCODER: serialization.dumps}
+    for name, encode in encoders.items():
+        body, encode_ms = measure(lambda: encode(response), repeat)
+        results[name] = {'bytes': len(body), 'encode_ms': encode_ms}
+
+    body = serialization.dumps(response)
+    for encoding in ('gzip', 'br'):
+        if encoding == 'br' and serialization.brotli is None:
+            continue
+        compressed, compress_ms = measure(lambda: serialization.compress(body, encoding), repeat)
+        results[f'{serialization.ENCODER}+{encoding}'] = {'bytes': len(compressed), 'compress_ms': compress_ms}
+
+    baseline = results['baseline_json_default_str']
+    for result in results.values():
+        result['bytes_ratio'] = round(result['bytes'] / baseline['bytes'], 3)
+        if 'encode_ms' in result:
+            result['time_ratio'] = round(result['encode_ms'] / baseline['encode_ms'], 3)
+
+    return {'rows': row_count, 'encoder': serialization.ENCODER, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
@@ -0,0 +1,67 @@
+# benchmarks/bench_startup.py
+"""
+Measure cold-start import time in fresh interpreters:
+
+- function_app: indexing the v2 app as the host does at worker start
+  (APP_WARM_UP disabled, so only the registration cost is timed);
+- one entry per function: the modules its first invocation imports, and the
+  heavy packages (pandas, SQLAlchemy, httpx, ...) that pulls in;
+- all: every function's modules, as a worker that has served each function.
+
+Each entry is the median of --repeat runs, in milliseconds.
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_PACKAGES = ['pandas', 'numpy', 'pyarrow', 'sqlalchemy', 'yaml', 'pydantic', 'httpx', 'requests']
+
+# Modules each function imports by the end of its first invocation
+FIRST_CALL_MODULES = {
+    'function_app': ['function_app'],
+    'dbqueryfunction': ['dbqueryfunction'],
+    'wfFunction1': ['wfFunction1', 'core.coupa_client', 'core.expense_store'],
+    'wfFunction2': ['wfFunction2', 'core.coupa_client', 'core.expense_store'],
+}
+
+PROBE = """
+import importlib, json, sys, time
+modules, heavy = json.loads(sys.argv[1]), json.loads(sys.argv[2])
+start = time.perf_counter()
+for module in modules:
+    importlib.import_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({'ms': elapsed * 1000, 'heavy': [name for name in heavy if name in sys.modules]}))
+"""
+
+
+def measure(modules, repeat):
+    env = dict(os.environ, APP_WARM_UP='')
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE, json.dumps(modules), json.dumps(HEAVY_PACKAGES)],
+                                cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {'import_ms': round(statistics.median(run['ms'] for run in runs), 1), 'heavy_packages': runs[-1]['heavy']}
+
+
+def run(repeat):
+    results = {name: measure(modules, repeat) for name, modules in FIRST_CALL_MODULES.items()}
+    every_module = list(dict.fromkeys(module for modules in FIRST_CALL_MODULES.values() for module in modules))
+    results['all'] = measure(every_module, repeat)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.repeat), indent=2))
@@ -0,0 +1,113 @@
+# core/app_context.py
+import logging
+import os
+import threading
+import time
+
+_shared = {}
+_lock = threading.RLock()  # Factories get the clients they depend on
+
+
+def _get(name, factory):
+    with _lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+
+def csv_path():
+    return os.path.join(os.getcwd(), 'data', 'local_data.csv')
+
+
+def coupa_client():
+    """
+    CoupaClient shared by every function in the worker, configured from COUPA_API_KEY and COUPA_BASE_URL.
+    """
+    def create():
+        from .coupa_client import CoupaClient
+        return CoupaClient(api_key=os.getenv('COUPA_API_KEY'), base_url=os.getenv('COUPA_BASE_URL'))
+    return _get('coupa_client', create)
+
+
+def data_processor():
+    """
+    DataProcessor for the reference CSV in data/local_data.csv.
+    """
+    def create():
+        from .data_processor import DataProcessor
+        return DataProcessor(csv_path=csv_path())
+    return _get('data_processor', create)
+
+
+def expense_store():
+    from .expense_store import ExpenseReportStore
+    return ExpenseReportStore.default()
+
+
+def expense_pipeline():
+    """
+    ExpensePipeline shared by wfFunction1 and wfFunction2, so they also share its cached responses.
+    """
+    def create():
+        from .expense_pipeline import ExpensePipeline
+        return ExpensePipeline(coupa_client(), data_processor(), expense_store())
+    return _get('expense_pipeline', create)
+
+
+def warm_database_clients():
+    """
+    Import SQLAlchemy, load the query config and open the pooled connections of
+    databases that set warm_connections.
+    """
+    from .db_client import DBClient
+    from .query_manager import QueryManager
+    from .result_cache import ResultCache
+    QueryManager()
+    ResultCache.default()
+    DBClient.warm_all()
+
+
+def warm_expense_clients():
+    """
+    Import pandas, create the expense pipeline and its clients and load the reference table.
+    """
+    expense_pipeline()
+    data_processor().read_csv()
+
+
+WARM_UPS = {
+    'database': warm_database_clients,
+    'expenses': warm_expense_clients,
+}
+
+
+def warm_up(names=None):
+    """
+    Initialize the shared clients of each named group, logging failures instead of raising.
+    :param names: Keys of WARM_UPS (default all)
+    """
+    for name in names or WARM_UPS:
+        start = time.perf_counter()
+        try:
+            WARM_UPS[name]()
+            logging.info(f"Warmed up '{name}' in {time.perf_counter() - start:.3f}s.")
+        except Exception as e:
+            logging.warning(f"Could not warm up '{name}': {e}")
+
+
+def start_warm_up():
+    """
+    Run warm_up in a background thread, so the host indexes the functions without
+    waiting for the heavy imports while they are still done before most first requests.
+    The groups come from APP_WARM_UP (comma separated, default all; empty disables it).
+    :return: The started thread, or None when disabled
+    """
+    names = [name.strip() for name in os.environ.get('APP_WARM_UP', ','.join(WARM_UPS)).split(',') if name.strip()]
+    unknown = [name for name in names if name not in WARM_UPS]
+    if unknown:
+        raise ValueError(f"Unknown APP_WARM_UP groups: {', '.join(unknown)}. Expected: {', '.join(WARM_UPS)}.")
+    if not names:
+        return None
+    thread = threading.Thread(target=warm_up, args=(names,), name='app-warm-up', daemon=True)
+    thread.start()
+    return thread
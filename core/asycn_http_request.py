@@ -1,44 +1,24 @@
 import httpx
 import asyncio
-from httpx import HTTPStatusError, RequestError
+import logging
+from .http_client import HttpClient
+from .pagination import PageNumberPagination, Paginator
+from .rate_limit import RetryBudget
 
-async def fetch_page(client, url, page, retries=3):
+async def fetch_page(client, url, page, retries=3, retry_budget=None):
     """
     Fetch a single page of data with retries and exception handling.
+    Uses the HttpClient retry policy: per-host rate limiting, circuit breaking and
+    jittered backoff on 429/5xx/network errors.
     :param client: httpx.AsyncClient object
     :param url: API endpoint URL
     :param page: The page number to fetch
-    :param retries: Number of retries on failure (default 3)
+    :param retries: Number of attempts on failure (default 3)
+    :param retry_budget: RetryBudget shared by all pages of a fetch (optional)
     :return: JSON response of the API call for the specific page
     """
-    params = {'page': page}
-    
-    for attempt in range(1, retries + 1):
-        try:
-            response = await client.get(url, params=params, timeout=10)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            return response.json()
-
-        except HTTPStatusError as http_err:
-            print(f"HTTP error on page {page}: {http_err}")
-            if response.status_code == 404:
-                print(f"Page {page} not found. Skipping.")
-                return None  # Optionally skip the page if not found
-            elif attempt == retries:
-                raise  # Rethrow if all retries fail
-
-        except RequestError as req_err:
-            print(f"Network error on page {page}: {req_err}")
-            if attempt == retries:
-                raise  # Rethrow if all retries fail
-
-        except Exception as e:
-            print(f"Unexpected error on page {page}: {e}")
-            if attempt == retries:
-                raise  # Rethrow if all retries fail
-
-        # Exponential backoff for retries
-        await asyncio.sleep(2 ** attempt)
+    request_config = {'method': 'GET', 'url': url, 'params': {'page': page}, 'id': f"page {page}"}
+    return await HttpClient(retries=retries).fetch(client, request_config, retry_budget)
 
 async def fetch_all_pages(url, total_pages, retries=3):
     """
@@ -48,9 +28,10 @@ async def fetch_all_pages(url, total_pages, retries=3):
     :param retries: Number of retries on failure (default 3)
     :return: Combined list of all pages' data
     """
+    retry_budget = RetryBudget()
     async with httpx.AsyncClient() as client:
         tasks = [
-            fetch_page(client, url, page, retries) for page in range(1, total_pages + 1)
+            fetch_page(client, url, page, retries, retry_budget) for page in range(1, total_pages + 1)
         ]
         
         # Use asyncio.gather to fetch all pages concurrently
@@ -62,25 +43,28 @@ async def fetch_all_pages(url, total_pages, retries=3):
             if isinstance(page_data, dict) and 'results' in page_data:
                 combined_data.extend(page_data['results'])  # Assuming 'results' key holds data
             elif isinstance(page_data, Exception):
-                print(f"Error occurred: {page_data}")
+                logging.error(f"Error occurred: {page_data}")
 
         return combined_data
 
-async def get_paginated_data(url, total_pages, retries=3):
+async def get_paginated_data(url, total_pages=None, retries=3, strategy=None):
     """
     Fetch the paginated data by fetching all pages concurrently with retries.
     :param url: API endpoint URL
-    :param total_pages: Total number of pages
+    :param total_pages: Total number of pages; when omitted the page count is discovered
     :param retries: Number of retries on failure (default 3)
+    :param strategy: core.pagination strategy used for discovery (default PageNumberPagination)
     :return: Combined data from all pages
     """
-    return await fetch_all_pages(url, total_pages, retries)
+    if total_pages is not None and strategy is None:
+        return await fetch_all_pages(url, total_pages, retries)
+    paginator = Paginator(strategy or PageNumberPagination(), HttpClient(retries=retries))
+    return await paginator.fetch_all(url, max_pages=total_pages)
 
 # To run the async function in a script
 if __name__ == "__main__":
     url = "https://api.example.com/data"  # Replace with your actual API URL
-    total_pages = 5  # Replace with the actual number of pages
 
-    # Run the event loop to fetch paginated data with retries
-    combined_data = asyncio.run(get_paginated_data(url, total_pages))
+    # Run the event loop to fetch paginated data with retries, discovering the page count
+    combined_data = asyncio.run(get_paginated_data(url))
     print(combined_data)
@@ -0,0 +1,139 @@
+# core/batch_executor.py
+import json
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from .db_client import DBClient
+
+
+def _error(message):
+    return {'status': 'error', 'message': message}
+
+
+def _success(data, truncated=False):
+    result = {'status': 'success', 'data': data}
+    if truncated or getattr(data, 'truncated', False):
+        result['truncated'] = True
+    return result
+
+
+class BatchExecutor:
+    def __init__(self, query_manager, db_client_factory=DBClient, max_workers=8):
+        """
+        Execute a list of {dbid, query_key, params} items with as few round trips as possible.
+        :param query_manager: QueryManager holding the compiled queries
+        :param db_client_factory: Callable returning the DBClient for a dbid
+        :param max_workers: Maximum number of databases queried concurrently (default 8)
+        """
+        self.query_manager = query_manager
+        self.db_client_factory = db_client_factory
+        self.max_workers = max_workers
+
+    def execute(self, items):
+        """
+        Items are grouped by dbid; each group runs on one pooled connection and groups
+        run concurrently. Items for a query with a 'coalesce' setting that share all
+        other params are answered by a single IN-list statement. Each query's timeout_ms
+        and max_rows apply per item; results cut short by max_rows are marked 'truncated'.
+        :param items: List of dictionaries with 'dbid', 'query_key' and optional 'params'
+        :return: List of {'status', 'data'|'message'} dictionaries in item order
+        """
+        results = [None] * len(items)
+        groups = defaultdict(list)
+
+        for index, item in enumerate(items):
+            try:
+                dbid = item['dbid']
+                query = self.query_manager.get_compiled_query(dbid, item['query_key'])
+                params = item.get('params') or {}
+                query.validate_params(params)
+            except (KeyError, TypeError):
+                results[index] = _error("Each batch item requires 'dbid' and 'query_key'.")
+                continue
+            except ValueError as e:
+                results[index] = _error(str(e))
+                continue
+            groups[dbid].append((index, query, params))
+
+        if groups:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+                futures = {
+                    dbid: executor.submit(self._execute_group, dbid, group_items)
+                    for dbid, group_items in groups.items()
+                }
+            for dbid, future in futures.items():
+                try:
+                    for index, result in future.result():
+                        results[index] = result
+                except Exception as e:
+                    logging.error(f"Batch execution failed for database '{dbid}': {e}")
+                    for index, _, _ in groups[dbid]:
+                        results[index] = _error(str(e))
+
+        return results
+
+    def _execute_group(self, dbid, group_items):
+        statements, targets = self._plan(group_items)
+        db_client = self.db_client_factory(dbid)
+        outcomes = db_client.execute_queries(statements)
+
+        results = []
+        for (kind, payload), outcome in zip(targets, outcomes):
+            if isinstance(outcome, Exception):
+                indexes = [payload] if kind == 'single' else [index for index, _ in payload[1]]
+                results.extend((index, _error(str(outcome))) for index in indexes)
+            elif kind == 'single':
+                results.append((payload, _success(outcome)))
+            else:
+                column, members, max_rows = payload
+                rows_by_value = defaultdict(list)
+                for row in outcome:
+                    rows_by_value[str(row[column])].append(row)
+                for index, value in members:
+                    rows = rows_by_value.get(str(value), [])
+                    truncated = max_rows is not None and len(rows) > max_rows
+                    results.append((index, _success(rows[:max_rows], truncated)))
+        return results
+
+    @staticmethod
+    def _plan(group_items):
+        """
+        Turn the items of one database into statements to execute, coalescing
+        lookups of the same query that differ only in the coalesce parameter.
+        :return: Tuple of (list of (statement, params, limits), list of result targets)
+        """
+        statements = []
+        targets = []
+        coalescable = defaultdict(list)
+
+        for index, query, params in group_items:
+            coalesce = query.config.get('coalesce')
+            if coalesce and query.coalesced_statement is not None:
+                param = coalesce['param']
+                other_params = {name: value for name, value in params.items() if name != param}
+                signature = (query.key, json.dumps(other_params, sort_keys=True, default=str))
+                coalescable[signature].append((index, query, params))
+            else:
+                statements.append((query.bounded_statement, params, query.limits))
+                targets.append(('single', index))
+
+        for members in coalescable.values():
+            if len(members) == 1:
+                index, query, params = members[0]
+                statements.append((query.bounded_statement, params, query.limits))
+                targets.append(('single', index))
+                continue
+            query = members[0][1]
+            param = query.config['coalesce']['param']
+            values = [params[param] for _, _, params in members]
+            coalesced_params = dict(members[0][2])
+            coalesced_params[param] = list(dict.fromkeys(values))
+            # max_rows limits each member's rows, so it is applied after splitting the result
+            statements.append((query.coalesced_statement, coalesced_params, query.limits._replace(max_rows=None)))
+            targets.append(('coalesced', (
+                query.config['coalesce']['column'],
+                [(index, params[param]) for index, _, params in members],
+                query.limits.max_rows
+            )))
+
+        return statements, targets
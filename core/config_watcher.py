@@ -0,0 +1,60 @@
+# core/config_watcher.py
+import hashlib
+import os
+import threading
+import time
+
+DEFAULT_RELOAD_INTERVAL = float(os.environ.get('CONFIG_RELOAD_INTERVAL', '5'))
+
+
+class ConfigWatcher:
+    def __init__(self, path, check_interval=DEFAULT_RELOAD_INTERVAL):
+        """
+        Track changes to a config file using its mtime/size and a content hash.
+        :param path: Path of the watched file
+        :param check_interval: Minimum seconds between stat() calls in poll() (default CONFIG_RELOAD_INTERVAL or 5)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.version = None
+        self._stat_key = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Read the file unconditionally and record it as the current version.
+        :return: File content as bytes
+        """
+        with self._lock:
+            return self._read()
+
+    def poll(self, force=False):
+        """
+        Check whether the file changed since the last load or poll.
+        :param force: Ignore check_interval and stat the file now
+        :return: New file content as bytes if it changed, otherwise None
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None  # Another thread is already checking
+        try:
+            self._last_check = now
+            stat = os.stat(self.path)
+            if (stat.st_mtime_ns, stat.st_size) == self._stat_key:
+                return None
+            previous_version = self.version
+            content = self._read()
+            return content if self.version != previous_version else None
+        finally:
+            self._lock.release()
+
+    def _read(self):
+        stat = os.stat(self.path)
+        with open(self.path, 'rb') as file:
+            content = file.read()
+        self._stat_key = (stat.st_mtime_ns, stat.st_size)
+        self.version = hashlib.sha256(content).hexdigest()[:12]
+        return content
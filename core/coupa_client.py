@@ -1,18 +1,173 @@
+import asyncio
+import os
+import threading
+import weakref
 import requests
-from typing import List
+from requests.adapters import HTTPAdapter
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from .instrumentation import span
 from .models import ExpenseReport
+from .pagination import CursorPagination, Paginator
+
+if TYPE_CHECKING:  # httpx is imported only once an async method is used
+    from .http_client import HttpClient
+
+COUPA_PAGE_SIZE = 50  # Coupa returns at most 50 records per request
+COUPA_POOL_SIZE = int(os.environ.get('COUPA_POOL_SIZE', '10'))
+COUPA_MAX_IN_FLIGHT = int(os.environ.get('COUPA_MAX_IN_FLIGHT', '10'))
+# (connect, read) seconds; a stalled Coupa call must fail rather than hold the store's sync lock
+COUPA_TIMEOUT = (float(os.environ.get('COUPA_CONNECT_TIMEOUT', '5')), float(os.environ.get('COUPA_READ_TIMEOUT', '30')))
+
+
+class UpdatedAtPagination(CursorPagination):
+    def __init__(self, page_size=COUPA_PAGE_SIZE):
+        """
+        Seek pagination over a list sorted by updated_at.
+        Each request filters with updated_at[gt_or_eq] on the last timestamp received
+        and offsets past only the reports already seen with that same timestamp, so
+        reports updated while paging cannot shift an unseen report past the offset.
+        :param page_size: Records per request (default 50)
+        """
+        super().__init__(items_key=None)
+        self.page_size = page_size
+
+    def first_params(self, updated_since=None):
+        params = {'order_by': 'updated_at', 'dir': 'asc', 'limit': self.page_size, 'offset': 0}
+        if updated_since:
+            params['updated_at[gt_or_eq]'] = updated_since
+        return params
+
+    def next_request(self, url, params, page):
+        if len(page) < self.page_size:
+            return None
+        watermark = params.get('updated_at[gt_or_eq]')
+        latest = page[-1].get('updated_at')
+        params = dict(params)
+        # Nothing to seek on without updated_at; ExpenseReportStore.sync warns that the sync is not incremental
+        if latest is None or latest == watermark:
+            params['offset'] += len(page)
+        else:
+            params['updated_at[gt_or_eq]'] = latest
+            params['offset'] = sum(1 for item in page if item.get('updated_at') == latest)
+        return url, params
+
 
 class CoupaClient:
-    def __init__(self, api_key: str, base_url: str):
+    _sessions = {}
+    _async_clients = weakref.WeakKeyDictionary()  # event loop -> {base_url: httpx.AsyncClient}
+    _lock = threading.Lock()
+
+    def __init__(self, api_key: str, base_url: str, page_size: int = COUPA_PAGE_SIZE,
+                 http_client: Optional['HttpClient'] = None, timeout=COUPA_TIMEOUT):
+        """
+        :param api_key: Coupa API key
+        :param base_url: Coupa API base URL
+        :param page_size: Records per list request (default 50)
+        :param http_client: HttpClient used by the async methods (default: COUPA_MAX_IN_FLIGHT requests in flight)
+        :param timeout: (connect, read) timeout in seconds of the sync requests (default COUPA_CONNECT_TIMEOUT 5, COUPA_READ_TIMEOUT 30)
+        """
         self.api_key = api_key
         self.base_url = base_url
+        self.page_size = page_size
+        self.timeout = timeout
+        self.pagination = UpdatedAtPagination(page_size)
+        self._http_client = http_client
+        self.session = self.get_session(base_url)
 
-    def get_expense_reports(self) -> List[ExpenseReport]:
-        headers = {
+    @property
+    def http_client(self) -> 'HttpClient':
+        if self._http_client is None:
+            from .http_client import HttpClient
+            self._http_client = HttpClient(max_in_flight=COUPA_MAX_IN_FLIGHT,
+                                           max_connections=COUPA_POOL_SIZE,
+                                           max_keepalive_connections=COUPA_POOL_SIZE)
+        return self._http_client
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
             'Authorization': f'Bearer {self.api_key}',
-            'Accept': 'application/json'
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
         }
-        response = requests.get(f"{self.base_url}/expense_reports", headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return [ExpenseReport(**item) for item in data]
+
+    @classmethod
+    def get_session(cls, base_url):
+        """
+        Keep-alive requests.Session shared by every CoupaClient for base_url in the worker,
+        so only the first call pays DNS, TCP and TLS setup.
+        """
+        with cls._lock:
+            if base_url not in cls._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=COUPA_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                cls._sessions[base_url] = session
+            return cls._sessions[base_url]
+
+    def get_async_client(self):
+        """
+        httpx.AsyncClient shared by every CoupaClient for base_url on the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if self.base_url not in clients or clients[self.base_url].is_closed:
+                clients[self.base_url] = self.http_client.create_async_client()
+            return clients[self.base_url]
+
+    def get_expense_reports(self, updated_since: Optional[str] = None) -> List[ExpenseReport]:
+        """
+        :param updated_since: Only return reports with updated_at at or after this timestamp (optional)
+        """
+        return [report for page in self.iter_expense_report_pages(updated_since) for report in page]
+
+    def iter_expense_report_pages(self, updated_since: Optional[str] = None) -> Iterator[List[ExpenseReport]]:
+        """
+        Page through /expense_reports in updated_at order (see UpdatedAtPagination).
+        :param updated_since: Only return reports with updated_at at or after this timestamp (optional)
+        :return: Iterator of pages of reports
+        """
+        request = (f"{self.base_url}/expense_reports", self.pagination.first_params(updated_since))
+        while request is not None:
+            url, params = request
+            with span('http.request', host='coupa', method='GET', attempt=1) as request_span:
+                response = self.session.get(url, headers=self.headers, params=params, timeout=self.timeout)
+                request_span.set(status_code=response.status_code)
+            response.raise_for_status()
+            page = response.json()
+            if page:
+                with span('coupa.parse', rows=len(page)):
+                    reports = [ExpenseReport(**item) for item in page]
+                yield reports
+            request = self.pagination.next_request(url, params, page)
+
+    async def iter_expense_report_pages_async(self, updated_since: Optional[str] = None) -> AsyncIterator[List[ExpenseReport]]:
+        """
+        Async variant of iter_expense_report_pages on the HttpClient retry policy.
+        Each page's request is sent as soon as the previous page arrives, while the
+        caller is still handling that page.
+        """
+        paginator = Paginator(self.pagination, self.http_client)
+        async for page in paginator.iter_pages(f"{self.base_url}/expense_reports",
+                                               params=self.pagination.first_params(updated_since),
+                                               headers=self.headers, client=self.get_async_client()):
+            if page:
+                yield [ExpenseReport(**item) for item in page]
+
+    async def get_expense_reports_async(self, updated_since: Optional[str] = None) -> List[ExpenseReport]:
+        return [report async for page in self.iter_expense_report_pages_async(updated_since) for report in page]
+
+    async def get_expense_report_details_async(self, report_ids: Iterable[int]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch /expense_reports/{id} for many reports concurrently, within the HttpClient's max_in_flight.
+        :return: Report payloads in the order of report_ids; None for reports not found or failed
+        """
+        requests_list = (
+            {'method': 'GET', 'url': f"{self.base_url}/expense_reports/{report_id}",
+             'headers': self.headers, 'id': report_id}
+            for report_id in report_ids
+        )
+        return [result async for _, result in
+                self.http_client.iter_fetch(requests_list, ordered=True, client=self.get_async_client())]
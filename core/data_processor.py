@@ -1,15 +1,154 @@
 import pandas as pd
-from typing import List
+from typing import Iterable, Iterator, List, Sequence, Union
+from . import parallel_join
+from .instrumentation import span
 from .models import ExpenseReport, JoinedData
 
+# Column dtypes of each side of the join, checked once per frame instead of once per row
+EXPENSE_DTYPES = {'id': 'int64', 'amount': 'float64', 'description': 'object', 'date': 'object'}
+CSV_DTYPES = {'expense_id': 'int64', 'csv_field1': 'object', 'csv_field2': 'object'}
+JOINED_COLUMNS = ['expense_id', 'amount', 'description', 'date', 'csv_field1', 'csv_field2']
+
+ExpenseBatch = Union[pd.DataFrame, Sequence[ExpenseReport]]
+
+def validate_frame(df: pd.DataFrame, dtypes: dict, name: str) -> pd.DataFrame:
+    """
+    Check that df has every column in dtypes with no missing values, and cast them.
+    :param name: Name of the frame for error messages
+    :return: Frame with only the schema columns, in the given dtypes
+    :raises ValueError: On a missing column, missing value or a value that does not fit the dtype
+    """
+    missing = [column for column in dtypes if column not in df.columns]
+    if missing:
+        raise ValueError(f"{name} is missing columns: {', '.join(missing)}")
+    df = df[list(dtypes)]
+    nulls = [column for column in dtypes if df[column].isna().any()]
+    if nulls:
+        raise ValueError(f"{name} has missing values in columns: {', '.join(nulls)}")
+    try:
+        return df.astype(dtypes)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{name} does not match its schema: {e}") from e
+
+def join_frames(expense_df: pd.DataFrame, csv_indexed: pd.DataFrame, columns: List[str] = JOINED_COLUMNS) -> pd.DataFrame:
+    """
+    Join a validated expense frame with a CSV frame indexed on expense_id.
+    :param columns: Output columns; expense columns other than the JoinedData ones may be carried through
+    """
+    if csv_indexed.index.is_unique:
+        # Probe the index's existing hash table; DataFrame.join would rebuild one per call
+        positions = csv_indexed.index.get_indexer(expense_df['id'])
+        matched = positions >= 0
+        joined_df = pd.concat([
+            expense_df[matched].reset_index(drop=True),
+            csv_indexed.iloc[positions[matched]].reset_index(drop=True)
+        ], axis=1)
+    else:
+        # A left join keeps the report order for repeated expense_ids, which an inner join does not
+        expense_df = expense_df[expense_df['id'].isin(csv_indexed.index)]
+        joined_df = expense_df.join(csv_indexed, on='id', how='left')
+    return joined_df.rename(columns={'id': 'expense_id'})[columns].reset_index(drop=True)
+
 class DataProcessor:
     def __init__(self, csv_path: str):
         self.csv_path = csv_path
 
     def read_csv(self) -> pd.DataFrame:
-        return pd.read_csv(self.csv_path)
+        """
+        :return: The reference CSV indexed on expense_id, parsed once per worker (see ReferenceTable)
+        """
+        from .reference_table import ReferenceTable
+        return ReferenceTable(self.csv_path).frame()
+
+    @staticmethod
+    def expense_frame(expense_reports: ExpenseBatch) -> pd.DataFrame:
+        """
+        Build the expense side of the join column by column, without a dict per report.
+        :param expense_reports: DataFrame, or list of ExpenseReport
+        """
+        if isinstance(expense_reports, pd.DataFrame):
+            df = expense_reports
+        else:
+            df = pd.DataFrame({
+                column: [getattr(report, column) for report in expense_reports] for column in EXPENSE_DTYPES
+            })
+        return validate_frame(df, EXPENSE_DTYPES, 'Expense reports')
+
+    @staticmethod
+    def csv_index(csv_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate the CSV side and index it on expense_id; an already indexed frame is returned as is.
+        """
+        if csv_df.index.name == 'expense_id':
+            return csv_df
+        return validate_frame(csv_df, CSV_DTYPES, 'CSV data').set_index('expense_id')
+
+    def join_frame(self, expense_reports: ExpenseBatch, csv_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Inner join of expense reports and CSV rows on typed columns, probing the
+        expense_id index of the CSV side. Rows keep the order of expense_reports.
+        :return: DataFrame with the JoinedData columns
+        """
+        with span('join') as join_span:
+            joined_df = join_frames(self.expense_frame(expense_reports), self.csv_index(csv_df))
+            join_span.set(rows=len(joined_df))
+        return joined_df
+
+    def join_json(self, expense_reports: ExpenseBatch, csv_df: pd.DataFrame) -> str:
+        """
+        Join and serialize straight from the columns to a JSON array of JoinedData objects.
+        From PARALLEL_JOIN_THRESHOLD reports up, partitions are joined and encoded in a process pool.
+        """
+        expense_df = self.expense_frame(expense_reports)
+        if parallel_join.should_parallelize(len(expense_df)):
+            csv_df = self.csv_index(csv_df).reset_index()
+            with span('join.parallel', rows=len(expense_df)):
+                return (b'[' + b','.join(parallel_join.parallel_join_lines(expense_df, csv_df)) + b']').decode('utf-8')
+        with span('join') as join_span:
+            joined_df = join_frames(expense_df, self.csv_index(csv_df))
+            join_span.set(rows=len(joined_df))
+        with span('json.encode', rows=len(joined_df)):
+            return joined_df.to_json(orient='records', double_precision=15, force_ascii=False)
 
     def join_data(self, expense_reports: List[ExpenseReport], csv_df: pd.DataFrame) -> List[JoinedData]:
-        expense_df = pd.DataFrame([report.dict() for report in expense_reports])
-        joined_df = pd.merge(expense_df, csv_df, how='inner', left_on='id', right_on='expense_id')
-        return [JoinedData(**row) for row in joined_df.to_dict(orient='records')]
+        return [JoinedData(**row) for row in self.join_frame(expense_reports, csv_df).to_dict(orient='records')]
+
+    @staticmethod
+    def ndjson(joined_df: pd.DataFrame) -> bytes:
+        with span('json.encode', rows=len(joined_df)):
+            lines = joined_df.to_json(orient='records', lines=True, double_precision=15, force_ascii=False)
+        return (lines if lines.endswith('\n') else lines + '\n').encode('utf-8')
+
+    def iter_join_batches(self, expense_batches: Iterable[ExpenseBatch], csv_df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """
+        Streaming join: each batch of expense reports probes the CSV index as it
+        arrives and its joined rows are yielded before the next batch is read, so
+        memory is bounded by the batch size rather than the export size.
+        :param expense_batches: Iterable of DataFrames or lists of ExpenseReport, e.g.
+            ExpenseReportStore.iter_frames() or CoupaClient.iter_expense_report_pages()
+        :return: Iterator of non-empty joined DataFrames with the JoinedData columns
+        """
+        csv_indexed = self.csv_index(csv_df)
+        for batch in expense_batches:
+            joined_df = self.join_frame(batch, csv_indexed)
+            if len(joined_df):
+                yield joined_df
+
+    def iter_join_ndjson(self, expense_batches: Iterable[ExpenseBatch], csv_df: pd.DataFrame) -> Iterator[bytes]:
+        """
+        Streaming join encoded as NDJSON, one chunk of lines per batch.
+        """
+        for joined_df in self.iter_join_batches(expense_batches, csv_df):
+            yield self.ndjson(joined_df)
+
+    def join_to_file(self, expense_batches: Iterable[ExpenseBatch], csv_df: pd.DataFrame, output_path: str) -> int:
+        """
+        Write the streaming join to an NDJSON file.
+        :return: Number of joined rows written
+        """
+        rows = 0
+        with open(output_path, 'wb') as output:
+            for joined_df in self.iter_join_batches(expense_batches, csv_df):
+                output.write(self.ndjson(joined_df))
+                rows += len(joined_df)
+        return rows
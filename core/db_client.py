@@ -1,16 +1,173 @@
 # core/db_client.py
+import asyncio
+import functools
+import heapq
+import itertools
+import math
 import os
+import re
 import threading
+import time
 import yaml
 import logging
-from sqlalchemy import create_engine, text
+from typing import NamedTuple, Optional
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.pool import QueuePool
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from .config_watcher import ConfigWatcher
+from .instrumentation import count, enabled as instrumentation_enabled, span
+
+DEFAULT_BATCH_SIZE = 1000
+DB_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/db_config.yaml')
+
+# How long after timeout_ms a statement the database should have stopped is cancelled client-side
+QUERY_CANCEL_GRACE_MS = 1000
+SELECT_PREFIX = re.compile(r'^(\s*SELECT)\b', re.IGNORECASE)
+
+# db_config.yaml key -> sqlalchemy.create_engine keyword
+POOL_OPTIONS = {
+    'pool_size': 'pool_size',
+    'max_overflow': 'max_overflow',
+    'pool_timeout': 'pool_timeout',
+    'pool_recycle': 'pool_recycle',
+    'pre_ping': 'pool_pre_ping',
+}
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query runs past its timeout_ms and is cancelled."""
+
+
+class QueryLimits(NamedTuple):
+    timeout_ms: Optional[int] = None
+    max_rows: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Read timeout_ms and max_rows from a query_config.json entry.
+        :param config: Query entry; settings it leaves out are None (unlimited)
+        :return: QueryLimits
+        """
+        limits = cls(config.get('timeout_ms'), config.get('max_rows'))
+        for name, value in limits._asdict().items():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+                raise ValueError(f"'{name}' of query '{config.get('key')}' must be a positive integer.")
+        return limits
+
+
+NO_LIMITS = QueryLimits()
+
+
+class QueryRows(list):
+    """
+    Rows of a query as dictionaries; truncated is True when max_rows cut the result short.
+    """
+    truncated = False
+
+
+class LimitedBatches:
+    def __init__(self, batches, max_rows):
+        """
+        Row batches of a streamed query, stopping after max_rows rows. truncated is
+        set once iteration finds rows beyond the limit.
+        """
+        self.batches = batches
+        self.max_rows = max_rows
+        self.truncated = False
+
+    def __iter__(self):
+        remaining = self.max_rows
+        for batch in self.batches:
+            if len(batch) > remaining:
+                self.truncated = True
+                if remaining:
+                    yield batch[:remaining]
+                return
+            remaining -= len(batch)
+            yield batch
+
+
+def add_max_execution_time_hint(conn, cursor, statement, parameters, context, executemany):
+    """
+    before_cursor_execute hook of MySQL engines: SELECTs executed with a timeout_ms
+    execution option get a MAX_EXECUTION_TIME optimizer hint, so the server stops them.
+    """
+    timeout_ms = context.execution_options.get('timeout_ms') if context is not None else None
+    if timeout_ms:
+        statement = SELECT_PREFIX.sub(rf'\1 /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */', statement, count=1)
+    return statement, parameters
+
+
+class _Watchdog:
+    # One scheduler thread per process arms the watchdogs of every running statement,
+    # rather than a threading.Timer thread per statement
+    _condition = threading.Condition()
+    _heap = []  # (deadline, sequence, watchdog)
+    _sequence = itertools.count()
+    _thread = None
+
+    def __init__(self, delay, cancel):
+        """
+        Call cancel after delay seconds unless the block exits first. The lock keeps a
+        late cancel from reaching a statement the connection runs after the block.
+        """
+        self.deadline = time.monotonic() + delay
+        self.cancel = cancel
+        self.done = False
+        self.lock = threading.Lock()
+
+    def fire(self):
+        with self.lock:
+            if not self.done:
+                self.cancel()
+
+    def __enter__(self):
+        cls = type(self)
+        with cls._condition:
+            heapq.heappush(cls._heap, (self.deadline, next(cls._sequence), self))
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name='db-query-watchdog', daemon=True)
+                cls._thread.start()
+            cls._condition.notify()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        with self.lock:
+            self.done = True
+            self.cancel = None  # The heap entry stays until its deadline; do not keep the connection alive
+        return False
+
+    @classmethod
+    def _run(cls):
+        while True:
+            with cls._condition:
+                while not cls._heap:
+                    cls._condition.wait()
+                deadline, _, watchdog = cls._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    cls._condition.wait(remaining)
+                    continue
+                heapq.heappop(cls._heap)
+            if not watchdog.done:
+                # Cancelling can block (KILL QUERY opens a connection), so it must not hold up the other deadlines
+                threading.Thread(target=watchdog.fire, daemon=True).start()
+
 
 class DBClient:
     _instances = {}
     _lock = threading.Lock()
 
+    watcher = None
+    reload_count = 0
+    config_version = None
+    async_engine = None
+    async_unavailable = False
+    executor = None
+    retired_async_engines = ()
+
     def __new__(cls, dbid):
         with cls._lock:
             if dbid not in cls._instances:
@@ -24,13 +181,51 @@ class DBClient:
         self.dbid = dbid
         self.engine = None
         self.db_config = {}
-        self.load_config()
-        self.create_engine()
+        self.retired_async_engines = []
+        self.watcher = ConfigWatcher(DB_CONFIG_PATH)
+        try:
+            self.load_config()
+            self.create_engine()
+        except Exception:
+            # Do not cache a half-initialized client; the next request retries
+            with self._lock:
+                self._instances.pop(dbid, None)
+            raise
 
-    def load_config(self):
-        config_path = os.path.join(os.path.dirname(__file__), '../config/db_config.yaml')
-        with open(config_path, 'r') as file:
-            configs = yaml.safe_load(file)
+    @classmethod
+    def from_engine(cls, dbid, engine, db_config=None):
+        """
+        Client on an existing engine instead of one built from db_config.yaml, e.g. for
+        tests and benchmarks. It is not registered for DBClient(dbid) and never reloads.
+        :param db_config: Settings normally read from db_config.yaml, e.g. pool_size (optional)
+        """
+        client = super(DBClient, cls).__new__(cls)
+        client.initialized = True
+        client.dbid = dbid
+        client.engine = engine
+        client.db_config = db_config or {}
+        client.use_odbc = False
+        client.retired_async_engines = []
+        cls.add_timeout_hooks(engine)
+        return client
+
+    @classmethod
+    async def get_async(cls, dbid):
+        """
+        DBClient(dbid) for async callers. Building a client reads db_config.yaml, creates
+        the engine and warms its pool, so that runs on a worker thread; a built client is
+        returned without leaving the event loop.
+        """
+        client = cls._instances.get(dbid)
+        if getattr(client, 'engine', None) is not None:
+            return client
+        return await asyncio.to_thread(cls, dbid)
+
+    def load_config(self, content=None):
+        if content is None:
+            content = self.watcher.load()
+        configs = yaml.safe_load(content)
+        self.config_version = self.watcher.version
 
         db_configs = configs.get('databases', [])
         for db_config in db_configs:
@@ -65,8 +260,8 @@ class DBClient:
         else:
             raise ValueError(f"Database configuration for '{self.dbid}' not found.")
 
-    def create_engine(self):
-        dialect = self.db_config['dialect']
+    def database_url(self, dialect=None):
+        dialect = dialect or self.db_config['dialect']
 
         if self.use_odbc:
             # ODBC Connection
@@ -74,9 +269,7 @@ class DBClient:
             # Encode the ODBC connection string
             params = urllib.parse.quote_plus(odbc_connection_string)
             # Construct the database URL for SQLAlchemy
-            db_url = f"{dialect}:///?odbc_connect={params}"
-            self.engine = create_engine(db_url, poolclass=QueuePool)
-            logging.info(f"Database engine created for '{self.dbid}' using ODBC.")
+            return f"{dialect}:///?odbc_connect={params}"
         else:
             # Direct Driver Connection
             username = self.db_config['username']
@@ -86,17 +279,371 @@ class DBClient:
             database = self.db_config['database']
 
             # Construct the database URL for SQLAlchemy
-            db_url = f"{dialect}://{username}:{password}@{host}:{port}/{database}"
-            self.engine = create_engine(db_url, poolclass=QueuePool)
-            logging.info(f"Database engine created for '{self.dbid}' using direct driver.")
+            return f"{dialect}://{username}:{password}@{host}:{port}/{database}"
+
+    def create_engine(self):
+        self.engine = create_engine(self.database_url(), poolclass=QueuePool, **self.pool_options())
+        self.add_timeout_hooks(self.engine)
+        logging.info(f"Database engine created for '{self.dbid}' using {'ODBC' if self.use_odbc else 'direct driver'}.")
+        self.warm_pool()
+
+    def get_async_engine(self):
+        """
+        Lazily create an SQLAlchemy async engine when db_config.yaml names an
+        async_dialect (e.g. mysql+aiomysql, mssql+aioodbc) whose driver is installed.
+        :return: AsyncEngine, or None when queries should be offloaded to threads instead
+        """
+        if self.async_engine is None and self.db_config.get('async_dialect') and not self.async_unavailable:
+            try:
+                from sqlalchemy.ext.asyncio import create_async_engine
+                self.async_engine = create_async_engine(
+                    self.database_url(self.db_config['async_dialect']), **self.pool_options()
+                )
+                self.add_timeout_hooks(self.async_engine.sync_engine)
+                logging.info(f"Async database engine created for '{self.dbid}'.")
+            except Exception as e:
+                logging.warning(f"Async driver unavailable for '{self.dbid}', using thread offload: {e}")
+                self.async_unavailable = True
+        return self.async_engine
+
+    def get_executor(self):
+        """
+        Thread pool used to run blocking queries from async code, sized to the
+        connection pool so offloaded queries never queue on pool checkout.
+        """
+        with self._lock:
+            if self.executor is None:
+                max_workers = self.db_config.get('pool_size', 5) + self.db_config.get('max_overflow', 10)
+                self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{self.dbid}")
+        return self.executor
 
-    def execute_query(self, query, params=None):
+    async def run_sync(self, func, *args, **kwargs):
+        """
+        Run a blocking DBClient call on the bounded executor without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), functools.partial(func, *args, **kwargs))
+
+    async def execute_query_async(self, query, params=None, limits=None):
+        """
+        Async variant of execute_query: uses the async engine when configured,
+        otherwise runs execute_query on the bounded executor. On the async engine,
+        timeout_ms is enforced by cancelling the awaited query and discarding its connection.
+        :return: QueryRows
+        """
+        if self.get_async_engine() is None:
+            return await self.run_sync(self.execute_query, query, params, limits)
+
+        # A db_config.yaml change rebuilds and warms the engine, so the check runs on the executor
+        await self.run_sync(self.refresh)
+        while self.retired_async_engines:
+            await self.retired_async_engines.pop().dispose()
+        async_engine = self.get_async_engine()
+        if async_engine is None:  # The reloaded config no longer names an async_dialect
+            return await self.run_sync(self.execute_query, query, params, limits)
+
+        limits = limits or NO_LIMITS
         try:
-            with self.engine.connect() as connection:
-                result = connection.execute(text(query), params or {})
-                rows = result.fetchall()
-                columns = result.keys()
-                return [dict(zip(columns, row)) for row in rows]
+            connection = async_engine.connect()
+            with span('db.pool_checkout', dbid=self.dbid):
+                await connection.start()
+            try:
+                execute = self._execute_async(connection, query, params, limits)
+                if not limits.timeout_ms:
+                    return await execute
+                delay_ms = limits.timeout_ms
+                if self.driver_enforces_timeout(async_engine.dialect, query):
+                    delay_ms += QUERY_CANCEL_GRACE_MS
+                start = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(execute, delay_ms / 1000)
+                except Exception as e:
+                    if (time.perf_counter() - start) * 1000 < limits.timeout_ms:
+                        raise
+                    if isinstance(e, asyncio.TimeoutError):
+                        await connection.invalidate()
+                    raise self._timeout_error(limits.timeout_ms) from e
+            finally:
+                await connection.close()
         except Exception as e:
             logging.error(f"Error executing query on '{self.dbid}': {e}")
             raise
+
+    async def _execute_async(self, connection, query, params, limits):
+        with span('db.execute', dbid=self.dbid):
+            result = await connection.execute(self.as_statement(query), params or {},
+                                              execution_options=self.execution_options(limits))
+        return self._materialize(result, limits.max_rows)
+
+    def pool_options(self):
+        return {
+            engine_option: self.db_config[config_key]
+            for config_key, engine_option in POOL_OPTIONS.items()
+            if self.db_config.get(config_key) is not None
+        }
+
+    def warm_pool(self, count=None):
+        """
+        Open connections concurrently and return them to the pool, so the first
+        requests do not pay for connect and TLS handshakes.
+        :param count: Number of connections to open (default warm_connections from db_config.yaml),
+            capped at pool_size so warmed connections are kept by the pool
+        :return: Number of connections opened
+        """
+        if count is None:
+            count = self.db_config.get('warm_connections', 0)
+        count = min(count, self.engine.pool.size())
+        if count <= 0:
+            return 0
+
+        engine = self.engine
+        connections = []
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(engine.connect) for _ in range(count)]
+        for future in futures:
+            try:
+                connections.append(future.result())
+            except Exception as e:
+                logging.warning(f"Could not pre-warm connection for '{self.dbid}': {e}")
+        for connection in connections:
+            connection.close()
+
+        logging.info(f"Pre-warmed {len(connections)} connections for '{self.dbid}'.")
+        return len(connections)
+
+    @classmethod
+    def warm_all(cls):
+        """
+        Create a client for every database in db_config.yaml that sets warm_connections.
+        Failures are logged so worker start-up is never blocked by an unreachable database.
+        """
+        with open(DB_CONFIG_PATH, 'r') as file:
+            configs = yaml.safe_load(file)
+        for db_config in configs.get('databases', []):
+            if db_config.get('warm_connections'):
+                try:
+                    cls(db_config['dbid'])
+                except Exception as e:
+                    logging.warning(f"Could not initialize database '{db_config['dbid']}' at start-up: {e}")
+
+    def refresh(self, force=False):
+        """
+        Reload db_config.yaml if it changed on disk. When the settings for this dbid
+        changed, a new engine is built and swapped in, and the old engine's pool is
+        disposed: idle connections are closed now, while connections checked out by
+        in-flight queries stay open and are discarded when they are returned.
+        :param force: Check the file now instead of waiting for the watcher interval
+        :return: True if a new engine was swapped in
+        """
+        if self.watcher is None:
+            return False
+        content = self.watcher.poll(force=force)
+        if content is None:
+            return False
+
+        old_engine = self.engine
+        old_state = (self.db_config, self.use_odbc, self.config_version)
+        try:
+            self.load_config(content)
+            if (self.db_config, self.use_odbc) == old_state[:2]:
+                return False
+            self.create_engine()
+        except Exception as e:
+            logging.error(f"Error reloading database configuration for '{self.dbid}': {e}")
+            self.db_config, self.use_odbc, self.config_version = old_state
+            self.engine = old_engine
+            return False
+
+        old_engine.dispose()
+        if self.async_engine is not None:
+            # Async engines can only be disposed from a running loop; see execute_query_async
+            self.retired_async_engines.append(self.async_engine)
+            self.async_engine = None
+        self.async_unavailable = False
+        self.reload_count += 1
+        logging.info(f"Database configuration for '{self.dbid}' reloaded (version {self.config_version}).")
+        return True
+
+    @staticmethod
+    def as_statement(query):
+        return text(query) if isinstance(query, str) else query
+
+    @staticmethod
+    def add_timeout_hooks(engine):
+        if engine.dialect.name == 'mysql':
+            event.listen(engine, 'before_cursor_execute', add_max_execution_time_hint, retval=True)
+
+    @staticmethod
+    def driver_enforces_timeout(dialect, query):
+        """
+        :return: True if the database stops the query at its timeout_ms itself: MySQL
+            SELECTs (MAX_EXECUTION_TIME hint) and pyodbc connections (query timeout)
+        """
+        if dialect.name == 'mysql':
+            return bool(SELECT_PREFIX.match(str(query)))
+        return dialect.driver == 'pyodbc'
+
+    @staticmethod
+    def execution_options(limits):
+        return {'timeout_ms': limits.timeout_ms} if limits.timeout_ms else None
+
+    def _timeout_error(self, timeout_ms):
+        count('db.timeout', dbid=self.dbid)
+        return QueryTimeoutError(f"Query on '{self.dbid}' exceeded its timeout of {timeout_ms} ms and was cancelled.")
+
+    def cancel(self, dbapi_connection):
+        """
+        Cancel the statement running on a driver connection from another thread:
+        sqlite3 interrupt(), psycopg cancel(), or KILL QUERY for PyMySQL and mysqlclient.
+        """
+        logging.warning(f"Cancelling query on '{self.dbid}' that ran past its timeout.")
+        try:
+            if hasattr(dbapi_connection, 'interrupt'):
+                dbapi_connection.interrupt()
+            elif hasattr(dbapi_connection, 'cancel'):
+                dbapi_connection.cancel()
+            elif hasattr(dbapi_connection, 'thread_id'):
+                self.kill_query(dbapi_connection.thread_id())
+            else:
+                logging.warning(f"Queries on '{self.dbid}' cannot be cancelled client-side by this driver.")
+        except Exception as e:
+            logging.error(f"Error cancelling query on '{self.dbid}': {e}")
+
+    def kill_query(self, thread_id):
+        """
+        Send KILL QUERY on a dedicated connection outside the pool: cancelling is needed
+        most when the pool is exhausted, and a checkout would then wait up to pool_timeout.
+        """
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        dbapi_connection = dialect.connect(*cargs, **cparams)
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"KILL QUERY {int(thread_id)}")
+            cursor.close()
+        finally:
+            dbapi_connection.close()
+
+    @contextmanager
+    def enforce_timeout(self, connection, query, timeout_ms):
+        """
+        Enforce timeout_ms on the statement executed and fetched on connection inside the
+        block: driver-side where supported, and client-side by a watchdog that cancels the
+        statement at the timeout (QUERY_CANCEL_GRACE_MS later when enforced driver-side).
+        Errors raised once the timeout has passed become QueryTimeoutError.
+        """
+        if not timeout_ms:
+            yield
+            return
+        dbapi_connection = connection.connection.dbapi_connection
+        driver_side = self.driver_enforces_timeout(connection.dialect, query)
+        odbc_timeout = driver_side and connection.dialect.driver == 'pyodbc'
+        if odbc_timeout:
+            # Applies to cursors created afterwards, i.e. the one executing this statement
+            dbapi_connection.timeout = math.ceil(timeout_ms / 1000)
+        delay_ms = timeout_ms + (QUERY_CANCEL_GRACE_MS if driver_side else 0)
+        start = time.perf_counter()
+        try:
+            with _Watchdog(delay_ms / 1000, functools.partial(self.cancel, dbapi_connection)):
+                yield
+        except Exception as e:
+            if (time.perf_counter() - start) * 1000 < timeout_ms:
+                raise
+            raise self._timeout_error(timeout_ms) from e
+        finally:
+            if odbc_timeout:
+                dbapi_connection.timeout = 0
+
+    def connect(self):
+        with span('db.pool_checkout', dbid=self.dbid):
+            return self.engine.connect()
+
+    def _materialize(self, result, max_rows=None):
+        with span('db.fetch', dbid=self.dbid) as fetch_span:
+            rows = result.fetchall() if max_rows is None else result.fetchmany(max_rows + 1)
+            fetch_span.set(rows=len(rows))
+        columns = result.keys()
+        with span('db.materialize', dbid=self.dbid):
+            data = QueryRows(dict(zip(columns, row)) for row in rows[:max_rows])
+        if max_rows is not None and len(rows) > max_rows:
+            data.truncated = True
+            result.close()
+        return data
+
+    def execute_query(self, query, params=None, limits=None):
+        """
+        :param limits: QueryLimits (timeout_ms, max_rows) to enforce (optional)
+        :return: QueryRows, truncated when there were more than max_rows rows
+        """
+        limits = limits or NO_LIMITS
+        self.refresh()
+        try:
+            with self.connect() as connection, self.enforce_timeout(connection, query, limits.timeout_ms):
+                with span('db.execute', dbid=self.dbid):
+                    result = connection.execute(self.as_statement(query), params or {},
+                                                execution_options=self.execution_options(limits))
+                return self._materialize(result, limits.max_rows)
+        except Exception as e:
+            logging.error(f"Error executing query on '{self.dbid}': {e}")
+            raise
+
+    def execute_queries(self, queries):
+        """
+        Execute several statements on a single pooled connection.
+        :param queries: List of (statement, params) or (statement, params, QueryLimits) tuples
+        :return: List holding, per statement, its QueryRows or the exception it raised
+        """
+        self.refresh()
+        results = []
+        with self.connect() as connection:
+            for query, params, *options in queries:
+                limits = options[0] if options else NO_LIMITS
+                try:
+                    with self.enforce_timeout(connection, query, limits.timeout_ms):
+                        with span('db.execute', dbid=self.dbid):
+                            result = connection.execute(self.as_statement(query), params or {},
+                                                        execution_options=self.execution_options(limits))
+                        results.append(self._materialize(result, limits.max_rows))
+                except Exception as e:
+                    logging.error(f"Error executing query on '{self.dbid}': {e}")
+                    connection.rollback()
+                    results.append(e)
+        return results
+
+    @contextmanager
+    def stream_query(self, query, params=None, batch_size=DEFAULT_BATCH_SIZE, limits=None):
+        """
+        Execute a query on a server-side cursor and fetch rows in batches.
+        :param query: SQL string or pre-compiled statement
+        :param params: Bound parameters for the statement
+        :param batch_size: Number of rows fetched from the cursor per round trip
+        :param limits: QueryLimits to enforce; timeout_ms covers fetching, and with max_rows
+            the batches are a LimitedBatches whose truncated flag is set after iteration
+        :return: Tuple of (column names, iterator over lists of row tuples)
+        """
+        limits = limits or NO_LIMITS
+        self.refresh()
+        try:
+            with self.connect() as connection, self.enforce_timeout(connection, query, limits.timeout_ms):
+                with span('db.execute', dbid=self.dbid):
+                    result = connection.execution_options(
+                        stream_results=True, yield_per=batch_size
+                    ).execute(self.as_statement(query), params or {}, execution_options=self.execution_options(limits))
+                batches = result.partitions(batch_size)
+                if instrumentation_enabled():
+                    batches = self._timed_batches(batches)
+                if limits.max_rows:
+                    batches = LimitedBatches(batches, limits.max_rows)
+                yield list(result.keys()), batches
+        except Exception as e:
+            logging.error(f"Error streaming query on '{self.dbid}': {e}")
+            raise
+
+    def _timed_batches(self, batches):
+        while True:
+            with span('db.fetch', dbid=self.dbid) as fetch_span:
+                batch = next(batches, None)
+                fetch_span.set(rows=len(batch) if batch else 0)
+            if batch is None:
+                return
+            yield batch
@@ -0,0 +1,149 @@
+# core/expense_pipeline.py
+import hashlib
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional
+from . import serialization
+from .instrumentation import count, span
+from .reference_table import ReferenceTable
+from .single_flight import SingleFlight
+
+MIMETYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+
+class PipelineResponse(NamedTuple):
+    status_code: int
+    body: bytes
+    mimetype: str
+    headers: Dict[str, str]
+
+
+class EncodedBody:
+    def __init__(self, version: str, body: bytes):
+        """
+        A serialized join result and its compressed variants, each encoded once.
+        :param version: Hash of the inputs the body was built from
+        """
+        self.version = version
+        self.body = body
+        self._encoded = {None: body}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = serialization.compress(self.body, encoding)
+            return self._encoded[encoding]
+
+
+def parse_if_none_match(header: Optional[str]):
+    """
+    :return: Entity tags of an If-None-Match header, without weak (W/) prefixes
+    """
+    tags = [tag.strip() for tag in (header or '').split(',')]
+    return [tag[2:] if tag.startswith('W/') else tag for tag in tags if tag]
+
+
+class ExpensePipeline:
+    def __init__(self, coupa_client, data_processor, store):
+        """
+        The wf functions' pipeline: sync Coupa into the store, join with the reference
+        CSV and serialize. The serialized result is kept per format and rebuilt only
+        when the store's revision or the CSV's version changes; concurrent requests
+        for a result being built wait for that build instead of repeating it.
+        :param coupa_client: CoupaClient to sync from
+        :param data_processor: DataProcessor for the reference CSV
+        :param store: ExpenseReportStore holding the synced reports
+        """
+        self.coupa_client = coupa_client
+        self.data_processor = data_processor
+        self.store = store
+        self.single_flight = SingleFlight()
+        self.build_count = 0
+        self._bodies = {}
+
+    def sync(self):
+        """
+        Sync the store if it is stale; if the sync fails while the store holds reports, serve those.
+        """
+        try:
+            self.store.sync_if_stale(self.coupa_client)
+        except Exception as e:
+            if not self.store.count():
+                raise
+            logging.warning(f"Coupa sync failed, serving stored expense reports: {e}")
+
+    def version(self, output_format: str) -> str:
+        """
+        Hash of everything the result depends on: the store revision, the CSV version and the format.
+        The revision rather than the checkpoint, which reports without updated_at never move.
+        """
+        csv_version = ReferenceTable(self.data_processor.csv_path).current_version()
+        key = f"{self.store.revision}|{csv_version}|{output_format}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    def build(self, output_format: str) -> bytes:
+        csv_df = self.data_processor.read_csv()
+        if output_format == 'ndjson':
+            # Joined and encoded one store batch at a time
+            return b''.join(self.data_processor.iter_join_ndjson(self.store.iter_frames(), csv_df))
+        return self.data_processor.join_json(self.store.load_frame(), csv_df).encode('utf-8')
+
+    def _build_cached(self, output_format, version):
+        cached = self._bodies.get(output_format)
+        if cached is not None and cached.version == version:
+            return cached  # Built by a request that finished before this one asked
+        with span('expense.build', format=output_format):
+            cached = EncodedBody(version, self.build(output_format))
+        self._bodies[output_format] = cached
+        self.build_count += 1
+        logging.info(f"Built {output_format} expense report response ({len(cached.body)} bytes) for version {version}.")
+        return cached
+
+    def respond(self, output_format: str = 'json', accept_encoding: Optional[str] = None,
+                if_none_match: Optional[str] = None) -> PipelineResponse:
+        """
+        :param output_format: 'json' or 'ndjson'
+        :param accept_encoding: Accept-Encoding request header (optional)
+        :param if_none_match: If-None-Match request header (optional)
+        :return: 304 when if_none_match holds the current ETag, otherwise 200 with the cached body
+        """
+        self.sync()
+        version = self.version(output_format)
+        mimetype = MIMETYPES[output_format]
+        headers = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+
+        # Answered from the version alone, so a new worker need not build the body to send a 304
+        for tag in parse_if_none_match(if_none_match):
+            if tag == '*' or tag.strip('"').split('-')[0] == version:
+                count('expense.response_cache', result='not_modified')
+                headers['ETag'] = f'"{version}"' if tag == '*' else tag
+                return PipelineResponse(304, b'', mimetype, headers)
+
+        cached = self._bodies.get(output_format)
+        count('expense.response_cache', result='hit' if cached is not None and cached.version == version else 'miss')
+        if cached is None or cached.version != version:
+            cached = self.single_flight.do((output_format, version), self._build_cached, output_format, version)
+
+        encoding = serialization.negotiate_encoding(accept_encoding) if len(cached.body) >= serialization.COMPRESS_MIN_BYTES else None
+        # Each encoding is a different representation, so it gets its own ETag
+        headers['ETag'] = f'"{version}-{encoding}"' if encoding else f'"{version}"'
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return PipelineResponse(200, cached.encoded(encoding), mimetype, headers)
+
+
+def handle(req, pipeline: Optional[ExpensePipeline] = None):
+    """
+    Answer a wf function request from the shared ExpensePipeline.
+    :param req: func.HttpRequest; ?format=ndjson selects NDJSON, anything else a JSON array
+    :param pipeline: ExpensePipeline (default app_context.expense_pipeline())
+    :return: func.HttpResponse
+    """
+    import azure.functions as func
+    from . import app_context
+    pipeline = pipeline or app_context.expense_pipeline()
+    output_format = 'ndjson' if req.params.get('format') == 'ndjson' else 'json'
+    response = pipeline.respond(output_format, req.headers.get('Accept-Encoding'), req.headers.get('If-None-Match'))
+    return func.HttpResponse(response.body, status_code=response.status_code, mimetype=response.mimetype,
+                             headers=response.headers)
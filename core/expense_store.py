@@ -0,0 +1,238 @@
+# core/expense_store.py
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List
+from .instrumentation import span
+from .models import ExpenseReport
+
+DEFAULT_SYNC_INTERVAL = 60
+DEFAULT_BATCH_SIZE = 5000
+# Each report field extracted by SQLite, for loading reports straight into DataFrames
+FRAME_COLUMNS = ', '.join(f"json_extract(data, '$.{field}') AS {field}" for field in ExpenseReport.model_fields)
+
+
+class SyncBackoffError(RuntimeError):
+    """Raised instead of syncing while a recent sync failure is backing off."""
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp such as Coupa's updated_at ('2024-04-17T10:00:00-07:00' or '...Z').
+    Timestamps without an offset are taken as UTC.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ExpenseReportStore:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        """
+        Local copy of Coupa expense reports, kept current by incremental syncs.
+        The high-watermark checkpoint (latest updated_at stored) is committed with
+        each page, so an interrupted sync resumes where it stopped. The revision is
+        bumped in the same transaction whenever a page changes stored reports.
+        :param path: Path of the SQLite database file; shared by workers on the same instance
+        """
+        self.path = path
+        self.sync_count = 0
+        self._sync_lock = threading.RLock()
+        self._connection_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS expense_reports (id INTEGER PRIMARY KEY, updated_at TEXT, data TEXT NOT NULL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value TEXT)")
+
+    @classmethod
+    def default(cls):
+        """
+        Shared store for the worker at COUPA_STORE_PATH (default: a file in the temp directory).
+        """
+        with cls._lock:
+            if cls._instance is None:
+                path = os.environ.get('COUPA_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'coupa_expense_reports.sqlite')
+                cls._instance = cls(path)
+                logging.info(f"Expense report store opened at '{path}'.")
+            return cls._instance
+
+    def _get_state(self, name):
+        with self._connection_lock:
+            row = self._connection.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, name, value):
+        with self._connection_lock:
+            self._connection.execute("INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)", (name, value))
+
+    @property
+    def checkpoint(self):
+        """
+        updated_at of the most recently updated report stored, or None before the first sync.
+        """
+        return self._get_state('high_watermark')
+
+    @property
+    def revision(self):
+        """
+        Number of saved pages that inserted or changed reports; unlike the checkpoint it
+        also moves for reports without updated_at.
+        """
+        return int(self._get_state('revision') or 0)
+
+    @property
+    def last_synced_at(self):
+        value = self._get_state('last_synced_at')
+        return float(value) if value else None
+
+    @property
+    def last_failed_at(self):
+        """
+        Start time of the last sync if it failed, None once a sync succeeds.
+        """
+        value = self._get_state('last_failed_at')
+        return float(value) if value else None
+
+    def save_page(self, reports: List[ExpenseReport]):
+        """
+        Upsert a page of reports and advance the checkpoint in one transaction,
+        bumping the revision when any report was inserted or changed.
+        """
+        checkpoint = self.checkpoint
+        for report in reports:
+            if report.updated_at and (checkpoint is None or parse_timestamp(report.updated_at) > parse_timestamp(checkpoint)):
+                checkpoint = report.updated_at
+        with self._connection_lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            # Reports re-fetched unchanged (those at the checkpoint are, every sync) are not counted as changes
+            changed = self._connection.executemany(
+                "INSERT INTO expense_reports (id, updated_at, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data "
+                "WHERE expense_reports.data IS NOT excluded.data",
+                [(report.id, report.updated_at, report.model_dump_json()) for report in reports]
+            ).rowcount
+            if changed > 0:
+                self._connection.execute(
+                    "INSERT INTO sync_state (name, value) VALUES ('revision', '1') "
+                    "ON CONFLICT(name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                )
+            if checkpoint is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, value) VALUES ('high_watermark', ?)", (checkpoint,)
+                )
+
+    def sync(self, coupa_client):
+        """
+        Fetch the reports updated since the checkpoint and store them.
+        Reports updated exactly at the checkpoint are fetched again, so none sharing
+        that timestamp are missed; upserting them is idempotent.
+        :param coupa_client: CoupaClient to page through
+        :return: Number of reports fetched
+        """
+        with self._sync_lock, span('coupa.sync') as sync_span:
+            started = time.time()
+            fetched = 0
+            undated = 0
+            try:
+                for page in coupa_client.iter_expense_report_pages(updated_since=self.checkpoint):
+                    self.save_page(page)
+                    fetched += len(page)
+                    undated += sum(1 for report in page if not report.updated_at)
+            except Exception:
+                self._set_state('last_failed_at', str(started))
+                raise
+            sync_span.set(rows=fetched)
+            self._set_state('last_synced_at', str(started))
+            self._set_state('last_failed_at', None)
+            self.sync_count += 1
+            logging.info(f"Synced {fetched} expense reports in {time.time() - started:.2f}s; checkpoint {self.checkpoint}.")
+            if undated:
+                # The checkpoint can only follow updated_at, so these reports make the sync not incremental
+                if self.checkpoint is None:
+                    logging.warning(f"None of the {fetched} synced expense reports has updated_at; without a "
+                                    "checkpoint every sync downloads all expense reports again.")
+                else:
+                    logging.warning(f"{undated} of {fetched} synced expense reports have no updated_at; "
+                                    "later incremental syncs will not pick up changes to them.")
+            return fetched
+
+    def sync_if_stale(self, coupa_client, min_interval=None):
+        """
+        Sync unless this store (in any worker sharing the file) synced within min_interval seconds.
+        A failed sync is not retried for min_interval seconds either, so during a Coupa
+        outage requests fail fast instead of each waiting on a sync of its own.
+        :param min_interval: Seconds between syncs (default COUPA_SYNC_INTERVAL or 60)
+        :return: Number of reports fetched, or None when the store was fresh
+        :raises SyncBackoffError: When the last sync failed within min_interval seconds
+        """
+        if min_interval is None:
+            min_interval = float(os.environ.get('COUPA_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL))
+
+        def is_fresh():
+            last_synced_at = self.last_synced_at
+            return last_synced_at is not None and time.time() - last_synced_at < min_interval
+
+        def check_backoff():
+            last_failed_at = self.last_failed_at
+            if last_failed_at is not None and time.time() - last_failed_at < min_interval:
+                raise SyncBackoffError(f"Coupa sync failed {time.time() - last_failed_at:.0f}s ago; "
+                                       f"retrying after {min_interval:.0f}s.")
+
+        if is_fresh():
+            return None
+        check_backoff()
+        with self._sync_lock:
+            # Concurrent requests wait for the sync in progress instead of starting another
+            if is_fresh():
+                return None
+            check_backoff()
+            return self.sync(coupa_client)
+
+    def load(self) -> List[ExpenseReport]:
+        with self._connection_lock:
+            rows = self._connection.execute("SELECT data FROM expense_reports ORDER BY expense_reports.id").fetchall()
+        return [ExpenseReport(**json.loads(row[0])) for row in rows]
+
+    def load_frame(self):
+        """
+        Stored reports as a DataFrame, with each field extracted by SQLite rather than per report in Python.
+        """
+        import pandas as pd
+        with self._connection_lock, span('store.load') as load_span:
+            frame = pd.read_sql_query(f"SELECT {FRAME_COLUMNS} FROM expense_reports ORDER BY expense_reports.id", self._connection)
+            load_span.set(rows=len(frame))
+        return frame
+
+    def iter_frames(self, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Stored reports as DataFrames of at most batch_size rows, in id order.
+        Each batch is a separate keyset query, so the connection is not held between batches.
+        """
+        import pandas as pd
+        last_id = None
+        while True:
+            with self._connection_lock:
+                frame = pd.read_sql_query(
+                    f"SELECT {FRAME_COLUMNS} FROM expense_reports WHERE expense_reports.id > ? "
+                    "ORDER BY expense_reports.id LIMIT ?",
+                    self._connection, params=(-2 ** 63 if last_id is None else last_id, batch_size)
+                )
+            if frame.empty:
+                return
+            yield frame
+            if len(frame) < batch_size:
+                return
+            last_id = int(frame['id'].iloc[-1])
+
+    def count(self):
+        with self._connection_lock:
+            return self._connection.execute("SELECT COUNT(*) FROM expense_reports").fetchone()[0]
@@ -1,47 +1,121 @@
 import httpx
 import asyncio
+import logging
 from httpx import HTTPStatusError, RequestError
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List
+from .instrumentation import count, span
+from .models import InputDataItem
+from .rate_limit import (
+    DEFAULT_CIRCUIT_BREAKERS, DEFAULT_RATE_LIMITERS, RetryBudget, decorrelated_jitter, parse_retry_after
+)
+
+# Methods that can be retried after a failure without risking a duplicate side effect
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
 
 class HttpClient:
-    def __init__(self, retries=3, timeout=10):
+    def __init__(self, retries=3, timeout=10, max_in_flight=50, max_connections=50,
+                 max_keepalive_connections=20, http2=False, transport=None,
+                 backoff_base=0.5, backoff_cap=30.0, retry_budget_ratio=0.2,
+                 rate_limiters=None, circuit_breakers=None):
         """
-        Initialize the HttpClient with retry and timeout settings.
-        :param retries: Number of retries on failure (default 3)
+        Initialize the HttpClient with retry, timeout and concurrency settings.
+        :param retries: Number of attempts per request (default 3)
         :param timeout: Request timeout in seconds (default 10)
+        :param max_in_flight: Maximum number of requests awaiting a response at once (default 50)
+        :param max_connections: Maximum open connections across hosts (default 50)
+        :param max_keepalive_connections: Maximum idle connections kept alive (default 20)
+        :param http2: Negotiate HTTP/2 when the server supports it; requires the h2 package (default False)
+        :param transport: Optional httpx transport, e.g. httpx.MockTransport for tests
+        :param backoff_base: Minimum retry delay in seconds for decorrelated jitter (default 0.5)
+        :param backoff_cap: Maximum retry delay in seconds (default 30)
+        :param retry_budget_ratio: Retries allowed per request across one batch (default 0.2)
+        :param rate_limiters: HostRegistry of TokenBuckets (default: shared per worker)
+        :param circuit_breakers: HostRegistry of CircuitBreakers (default: shared per worker)
         """
         self.retries = retries
         self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.http2 = http2
+        self.transport = transport
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_budget_ratio = retry_budget_ratio
+        self.rate_limiters = rate_limiters or DEFAULT_RATE_LIMITERS
+        self.circuit_breakers = circuit_breakers or DEFAULT_CIRCUIT_BREAKERS
+
+    def create_retry_budget(self):
+        return RetryBudget(ratio=self.retry_budget_ratio)
+
+    def create_async_client(self, max_connections=None, max_keepalive_connections=None, http2=None):
+        """
+        Create an httpx.AsyncClient with explicit connection limits.
+        Parameters left as None fall back to the values given to the constructor.
+        :return: httpx.AsyncClient
+        """
+        limits = httpx.Limits(
+            max_connections=max_connections or self.max_connections,
+            max_keepalive_connections=max_keepalive_connections or self.max_keepalive_connections
+        )
+        http2 = self.http2 if http2 is None else http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logging.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+                http2 = False
+        return httpx.AsyncClient(limits=limits, http2=http2, transport=self.transport)
+
+    @asynccontextmanager
+    async def client_session(self, client=None, **client_options):
+        """
+        Use the given httpx.AsyncClient, or create (and close) one with create_async_client.
+        """
+        if client is not None:
+            yield client
+            return
+        async with self.create_async_client(**client_options) as owned_client:
+            yield owned_client
+
+    @staticmethod
+    def create_input_data_items(batches, params=None):
+        """
+        Map limit/offset batches to InputDataItems whose placeholders fill a baseUrl
+        such as '.../items?limit={limit}&offset={offset}'.
+        :param batches: Output of create_batches
+        :param params: Query parameters added to every request (default none)
+        :return: List of InputDataItem
+        """
+        return [
+            InputDataItem(placeholders=batch, params=dict(params or {}))
+            for batch in batches
+        ]
 
-    def create_input_data_items(batches):
-        # Map each batch to an InputDataItem using lambda
-        input_data_items = list(map(lambda batch: InputDataItem(
-            placeholders={"limit": batch["limit"], "offset": batch["offset"]}, 
-            params={"lookup_id": "19"}
-        ), batches))
-        
-        return input_data_items
-    
+    @staticmethod
     def create_batches(total_records, batch_size):
-        # List to hold the batch dictionaries
-        batches = []
-        
-        # Loop through the total_records with the given batch size
-        for offset in range(0, total_records, batch_size):
-            batch = {
-                "limit": batch_size,
-                "offset": offset
-            }
-            batches.append(batch)
-        
-        return batches
-        
-    async def fetch(self, client, request_config):
+        """
+        Split a known record count into limit/offset batches. Use core.pagination
+        when the total is not known up front.
+        :return: List of {'limit', 'offset'} dictionaries
+        """
+        return [
+            {"limit": batch_size, "offset": offset}
+            for offset in range(0, total_records, batch_size)
+        ]
+
+    async def fetch(self, client, request_config, retry_budget=None):
         """
         Fetch data for a single request configuration with retries and exception handling.
+        Requests are paced by the per-host token bucket and short-circuited while the
+        host's circuit is open. Only network errors, 429 and 5xx responses are retried,
+        and non-idempotent methods only after a 429, with decorrelated jitter backoff
+        that honours Retry-After.
         :param client: httpx.AsyncClient object
         :param request_config: Dictionary containing request parameters
             Expected keys: 'method', 'url', 'params', 'headers', 'data', 'json', 'id'
+        :param retry_budget: RetryBudget shared by the batch (default: one for this request)
         :return: JSON response of the API call
         """
         method = request_config.get('method', 'GET').upper()
@@ -52,50 +126,90 @@ class HttpClient:
         json_data = request_config.get('json', None)
         identifier = request_config.get('id', url)  # An identifier for logging
 
+        host = httpx.URL(url).host
+        rate_limiter = self.rate_limiters.get(host)
+        circuit_breaker = self.circuit_breakers.get(host)
+        retry_budget = retry_budget or self.create_retry_budget()
+        retry_budget.record_request()
+        delay = self.backoff_base
+
         for attempt in range(1, self.retries + 1):
+            trial = circuit_breaker.before_request(host)
+            settled = False
+            retry_after = None
+
             try:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    params=params,
-                    headers=headers,
-                    data=data,
-                    json=json_data,
-                    timeout=self.timeout
-                )
+                await rate_limiter.acquire()
+                with span('http.request', host=host, method=method, attempt=attempt) as request_span:
+                    response = await client.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        headers=headers,
+                        data=data,
+                        json=json_data,
+                        timeout=self.timeout
+                    )
+                    request_span.set(status_code=response.status_code)
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    rate_limiter.on_throttle(retry_after)
+                elif response.status_code >= 500:
+                    circuit_breaker.record_failure()
+                    settled = True
+                else:
+                    rate_limiter.on_success()
+                    circuit_breaker.record_success()
+                    settled = True
                 response.raise_for_status()  # Raise an exception for HTTP errors
                 return response.json()
 
             except HTTPStatusError as http_err:
-                print(f"HTTP error on request {identifier}: {http_err}")
-                if response.status_code == 404:
-                    print(f"Resource not found for request {identifier}. Skipping.")
+                logging.warning(f"HTTP error on request {identifier}: {http_err}")
+                status_code = http_err.response.status_code
+                if status_code == 404:
+                    logging.info(f"Resource not found for request {identifier}. Skipping.")
                     return None  # Optionally skip if not found
-                elif attempt == self.retries:
-                    raise  # Rethrow if all retries fail
+                retryable = status_code == 429 or (status_code >= 500 and method in IDEMPOTENT_METHODS)
+                if not retryable or attempt == self.retries or not retry_budget.try_spend():
+                    raise  # Rethrow client errors and when retries are exhausted
 
             except RequestError as req_err:
-                print(f"Network error on request {identifier}: {req_err}")
-                if attempt == self.retries:
+                logging.warning(f"Network error on request {identifier}: {req_err}")
+                circuit_breaker.record_failure()
+                settled = True
+                if method not in IDEMPOTENT_METHODS or attempt == self.retries or not retry_budget.try_spend():
                     raise  # Rethrow if all retries fail
 
-            except Exception as e:
-                print(f"Unexpected error on request {identifier}: {e}")
-                if attempt == self.retries:
-                    raise  # Rethrow if all retries fail
+            finally:
+                if trial and not settled:
+                    # A 429, a cancelled task or an unexpected error says nothing about the host's health
+                    circuit_breaker.release_trial()
 
-            # Exponential backoff for retries
-            await asyncio.sleep(2 ** attempt)
+            count('http.retry', host=host)
+            # Decorrelated jitter so concurrent requests do not retry in lockstep
+            delay = decorrelated_jitter(delay, self.backoff_base, self.backoff_cap)
+            await asyncio.sleep(max(delay, retry_after or 0))
 
-    async def fetch_all(self, requests_list):
+    async def fetch_all(self, requests_list, max_in_flight=None, client=None, **client_options):
         """
-        Fetch all requests in parallel.
+        Fetch all requests in parallel, with at most max_in_flight requests outstanding.
         :param requests_list: List of request configuration dictionaries
+        :param max_in_flight: Concurrency limit (default: the HttpClient's max_in_flight)
+        :param client: httpx.AsyncClient to reuse (default: a new client for this call)
+        :param client_options: max_connections, max_keepalive_connections or http2 overrides
         :return: List of responses from all requests
         """
-        async with httpx.AsyncClient() as client:
+        semaphore = asyncio.Semaphore(max_in_flight or self.max_in_flight)
+        retry_budget = self.create_retry_budget()
+
+        async def bounded_fetch(client, request_config):
+            async with semaphore:
+                return await self.fetch(client, request_config, retry_budget)
+
+        async with self.client_session(client, **client_options) as client:
             tasks = [
-                self.fetch(client, request_config) for request_config in requests_list
+                bounded_fetch(client, request_config) for request_config in requests_list
             ]
 
             responses = await asyncio.gather(*tasks, return_exceptions=True)
@@ -105,7 +219,7 @@ class HttpClient:
                 if isinstance(response, dict):
                     results.append(response)
                 elif isinstance(response, Exception):
-                    print(f"Error occurred: {response}")
+                    logging.error(f"Error occurred: {response}")
                     # Optionally, append None or handle the exception as needed
                     results.append(None)
                 else:
@@ -114,13 +228,12 @@ class HttpClient:
 
             return results
 
-    async def get_parallel_data(self, request_config):
+    def build_requests(self, request_config):
         """
-        Fetch data from multiple requests in parallel.
+        Expand a RequestConfig into one request configuration per input data item.
         :param request_config: An instance of RequestConfig Pydantic model
-        :return: List of responses from all requests
+        :return: Generator of request configuration dictionaries
         """
-        requests_list = []
         baseUrl = request_config.baseUrl
         method = request_config.method
         headers = request_config.headers
@@ -134,17 +247,106 @@ class HttpClient:
             try:
                 url = baseUrl.format(**placeholders)
             except KeyError as e:
-                print(f"Missing placeholder {e} in baseUrl.")
+                logging.warning(f"Missing placeholder {e} in baseUrl.")
                 continue  # Skip this item or handle as needed
 
             # Build the request configuration
-            req_config = {
+            yield {
                 'method': method,
                 'url': url,
                 'params': params,
                 'headers': headers,
                 'id': f"{global_id}-{placeholders.get('id', '')}"
             }
-            requests_list.append(req_config)
 
-        return await self.fetch_all(requests_list)
+    @staticmethod
+    def client_options(request_config):
+        return {
+            'max_connections': request_config.maxConnections,
+            'max_keepalive_connections': request_config.maxKeepaliveConnections,
+            'http2': request_config.http2
+        }
+
+    async def get_parallel_data(self, request_config):
+        """
+        Fetch data from multiple requests in parallel.
+        :param request_config: An instance of RequestConfig Pydantic model
+        :return: List of responses from all requests
+        """
+        return await self.fetch_all(
+            list(self.build_requests(request_config)),
+            max_in_flight=request_config.maxInFlight,
+            **self.client_options(request_config)
+        )
+
+    async def iter_parallel_data(self, request_config, ordered=False):
+        """
+        Fetch data from multiple requests in parallel, yielding each result as it completes.
+        :param request_config: An instance of RequestConfig Pydantic model
+        :param ordered: Yield results in input order instead of completion order (default False)
+        :return: Async generator of (request id, response) tuples
+        """
+        async for identifier, result in self.iter_fetch(
+            self.build_requests(request_config),
+            ordered=ordered,
+            max_in_flight=request_config.maxInFlight,
+            **self.client_options(request_config)
+        ):
+            yield identifier, result
+
+    async def iter_fetch(self, requests_list, ordered=False, max_in_flight=None, client=None, raise_errors=False,
+                         **client_options):
+        """
+        Fetch requests concurrently and yield (request id, response) as each completes.
+        New requests are only started while fewer than max_in_flight are running or
+        waiting to be consumed, so a slow consumer pauses fetching and memory is
+        bounded by the window rather than the total result size.
+        :param requests_list: Iterable of request configuration dictionaries
+        :param ordered: Yield results in input order instead of completion order (default False)
+        :param max_in_flight: Window size (default: the HttpClient's max_in_flight)
+        :param client: httpx.AsyncClient to reuse (default: a new client for this call)
+        :param raise_errors: Re-raise the error of a request that failed after its retries instead of yielding None
+        :param client_options: max_connections, max_keepalive_connections or http2 overrides
+        :return: Async generator of (request id, response) tuples; failed requests yield None
+        """
+        window = max_in_flight or self.max_in_flight
+        pending_requests = enumerate(requests_list)
+        running = {}
+        completed = {}  # Out-of-order results held back in ordered mode
+        next_index = 0
+        retry_budget = self.create_retry_budget()
+
+        async with self.client_session(client, **client_options) as client:
+            def schedule():
+                while len(running) + len(completed) < window:
+                    item = next(pending_requests, None)
+                    if item is None:
+                        return
+                    index, request_config = item
+                    task = asyncio.ensure_future(self.fetch(client, request_config, retry_budget))
+                    running[task] = (index, request_config.get('id', request_config['url']))
+
+            try:
+                schedule()
+                while running:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index, identifier = running.pop(task)
+                        if task.exception() is not None:
+                            if raise_errors:
+                                raise task.exception()
+                            logging.error(f"Error occurred: {task.exception()}")
+                            result = None
+                        else:
+                            result = task.result()
+                        if ordered:
+                            completed[index] = (identifier, result)
+                        else:
+                            yield identifier, result
+                    while next_index in completed:
+                        yield completed.pop(next_index)
+                        next_index += 1
+                    schedule()
+            finally:
+                for task in running:
+                    task.cancel()
@@ -0,0 +1,187 @@
+# core/instrumentation.py
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from .lazy import LazyModule
+
+otel_metrics = LazyModule('opentelemetry.metrics', optional=True)
+
+logger = logging.getLogger('core.instrumentation')
+
+METER_NAME = 'functionapp.core'
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('recorder', 'name', 'attributes', 'start', 'memory_start')
+
+    def __init__(self, recorder, name, attributes):
+        self.recorder = recorder
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.memory_start = tracemalloc.get_traced_memory()[0] if self.recorder.trace_memory else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        if self.memory_start is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.attributes['memory_delta_bytes'] = current - self.memory_start
+            self.attributes['memory_peak_bytes'] = peak
+        self.recorder.record(self.name, duration_ms, self.attributes)
+        return False
+
+    def set(self, **attributes):
+        """
+        Add attributes known only inside the span, e.g. a row count or status code.
+        """
+        self.attributes.update(attributes)
+
+
+class Recorder:
+    def __init__(self, enabled=False, log_level=logging.INFO, otel=True, trace_memory=False):
+        """
+        Collects stage timings: each finished span is logged with its attributes as
+        custom_dimensions (the field Application Insights turns into custom properties),
+        recorded in an OpenTelemetry histogram when opentelemetry is installed, and
+        aggregated in process for stats().
+        :param enabled: When False, span() returns a shared no-op span
+        :param log_level: Level of the per-span log records
+        :param otel: Export to OpenTelemetry metrics when the package is installed
+        :param trace_memory: Start tracemalloc and add allocation deltas to spans (slow; for diagnosis)
+        """
+        self.enabled = enabled
+        self.log_level = log_level
+        self.otel = otel
+        self.trace_memory = trace_memory and enabled
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._histogram = None
+        self._counters = {}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Configure from INSTRUMENTATION_ENABLED, INSTRUMENTATION_LOG_LEVEL (default INFO),
+        INSTRUMENTATION_OTEL (default true) and INSTRUMENTATION_MEMORY (default false).
+        """
+        def flag(name, default):
+            return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+        log_level = os.environ.get('INSTRUMENTATION_LOG_LEVEL', 'INFO').upper()
+        if not isinstance(logging.getLevelName(log_level), int):
+            raise ValueError(f"Invalid INSTRUMENTATION_LOG_LEVEL '{log_level}'.")
+        return cls(enabled=flag('INSTRUMENTATION_ENABLED', 'false'), log_level=logging.getLevelName(log_level),
+                   otel=flag('INSTRUMENTATION_OTEL', 'true'), trace_memory=flag('INSTRUMENTATION_MEMORY', 'false'))
+
+    def span(self, name, **attributes):
+        return Span(self, name, attributes) if self.enabled else NOOP_SPAN
+
+    def _meter(self):
+        if not self.otel or not otel_metrics:
+            return None
+        return otel_metrics.get_meter(METER_NAME)
+
+    def record(self, name, duration_ms, attributes):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            if self._histogram is None:
+                meter = self._meter()
+                if meter is not None:
+                    self._histogram = meter.create_histogram('core.stage.duration', unit='ms',
+                                                             description='Duration of instrumented stages')
+        if self._histogram is not None:
+            self._histogram.record(duration_ms, {'stage': name, **_metric_attributes(attributes)})
+        if logger.isEnabledFor(self.log_level):
+            dimensions = {'stage': name, 'duration_ms': round(duration_ms, 3), **attributes}
+            logger.log(self.log_level, f"{name} took {duration_ms:.1f} ms", extra={'custom_dimensions': dimensions})
+
+    def count(self, name, value=1, **attributes):
+        """
+        Add to a counter, e.g. retries or cache hits.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(name, {'count': 0})
+            stats['count'] += value
+            if name not in self._counters:
+                meter = self._meter()
+                if meter is not None:
+                    self._counters[name] = meter.create_counter(name)
+        if name in self._counters:
+            self._counters[name].add(value, _metric_attributes(attributes))
+
+    def stats(self):
+        """
+        :return: {name: {'count', 'total_ms', 'max_ms'}} for spans and {name: {'count'}} for counters
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _metric_attributes(attributes):
+    # Only string and boolean attributes become metric dimensions; counts such as rows stay in the logs
+    return {key: value for key, value in attributes.items() if isinstance(value, (str, bool))}
+
+
+_recorder = Recorder.from_env()
+
+
+def get_recorder():
+    return _recorder
+
+
+def configure(**options):
+    """
+    Replace the process-wide recorder, e.g. configure(enabled=True) in a benchmark.
+    :return: The new Recorder
+    """
+    global _recorder
+    _recorder = Recorder(**options)
+    return _recorder
+
+
+def span(name, **attributes):
+    """
+    Time a stage: with span('db.execute', dbid=dbid) as s: ...; s.set(rows=len(rows)).
+    Returns a shared no-op span when instrumentation is disabled.
+    """
+    recorder = _recorder
+    return Span(recorder, name, attributes) if recorder.enabled else NOOP_SPAN
+
+
+def count(name, value=1, **attributes):
+    _recorder.count(name, value, **attributes)
+
+
+def enabled():
+    return _recorder.enabled
@@ -0,0 +1,204 @@
+# core/keyset.py
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import operator
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import and_, bindparam, column, literal_column, or_, select, text
+from sqlalchemy.sql import Select
+from .serialization import dumps, loads
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+class KeysetError(ValueError):
+    """Raised for invalid paging input: page_size, key bounds or a continuation token."""
+
+
+def _encode_value(value):
+    # Tagged so key values round-trip through the token with their types
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$decimal': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if '$datetime' in value:
+            return datetime.datetime.fromisoformat(value['$datetime'])
+        if '$date' in value:
+            return datetime.date.fromisoformat(value['$date'])
+        if '$decimal' in value:
+            return Decimal(value['$decimal'])
+        raise KeysetError("Invalid continuation token.")
+    return value
+
+
+def encode_token(after, upper, fingerprint):
+    """
+    :param after: Key values of the last row returned
+    :param upper: Exclusive upper key bound of the read, or None
+    :param fingerprint: Fingerprint of the query and params the token is valid for
+    :return: Opaque URL-safe continuation token
+    """
+    payload = {
+        'a': [_encode_value(value) for value in after],
+        'u': None if upper is None else [_encode_value(value) for value in upper],
+        'f': fingerprint,
+    }
+    return base64.urlsafe_b64encode(dumps(payload)).rstrip(b'=').decode('ascii')
+
+
+def decode_token(token, fingerprint):
+    """
+    :return: Tuple of (key values to continue after, upper key bound or None)
+    """
+    try:
+        payload = loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        after, upper = payload['a'], payload['u']
+        token_fingerprint = payload['f']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise KeysetError("Invalid continuation token.") from None
+    if not isinstance(after, list) or not (upper is None or isinstance(upper, list)):
+        raise KeysetError("Invalid continuation token.")
+    if token_fingerprint != fingerprint:
+        raise KeysetError("Continuation token was issued for a different query or params.")
+    return [_decode_value(value) for value in after], None if upper is None else [_decode_value(value) for value in upper]
+
+
+def _compare(keys, op, prefix):
+    """
+    Lexicographic comparison of the key columns with bound values, expanded into
+    AND/OR terms instead of a row-value comparison so SQL Server can run it too:
+    (a, b) > (:a, :b) becomes a > :a OR (a = :a AND b > :b).
+    :param op: '>', '>=' or '<'
+    """
+    strict = operator.lt if op == '<' else operator.gt
+    last = operator.ge if op == '>=' else strict
+    values = [bindparam(f'{prefix}_{i}') for i in range(len(keys))]
+    terms = []
+    for i, key in enumerate(keys):
+        equal_prefix = [keys[j] == values[j] for j in range(i)]
+        terms.append(and_(*equal_prefix, (last if i == len(keys) - 1 else strict)(key, values[i])))
+    return or_(*terms)
+
+
+class PageBatches:
+    def __init__(self, rows, continuation):
+        """
+        One keyset page as the single row batch result encoders expect; continuation
+        is the token for the next page, None on the last one.
+        """
+        self.rows = rows
+        self.continuation = continuation
+
+    def __iter__(self):
+        if self.rows:
+            yield self.rows
+
+
+class KeysetPage(NamedTuple):
+    statement: Select
+    params: Dict[str, Any]
+    page_size: int
+    columns: Tuple[str, ...]
+    upper: Optional[List[Any]]
+    fingerprint: str
+
+    def batches(self, columns, rows):
+        """
+        :param columns: Column names of the fetched page
+        :param rows: Up to page_size + 1 row tuples; the extra row only shows that another page follows
+        :return: PageBatches with the first page_size rows and the next continuation token
+        """
+        if len(rows) <= self.page_size:
+            return PageBatches(rows, None)
+        rows = rows[:self.page_size]
+        try:
+            indexes = [columns.index(name) for name in self.columns]
+        except ValueError:
+            raise ValueError(f"Keyset columns {', '.join(self.columns)} must all be selected by the query.") from None
+        after = [rows[-1][index] for index in indexes]
+        return PageBatches(rows, encode_token(after, self.upper, self.fingerprint))
+
+
+class KeysetQuery:
+    def __init__(self, dbid, key, sql, columns):
+        """
+        Keyset (seek) pagination of a registered query. The query is wrapped as a
+        derived table, filtered on its sort key and ordered by it, so each page
+        seeks past the last key of the previous one instead of skipping rows with
+        OFFSET and deep pages cost the same as the first. LIMIT or TOP is rendered
+        by the dialect of the database the page runs on.
+        :param sql: SQL of the registered query
+        :param columns: Output columns forming a unique, non-null sort key
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        if not columns or not all(isinstance(name, str) and name for name in columns):
+            raise ValueError(f"'keyset' of query '{key}' must be a column name or a non-empty list of column names.")
+        self.dbid = dbid
+        self.key = key
+        self.columns = tuple(columns)
+
+        page = text(sql).columns(*[column(name) for name in self.columns]).subquery('keyset_page')
+        keys = [page.c[name] for name in self.columns]
+        base = select(literal_column('*')).select_from(page).order_by(*keys)
+        # One statement per combination of bounds: (lower bound operator, upper bound operator)
+        self.statements = {}
+        for lower in (None, '>', '>='):
+            for upper in (None, '<'):
+                conditions = [_compare(keys, op, prefix) for op, prefix in ((lower, 'keyset_lower'), (upper, 'keyset_upper')) if op]
+                self.statements[(lower, upper)] = base.where(*conditions)
+
+    def fingerprint(self, params):
+        key = json.dumps([self.dbid, self.key, params], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    def key_values(self, value, name):
+        if value is None:
+            return None
+        values = value if isinstance(value, list) else [value]
+        if len(values) != len(self.columns):
+            raise KeysetError(f"'{name}' must give a value for each keyset column: {', '.join(self.columns)}.")
+        return values
+
+    def page(self, params, page_size=DEFAULT_PAGE_SIZE, continuation=None, key_from=None, key_to=None):
+        """
+        Build the statement for one page. A read of a key range starts at key_from
+        (inclusive) and stops before key_to (exclusive), so clients can split a table
+        into ranges and read them in parallel; later pages of the range are requested
+        with the continuation token alone, which carries the position and key_to.
+        :param params: Bound params of the registered query
+        :param page_size: Rows per page
+        :param continuation: Token from the previous page (optional)
+        :param key_from: Lower key bound, a value or a list with one value per keyset column (optional)
+        :param key_to: Upper key bound (optional)
+        :return: KeysetPage
+        """
+        if isinstance(page_size, bool) or not isinstance(page_size, int) or page_size <= 0:
+            raise KeysetError("'page_size' must be a positive integer.")
+        fingerprint = self.fingerprint(params)
+        if continuation:
+            lower, upper = decode_token(continuation, fingerprint)
+            lower_op = '>'
+            if len(lower) != len(self.columns) or (upper is not None and len(upper) != len(self.columns)):
+                raise KeysetError("Invalid continuation token.")
+        else:
+            lower, upper = self.key_values(key_from, 'key_from'), self.key_values(key_to, 'key_to')
+            lower_op = '>=' if lower is not None else None
+
+        bound = dict(params or {})
+        for prefix, values in (('keyset_lower', lower), ('keyset_upper', upper)):
+            if values is not None:
+                bound.update({f'{prefix}_{i}': value for i, value in enumerate(values)})
+        # An int limit, so SQL Server renders TOP rather than a ROW_NUMBER() wrapper
+        statement = self.statements[(lower_op, '<' if upper is not None else None)].limit(page_size + 1)
+        return KeysetPage(statement, bound, page_size, self.columns, upper, fingerprint)
@@ -0,0 +1,45 @@
+# core/lazy.py
+import importlib
+import threading
+
+
+class LazyModule:
+    def __init__(self, name: str, optional: bool = False):
+        """
+        Module imported on first attribute access instead of when the importing module
+        loads, so a function only pays for the heavy dependencies it actually uses.
+        :param name: Module to import, e.g. 'pyarrow' or 'pyarrow.feather'
+        :param optional: If True a missing module makes the proxy falsy instead of raising
+        """
+        self._name = name
+        self._optional = optional
+        self._module = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except ImportError:
+                        if not self._optional:
+                            raise
+                    self._loaded = True
+        return self._module
+
+    def __bool__(self):
+        """
+        True if the module is installed; checking imports it.
+        """
+        return self._load() is not None
+
+    def __getattr__(self, attribute):
+        module = self._load()
+        if module is None:
+            raise ImportError(f"The optional module '{self._name}' is not installed.")
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return f"<LazyModule {self._name!r}{' (loaded)' if self._loaded else ''}>"
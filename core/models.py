@@ -1,11 +1,12 @@
 from pydantic import BaseModel
-from typing import Dict, Any, List, Literal
+from typing import Dict, Any, List, Literal, Optional
 
 class ExpenseReport(BaseModel):
     id: int
     amount: float
     description: str
     date: str
+    updated_at: Optional[str] = None  # ISO 8601 timestamp; drives incremental sync
 
 class JoinedData(BaseModel):
     expense_id: int
@@ -25,3 +26,7 @@ class RequestConfig(BaseModel):
     method: Literal['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS'] = 'GET'  # Constrained with valid HTTP methods
     id: Any
     inputData: List[InputDataItem]
+    maxInFlight: Optional[int] = None  # Maximum concurrent requests; HttpClient default when not set
+    maxConnections: Optional[int] = None  # httpx.Limits max_connections
+    maxKeepaliveConnections: Optional[int] = None  # httpx.Limits max_keepalive_connections
+    http2: Optional[bool] = None  # Requires the h2 package; HttpClient default when not set
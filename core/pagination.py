@@ -0,0 +1,256 @@
+# core/pagination.py
+import asyncio
+import math
+from typing import Optional
+from urllib.parse import urljoin
+from .lazy import LazyModule
+
+httpx = LazyModule('httpx')
+
+
+def extract(payload, key):
+    """
+    Read a dotted key ('meta.total') from a JSON payload.
+    :param key: Dotted path, or None for the payload itself
+    :return: The value, or None when any part of the path is missing
+    """
+    if key is None:
+        return payload
+    for part in key.split('.'):
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(part)
+    return payload
+
+
+class PageNumberPagination:
+    def __init__(self, page_param='page', items_key='results', total_pages_key=None, total_count_key=None,
+                 page_size=None, size_param=None, first_page=1):
+        """
+        APIs addressed by page number (?page=1, ?page=2, ...).
+        :param page_param: Query parameter carrying the page number (default 'page')
+        :param items_key: Dotted key of the item list in each page, None if the page is the list (default 'results')
+        :param total_pages_key: Dotted key of the page count in the first page (optional)
+        :param total_count_key: Dotted key of the item count in the first page; needs page_size (optional)
+        :param page_size: Items per page, sent as size_param when given
+        :param size_param: Query parameter carrying the page size (optional)
+        :param first_page: Number of the first page (default 1)
+        """
+        self.page_param = page_param
+        self.items_key = items_key
+        self.total_pages_key = total_pages_key
+        self.total_count_key = total_count_key
+        self.page_size = page_size
+        self.size_param = size_param
+        self.first_page = first_page
+
+    def page_params(self, index):
+        params = {self.page_param: self.first_page + index}
+        if self.size_param and self.page_size:
+            params[self.size_param] = self.page_size
+        return params
+
+    def total_pages(self, first_page) -> Optional[int]:
+        total_pages = extract(first_page, self.total_pages_key) if self.total_pages_key else None
+        if total_pages is not None:
+            return int(total_pages)
+        total_count = extract(first_page, self.total_count_key) if self.total_count_key else None
+        if total_count is not None and self.page_size:
+            return math.ceil(int(total_count) / self.page_size)
+        return None
+
+    def items(self, page):
+        return extract(page, self.items_key) or []
+
+
+class OffsetPagination:
+    def __init__(self, limit=50, offset_param='offset', limit_param='limit', items_key='results',
+                 total_count_key=None, start_offset=0):
+        """
+        APIs addressed by offset and limit (?offset=0&limit=50, ?offset=50&limit=50, ...).
+        :param limit: Items per request (default 50)
+        :param offset_param: Query parameter carrying the offset (default 'offset')
+        :param limit_param: Query parameter carrying the limit (default 'limit')
+        :param items_key: Dotted key of the item list in each page, None if the page is the list (default 'results')
+        :param total_count_key: Dotted key of the item count in the first page (optional)
+        :param start_offset: Offset of the first request (default 0)
+        """
+        self.limit = limit
+        self.page_size = limit
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.items_key = items_key
+        self.total_count_key = total_count_key
+        self.start_offset = start_offset
+
+    def page_params(self, index):
+        return {self.offset_param: self.start_offset + index * self.limit, self.limit_param: self.limit}
+
+    def total_pages(self, first_page) -> Optional[int]:
+        total_count = extract(first_page, self.total_count_key) if self.total_count_key else None
+        if total_count is None:
+            return None
+        return math.ceil(max(0, int(total_count) - self.start_offset) / self.limit)
+
+    def items(self, page):
+        return extract(page, self.items_key) or []
+
+
+class CursorPagination:
+    def __init__(self, cursor_param='cursor', next_cursor_key='next_cursor', next_link_key=None, items_key='results'):
+        """
+        APIs where each page names the next one, by cursor token or by next link.
+        :param cursor_param: Query parameter carrying the cursor (default 'cursor')
+        :param next_cursor_key: Dotted key of the next cursor in each page (default 'next_cursor')
+        :param next_link_key: Dotted key of the next page URL; takes precedence over the cursor (optional)
+        :param items_key: Dotted key of the item list in each page, None if the page is the list (default 'results')
+        """
+        self.cursor_param = cursor_param
+        self.next_cursor_key = next_cursor_key
+        self.next_link_key = next_link_key
+        self.items_key = items_key
+
+    def next_request(self, url, params, page):
+        """
+        :return: (url, params) of the next page, or None on the last page
+        """
+        if self.next_link_key:
+            next_link = extract(page, self.next_link_key)
+            if not next_link:
+                return None
+            # httpx replaces a URL's query string with explicit params, so split them out
+            next_url = httpx.URL(urljoin(url, next_link))
+            return str(next_url.copy_with(query=None)), dict(next_url.params)
+        cursor = extract(page, self.next_cursor_key)
+        if not cursor:
+            return None
+        return url, {**params, self.cursor_param: cursor}
+
+    def items(self, page):
+        return extract(page, self.items_key) or []
+
+
+class Paginator:
+    def __init__(self, strategy, http_client=None):
+        """
+        Fetch every page of a paginated API.
+        Numbered strategies (page number, offset/limit) probe the first page for the
+        total and fan the remaining pages out concurrently within the HttpClient's
+        max_in_flight; without a total, pages are fetched in windows of max_in_flight
+        until an empty or short page. Cursor strategies request the next page as soon
+        as its cursor is known, while the caller processes the current one. A page
+        that still fails after the HttpClient's retries raises its error rather than
+        being taken for the end of the data.
+        :param strategy: PageNumberPagination, OffsetPagination or CursorPagination
+        :param http_client: HttpClient providing retries and concurrency limits (default HttpClient())
+        """
+        from .http_client import HttpClient
+        self.strategy = strategy
+        self.http_client = http_client or HttpClient()
+
+    async def iter_pages(self, url, params=None, headers=None, max_pages=None, client=None):
+        """
+        :param url: API endpoint URL
+        :param params: Query parameters sent with every page
+        :param headers: Headers sent with every page
+        :param max_pages: Stop after this many pages (optional)
+        :param client: httpx.AsyncClient to reuse (optional)
+        :return: Async generator of page payloads in page order
+        """
+        async with self.http_client.client_session(client) as client:
+            if isinstance(self.strategy, CursorPagination):
+                pages = self._iter_cursor_pages(client, url, params or {}, headers or {}, max_pages)
+            else:
+                pages = self._iter_numbered_pages(client, url, params or {}, headers or {}, max_pages)
+            try:
+                async for page in pages:
+                    yield page
+            finally:
+                await pages.aclose()
+
+    async def iter_items(self, url, params=None, headers=None, max_pages=None, client=None):
+        async for page in self.iter_pages(url, params, headers, max_pages, client):
+            for item in self.strategy.items(page):
+                yield item
+
+    async def fetch_all(self, url, params=None, headers=None, max_pages=None, client=None):
+        """
+        :return: Combined list of the items of every page
+        """
+        return [item async for item in self.iter_items(url, params, headers, max_pages, client)]
+
+    def _request(self, url, params, headers, index):
+        return {
+            'method': 'GET',
+            'url': url,
+            'params': {**params, **self.strategy.page_params(index)},
+            'headers': headers,
+            'id': f"{url} page {index + 1}"
+        }
+
+    async def _iter_numbered_pages(self, client, url, params, headers, max_pages):
+        retry_budget = self.http_client.create_retry_budget()
+        first_page = await self.http_client.fetch(client, self._request(url, params, headers, 0), retry_budget)
+        if first_page is None or not self.strategy.items(first_page):
+            return
+        yield first_page
+
+        page_size = getattr(self.strategy, 'page_size', None)
+        total_pages = self.strategy.total_pages(first_page)
+        if total_pages is None and page_size and len(self.strategy.items(first_page)) < page_size:
+            return  # A short first page is the only page
+        if max_pages is not None:
+            total_pages = max_pages if total_pages is None else min(total_pages, max_pages)
+
+        if total_pages is not None:
+            requests = (self._request(url, params, headers, index) for index in range(1, total_pages))
+            async for _, page in self.http_client.iter_fetch(requests, ordered=True, client=client, raise_errors=True):
+                if page is not None:
+                    yield page
+            return
+
+        # Unknown total: probe ahead one window at a time until a page comes back empty or short
+        window = self.http_client.max_in_flight
+        index = 1
+        while True:
+            requests = [self._request(url, params, headers, i) for i in range(index, index + window)]
+            pages = self.http_client.iter_fetch(requests, ordered=True, client=client, raise_errors=True)
+            try:
+                async for _, page in pages:
+                    items = self.strategy.items(page) if page is not None else []  # A 404 past the last page
+                    if not items:
+                        return
+                    yield page
+                    if page_size and len(items) < page_size:
+                        return
+            finally:
+                await pages.aclose()
+            index += window
+
+    async def _iter_cursor_pages(self, client, url, params, headers, max_pages):
+        retry_budget = self.http_client.create_retry_budget()
+
+        def start(request_url, request_params):
+            request = {'method': 'GET', 'url': request_url, 'params': request_params, 'headers': headers}
+            return asyncio.ensure_future(self.http_client.fetch(client, request, retry_budget))
+
+        request_url, request_params = url, params
+        task = start(request_url, request_params)
+        fetched = 0
+        try:
+            while task is not None:
+                page = await task
+                task = None
+                if page is None:
+                    return
+                fetched += 1
+                next_request = self.strategy.next_request(request_url, request_params, page)
+                if next_request == (request_url, request_params):
+                    next_request = None  # The page points at itself; stop instead of looping
+                if next_request is not None and (max_pages is None or fetched < max_pages):
+                    request_url, request_params = next_request
+                    task = start(request_url, request_params)  # In flight while the caller handles this page
+                yield page
+        finally:
+            if task is not None:
+                task.cancel()
@@ -0,0 +1,146 @@
+# core/parallel_join.py
+import atexit
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from .lazy import LazyModule
+
+pa = LazyModule('pyarrow', optional=True)
+
+# Joins with fewer expense rows than this stay in the calling thread
+PARALLEL_JOIN_THRESHOLD = int(os.environ.get('PARALLEL_JOIN_THRESHOLD', '200000'))
+PARALLEL_JOIN_WORKERS = int(os.environ.get('PARALLEL_JOIN_WORKERS', '0')) or os.cpu_count() or 1
+
+POSITION = '_position'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Process pool shared by every parallel join in the worker, created on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned, not forked: the Functions host process already runs threads
+            _executor = ProcessPoolExecutor(max_workers=PARALLEL_JOIN_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+def should_parallelize(rows, workers=None):
+    return (workers or PARALLEL_JOIN_WORKERS) > 1 and rows >= PARALLEL_JOIN_THRESHOLD
+
+
+def partition(df, key, partitions):
+    """
+    Hash-partition df on an integer key column, keeping the row order within each partition.
+    :return: List of partitions DataFrames
+    """
+    buckets = pd.util.hash_array(df[key].to_numpy()) % np.uint64(partitions)
+    return [df[buckets == p] for p in range(partitions)]
+
+
+class SharedPartitions:
+    def __init__(self, partitions):
+        """
+        Partitions written once as an Arrow IPC file into a shared memory block, so
+        pool workers read their partition in place instead of receiving a pickled frame.
+        :param partitions: List of DataFrames with the same columns
+        """
+        batches = [pa.RecordBatch.from_pandas(part, preserve_index=False) for part in partitions]
+        sink = pa.MockOutputStream()
+        self._write(sink, batches)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, sink.size()))
+        self._write(pa.FixedSizeBufferWriter(pa.py_buffer(self.memory.buf)), batches)
+
+    @staticmethod
+    def _write(sink, batches):
+        with pa.ipc.new_file(sink, batches[0].schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def read_shared_partition(name, index):
+    """
+    Copy one partition out of a SharedPartitions block into a DataFrame.
+    """
+    # Pool processes share the creating process's resource tracker, which unlinks the block
+    memory = shared_memory.SharedMemory(name=name, **({'track': False} if sys.version_info >= (3, 13) else {}))
+    try:
+        buffer = pa.py_buffer(memory.buf)
+        batch = pa.ipc.open_file(buffer).get_batch(index)
+        # Copy just this partition out: Arrow-backed pandas columns would otherwise keep viewing the block
+        local_batch = pa.ipc.read_record_batch(batch.serialize(), batch.schema)
+        del batch, buffer  # Release every view of the block before closing it
+        return local_batch.to_pandas()
+    finally:
+        memory.close()
+
+
+def join_partition(expense_part, csv_part):
+    """
+    Join one partition and encode it as NDJSON, one line per joined row.
+    Both arguments are DataFrames, or (shared memory name, partition index) pairs.
+    :return: (positions of the expense rows of each line, NDJSON bytes)
+    """
+    from .data_processor import JOINED_COLUMNS, DataProcessor, join_frames
+    if isinstance(expense_part, tuple):
+        expense_part = read_shared_partition(*expense_part)
+        csv_part = read_shared_partition(*csv_part)
+    csv_indexed = csv_part.set_index('expense_id')
+    joined_df = join_frames(expense_part, csv_indexed, JOINED_COLUMNS + [POSITION])
+    positions = joined_df.pop(POSITION).to_numpy()
+    return positions, DataProcessor.ndjson(joined_df) if len(joined_df) else b''
+
+
+def parallel_join_lines(expense_df, csv_df, workers=None):
+    """
+    Join validated expense and CSV frames across a process pool.
+    Both sides are hash-partitioned on expense_id, each partition is joined and
+    encoded in its own process, and the encoded rows are merged back into the
+    order a single-threaded join produces.
+    :param expense_df: Validated expense frame (EXPENSE_DTYPES)
+    :param csv_df: Validated CSV frame with an expense_id column (CSV_DTYPES)
+    :param workers: Number of partitions (default PARALLEL_JOIN_WORKERS)
+    :return: List of JSON encoded rows (bytes), in join order
+    """
+    workers = workers or PARALLEL_JOIN_WORKERS
+    expense_df = expense_df.assign(**{POSITION: np.arange(len(expense_df))})
+    expense_parts = partition(expense_df, 'id', workers)
+    csv_parts = partition(csv_df, 'expense_id', workers)
+
+    shared = []
+    try:
+        if pa:
+            shared = [SharedPartitions(expense_parts), SharedPartitions(csv_parts)]
+            arguments = [((shared[0].name, p), (shared[1].name, p)) for p in range(workers)]
+        else:
+            arguments = list(zip(expense_parts, csv_parts))
+        del expense_parts, csv_parts
+        results = list(get_executor().map(join_partition, *zip(*arguments)))
+    finally:
+        for block in shared:
+            block.close()
+
+    positions = np.concatenate([result[0] for result in results])
+    lines = [line for _, payload in results for line in payload.splitlines()]
+    logging.info(f"Parallel join of {len(expense_df)} rows across {workers} processes produced {len(lines)} rows.")
+    # Stable, so rows matching one expense keep their CSV order
+    return [lines[i] for i in np.argsort(positions, kind='stable')]
@@ -1,37 +1,194 @@
 # shared_code/query_manager.py
 import json
+import os
+import re
 import threading
 import logging
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+from sqlalchemy import bindparam, literal_column, select, text
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import TextClause
+from .config_watcher import ConfigWatcher
+from .db_client import NO_LIMITS, QueryLimits
+from .keyset import KeysetQuery
+
+DEFAULT_QUERY_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/query_config.json')
+ORDER_BY = re.compile(r'\bORDER\s+BY\b', re.IGNORECASE)
+TRAILING_SEMICOLONS = re.compile(r'[\s;]+$')
+
+
+class QueryParamsError(ValueError):
+    """Raised when request params do not match the bound parameters of a query."""
+
+
+class CompiledQuery(NamedTuple):
+    dbid: str
+    key: str
+    statement: TextClause
+    param_names: FrozenSet[str]
+    config: Dict[str, Any]
+    coalesced_statement: Optional[TextClause] = None
+    limits: QueryLimits = NO_LIMITS
+    keyset: Optional[KeysetQuery] = None
+    limited_statement: Optional[Select] = None
+
+    @property
+    def sql(self):
+        return self.config['sql']
+
+    @property
+    def bounded_statement(self):
+        """
+        The statement to execute: limited_statement when the query sets max_rows, so the
+        database returns at most max_rows + 1 rows, otherwise statement.
+        """
+        return self.statement if self.limited_statement is None else self.limited_statement
+
+    def validate_params(self, params):
+        supplied = set(params or {})
+        missing = self.param_names - supplied
+        unexpected = supplied - self.param_names
+        if missing or unexpected:
+            problems = []
+            if missing:
+                problems.append(f"missing: {', '.join(sorted(missing))}")
+            if unexpected:
+                problems.append(f"unexpected: {', '.join(sorted(unexpected))}")
+            raise QueryParamsError(
+                f"Invalid params for query '{self.key}' on database '{self.dbid}' ({'; '.join(problems)})."
+            )
+
 
 class QueryManager:
     _instances = {}
     _lock = threading.Lock()
 
-    def __new__(cls, query_config_path):
+    def __new__(cls, query_config_path=None):
+        query_config_path = os.path.realpath(query_config_path or DEFAULT_QUERY_CONFIG_PATH)
         with cls._lock:
             if query_config_path not in cls._instances:
                 cls._instances[query_config_path] = super(QueryManager, cls).__new__(cls)
         return cls._instances[query_config_path]
 
-    def __init__(self, query_config_path):
+    def __init__(self, query_config_path=None):
         if hasattr(self, 'initialized'):
             return
         self.initialized = True
+        self.query_config_path = os.path.realpath(query_config_path or DEFAULT_QUERY_CONFIG_PATH)
         self.queries = {}
-        self.load_queries(query_config_path)
+        self.registry = {}
+        self.reload_count = 0
+        self.config_version = None
+        self.watcher = ConfigWatcher(self.query_config_path)
+        self.load_queries(self.query_config_path)
 
-    def load_queries(self, query_config_path):
+    def load_queries(self, query_config_path, content=None):
         try:
-            with open(query_config_path, 'r') as file:
-                self.queries = json.load(file)
-            logging.info(f"Query configurations loaded from {query_config_path}.")
+            if content is None:
+                content = self.watcher.load()
+            queries = json.loads(content)
+            # Build the complete registry first, then swap it in with a single assignment
+            self.registry = self.compile_queries(queries)
+            self.queries = queries
+            self.config_version = self.watcher.version
+            logging.info(f"Query configurations loaded from {query_config_path} (version {self.config_version}).")
         except Exception as e:
             logging.error(f"Error loading query configurations: {e}")
             raise
 
+    def refresh(self, force=False):
+        """
+        Reload the query configuration if the file changed on disk. A config that
+        fails to parse or compile is logged and the current registry is kept.
+        :param force: Check the file now instead of waiting for the watcher interval
+        :return: True if a new registry was swapped in
+        """
+        content = self.watcher.poll(force=force)
+        if content is None:
+            return False
+        try:
+            self.load_queries(self.query_config_path, content)
+        except Exception:
+            return False
+        self.reload_count += 1
+        return True
+
+    @staticmethod
+    def compile_queries(queries):
+        """
+        Build the (dbid, key) -> CompiledQuery index, compiling each statement once
+        and extracting its bound parameter names and limits (timeout_ms, max_rows).
+        Queries declaring a 'keyset' sort key also get their keyset pagination statements,
+        and queries setting max_rows a statement limited to max_rows + 1 rows.
+        :param queries: Parsed query_config.json content
+        :return: Dictionary keyed by (dbid, query_key)
+        """
+        registry = {}
+        for dbid, db_queries in queries.items():
+            for query in db_queries.get('queries', []):
+                statement = text(query['sql'])
+                param_names = frozenset(statement.compile().params)
+                coalesced_statement = None
+                if 'coalesce' in query:
+                    coalesced_statement = QueryManager.compile_coalesced(query['sql'], query['coalesce']['param'])
+                keyset = None
+                if 'keyset' in query:
+                    keyset = KeysetQuery(dbid, query['key'], query['sql'], query['keyset'])
+                limits = QueryLimits.from_config(query)
+                limited_statement = None
+                if limits.max_rows:
+                    limited_statement = QueryManager.compile_limited(dbid, query['key'], query['sql'], limits.max_rows)
+                registry[(dbid, query['key'])] = CompiledQuery(
+                    dbid, query['key'], statement, param_names, query, coalesced_statement,
+                    limits, keyset, limited_statement
+                )
+        return registry
+
+    @staticmethod
+    def compile_limited(dbid, key, sql, max_rows):
+        """
+        Wrap a query as a derived table limited to max_rows + 1 rows (the extra row shows
+        that the result was truncated), so the database stops producing rows instead of
+        the driver reading them all: PyMySQL buffers whole results, and closing an
+        unfinished server-side cursor drains it. The dialect renders LIMIT or TOP.
+        :return: Select, or None for queries with ORDER BY, which a derived table would
+            not keep (SQL Server rejects it, MySQL may ignore it), and for SQL that cannot
+            be nested once trailing semicolons are stripped (';' or a '--' comment)
+        """
+        sql = TRAILING_SEMICOLONS.sub('', sql)
+        if ORDER_BY.search(sql):
+            reason = "queries with ORDER BY are not wrapped in a LIMIT"
+        elif ';' in sql or '--' in sql:
+            reason = "SQL with ';' or a '--' comment is not wrapped in a LIMIT"
+        else:
+            limited = text(sql).columns().subquery('limited')
+            return select(literal_column('*')).select_from(limited).limit(max_rows + 1)
+        logging.warning(f"max_rows of query '{key}' on '{dbid}' is enforced client-side only: {reason}.")
+        return None
+
+    @staticmethod
+    def compile_coalesced(sql, param):
+        """
+        Rewrite an equality predicate on a parameter (`column = :param`) into an IN-list
+        (`column IN :param`) so several lookups can be answered by one statement.
+        :param sql: SQL of the registered query
+        :param param: Name of the bound parameter to expand
+        :return: TextClause with an expanding bind parameter
+        """
+        pattern = re.compile(rf'([\w.]+)\s*=\s*:{re.escape(param)}\b')
+        if len(pattern.findall(sql)) != 1:
+            raise ValueError(f"Cannot coalesce on ':{param}': expected exactly one '<column> = :{param}' predicate.")
+        return text(pattern.sub(rf'\1 IN :{param}', sql)).bindparams(bindparam(param, expanding=True))
+
+    def get_compiled_query(self, dbid, query_key):
+        self.refresh()
+        try:
+            return self.registry[(dbid, query_key)]
+        except KeyError:
+            raise ValueError(f"Query with key '{query_key}' not found for database '{dbid}'.") from None
+
     def get_query(self, dbid, query_key):
-        db_queries = self.queries.get(dbid, {}).get('queries', [])
-        for query in db_queries:
-            if query['key'] == query_key:
-                return query['sql']
-        raise ValueError(f"Query with key '{query_key}' not found for database '{dbid}'.")
+        return self.get_compiled_query(dbid, query_key).sql
+
+    def get_query_config(self, dbid, query_key):
+        return self.get_compiled_query(dbid, query_key).config
@@ -0,0 +1,183 @@
+# core/rate_limit.py
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised when requests to a host are short-circuited after repeated failures."""
+
+
+class TokenBucket:
+    def __init__(self, rate=50.0, min_rate=1.0, max_rate=500.0, increase=1.0):
+        """
+        Adaptive token bucket: the rate is halved and requests pause for Retry-After
+        whenever the upstream throttles, and grows additively again on success.
+        :param rate: Initial requests per second (default 50)
+        :param min_rate: Lower bound for the learned rate (default 1)
+        :param max_rate: Upper bound for the learned rate (default 500)
+        :param increase: Requests per second added after each successful response (default 1)
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.tokens = rate
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, self.rate)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        Fail fast after consecutive failures; after reset_timeout one trial request
+        is let through and its outcome closes or re-opens the circuit. A trial that
+        ends without an outcome (throttled or cancelled) is released, and one that
+        has not ended after another reset_timeout is replaced by a new trial.
+        :param failure_threshold: Consecutive failures that open the circuit (default 5)
+        :param reset_timeout: Seconds to stay open before a trial request (default 30)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+
+    def before_request(self, host=''):
+        """
+        :return: True if this request is the trial request, which must end in
+            record_success, record_failure or release_trial
+        :raise CircuitOpenError: When the circuit is open
+        """
+        if self.state == self.CLOSED:
+            return False
+        now = time.monotonic()
+        if (self.state == self.OPEN and now - self.opened_at >= self.reset_timeout) or \
+                (self.state == self.HALF_OPEN and now - self.trial_started_at >= self.reset_timeout):
+            self.state = self.HALF_OPEN
+            self.trial_started_at = now
+            return True
+        raise CircuitOpenError(f"Circuit open for host '{host}'; failing fast.")
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """
+        End a trial request that neither succeeded nor failed, e.g. a 429 or a cancelled
+        task; the circuit stays open past reset_timeout, so the next request is a new trial.
+        """
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+
+class RetryBudget:
+    def __init__(self, ratio=0.2, min_retries=10):
+        """
+        Caps retries across a batch to a fraction of its requests, so a failing
+        upstream is not hit with a multiple of the original load.
+        :param ratio: Retries allowed per request made (default 0.2)
+        :param min_retries: Retries always allowed regardless of batch size (default 10)
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_spend(self):
+        if self.retries >= self.min_retries + self.ratio * self.requests:
+            return False
+        self.retries += 1
+        return True
+
+
+class HostRegistry:
+    def __init__(self, factory):
+        """
+        Lazily created per-host instances (token buckets, circuit breakers).
+        :param factory: Callable with no arguments creating the instance for a new host
+        """
+        self.factory = factory
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            if host not in self._items:
+                self._items[host] = self.factory()
+            return self._items[host]
+
+
+# Shared by every HttpClient in the worker unless one is passed explicitly
+DEFAULT_RATE_LIMITERS = HostRegistry(TokenBucket)
+DEFAULT_CIRCUIT_BREAKERS = HostRegistry(CircuitBreaker)
+
+
+def decorrelated_jitter(previous, base, cap):
+    """
+    Decorrelated jitter backoff: sleep = min(cap, uniform(base, previous * 3)).
+    :param previous: Previous sleep in seconds (use base for the first retry)
+    :param base: Minimum sleep in seconds
+    :param cap: Maximum sleep in seconds
+    """
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+    :return: Seconds to wait, or None when the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
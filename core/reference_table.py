@@ -0,0 +1,105 @@
+# core/reference_table.py
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import pandas as pd
+from .data_processor import CSV_DTYPES, validate_frame
+from .instrumentation import span
+from .lazy import LazyModule
+
+feather = LazyModule('pyarrow.feather', optional=True)
+
+
+class ReferenceTable:
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __new__(cls, csv_path, cache_dir=None):
+        csv_path = os.path.realpath(csv_path)
+        with cls._lock:
+            if csv_path not in cls._instances:
+                cls._instances[csv_path] = super(ReferenceTable, cls).__new__(cls)
+        return cls._instances[csv_path]
+
+    def __init__(self, csv_path, cache_dir=None):
+        """
+        Reference CSV parsed once per worker with explicit dtypes and indexed on expense_id.
+        The parsed table is also written as a Feather file next to other workers' copies,
+        so a new worker memory-maps it instead of parsing the CSV. Both are replaced when
+        the CSV's mtime or size changes.
+        :param csv_path: Path of the reference CSV
+        :param cache_dir: Directory for Feather files (default REFERENCE_CACHE_DIR or the temp directory)
+        """
+        if hasattr(self, 'initialized'):
+            return
+        self.initialized = True
+        self.csv_path = os.path.realpath(csv_path)
+        self.cache_dir = cache_dir or os.environ.get('REFERENCE_CACHE_DIR') or tempfile.gettempdir()
+        name = os.path.splitext(os.path.basename(self.csv_path))[0]
+        self.cache_prefix = f"{name}-{hashlib.sha256(self.csv_path.encode()).hexdigest()[:8]}"
+        self.version = None
+        self.load_count = 0
+        self._frame = None
+        self._load_lock = threading.Lock()
+
+    def current_version(self):
+        stat = os.stat(self.csv_path)
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+    def cache_path(self, version):
+        return os.path.join(self.cache_dir, f"{self.cache_prefix}-{version}.feather")
+
+    def frame(self) -> pd.DataFrame:
+        """
+        :return: The reference table indexed on expense_id; treat it as read-only, it is shared
+        """
+        version = self.current_version()
+        if version == self.version:
+            return self._frame
+        with self._load_lock:
+            if version != self.version:
+                frame = self._load(version)
+                # Also builds the index's hash table now rather than in the first request
+                if not frame.index.is_unique:
+                    # Repeated expense_ids are joined to every matching report, as pd.merge did
+                    duplicates = frame.index[frame.index.duplicated()].unique()
+                    logging.warning(f"{self.csv_path} repeats {len(duplicates)} expense_id values "
+                                    f"(e.g. {', '.join(map(str, duplicates[:5]))}); their reports are joined "
+                                    "once per matching row, on the slower non-unique join path.")
+                self._frame, self.version = frame, version
+                self.load_count += 1
+        return self._frame
+
+    def _load(self, version):
+        cache_path = self.cache_path(version)
+        if feather and os.path.exists(cache_path):
+            try:
+                with span('csv.cache_read'):
+                    table = feather.read_table(cache_path, memory_map=True)
+                    frame = table.to_pandas().astype(CSV_DTYPES).set_index('expense_id')
+                logging.info(f"Reference table loaded from {cache_path}.")
+                return frame
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable reference table cache {cache_path}: {e}")
+
+        with span('csv.parse') as parse_span:
+            frame = validate_frame(pd.read_csv(self.csv_path, dtype=CSV_DTYPES), CSV_DTYPES, 'CSV data')
+            parse_span.set(rows=len(frame))
+        logging.info(f"Reference table parsed from {self.csv_path} ({len(frame)} rows).")
+        if feather:
+            self._write_cache(frame, cache_path)
+        return frame.set_index('expense_id')
+
+    def _write_cache(self, frame, cache_path):
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(frame, temp_path, compression='uncompressed')  # Uncompressed can be memory-mapped
+            os.replace(temp_path, cache_path)
+            for stale in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{self.cache_prefix}-*.feather")):
+                if stale != cache_path:
+                    os.remove(stale)
+        except OSError as e:
+            logging.warning(f"Could not write reference table cache {cache_path}: {e}")
@@ -0,0 +1,217 @@
+# core/result_cache.py
+import abc
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheBackend(abc.ABC):
+    """
+    Storage interface for ResultCache. Backends store encoded response bodies and
+    count the entries they evict.
+    """
+    evictions = 0
+
+    @abc.abstractmethod
+    def get(self, key):
+        """
+        :return: The cached value, or None when it is missing or expired
+        """
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl):
+        """
+        :param ttl: Seconds the value stays valid
+        """
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Per-worker LRU cache bounded by the total size of the stored values.
+        :param max_bytes: Maximum total size of cached values
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self.current_bytes -= len(value)
+
+
+class SqliteBackend(CacheBackend):
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        File-backed LRU cache that several workers or local instances can share.
+        :param path: Path of the SQLite database file
+        :param max_bytes: Maximum total size of cached values
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._connection.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE result_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now)
+            )
+            self._connection.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+            while total > self.max_bytes:
+                oldest_key, size = self._connection.execute(
+                    "SELECT key, size FROM result_cache ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                self._connection.execute("DELETE FROM result_cache WHERE key = ?", (oldest_key,))
+                total -= size
+                self.evictions += 1
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url):
+        """
+        Shared cache on Redis. Eviction is left to the server's maxmemory-policy
+        (use allkeys-lru), so evictions are not counted here.
+        :param url: Redis connection URL
+        """
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, px=int(ttl * 1000))
+
+
+_BACKENDS = {
+    'memory': lambda: MemoryBackend(int(os.environ.get('QUERY_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))),
+    'sqlite': lambda: SqliteBackend(
+        os.environ.get('QUERY_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'query_cache.sqlite')),
+        int(os.environ.get('QUERY_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    ),
+    'redis': lambda: RedisBackend(os.environ['QUERY_CACHE_URL']),
+}
+
+
+def register_backend(name, factory):
+    """
+    Make a cache backend selectable through QUERY_CACHE_BACKEND.
+    :param name: Backend name
+    :param factory: Callable with no arguments returning a CacheBackend
+    """
+    _BACKENDS[name] = factory
+
+
+class ResultCache:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def default(cls):
+        """
+        Shared cache for the worker, using the backend named by QUERY_CACHE_BACKEND (default 'memory').
+        """
+        with cls._lock:
+            if cls._instance is None:
+                backend_name = os.environ.get('QUERY_CACHE_BACKEND', 'memory')
+                if backend_name not in _BACKENDS:
+                    raise ValueError(f"Unknown query cache backend '{backend_name}'.")
+                cls._instance = cls(_BACKENDS[backend_name]())
+                logging.info(f"Query result cache initialized with '{backend_name}' backend.")
+            return cls._instance
+
+    @staticmethod
+    def make_key(dbid, query_key, params, *variant):
+        """
+        Build a cache key from the query identity and its params, independent of
+        the order in which params were supplied.
+        :param variant: Anything else the cached value depends on (format, config version)
+        """
+        normalized = json.dumps([dbid, query_key, params or {}, variant], sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=DEFAULT_TTL):
+        self.backend.set(key, value, ttl)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions
+        }
@@ -0,0 +1,167 @@
+# core/result_encoder.py
+import io
+from .lazy import LazyModule
+from .serialization import dumps
+
+pa = LazyModule('pyarrow', optional=True)
+
+
+def _envelope_fields(batches):
+    """
+    Fields the batches add to the JSON envelopes: "truncated" when max_rows cut the
+    result short, and "continuation" for keyset pages (null on the last page).
+    """
+    fields = {}
+    if getattr(batches, 'truncated', False):
+        fields['truncated'] = True
+    if hasattr(batches, 'continuation'):
+        fields['continuation'] = batches.continuation
+    return fields
+
+
+def _encode_rows(columns, batch):
+    return [dumps(dict(zip(columns, row))) for row in batch]
+
+
+def iter_records(columns, batches):
+    """
+    Encode row batches into the standard success envelope, one chunk per batch,
+    followed by the envelope fields of the batches (see _envelope_fields).
+    :param columns: Column names of the result set
+    :param batches: Iterable of row batches as returned by DBClient.stream_query
+    :return: Generator of UTF-8 encoded chunks
+    """
+    yield b'{"status":"success","data":['
+    separator = b''
+    for batch in batches:
+        if batch:
+            # One encoder call per batch; strip the list brackets to splice it into the envelope
+            yield separator + dumps([dict(zip(columns, row)) for row in batch])[1:-1]
+            separator = b','
+    fields = _envelope_fields(batches)
+    yield b'],' + dumps(fields)[1:] if fields else b']}'
+
+
+def iter_ndjson(columns, batches):
+    """
+    Encode row batches as newline-delimited JSON, one chunk per batch.
+    :param columns: Column names of the result set
+    :param batches: Iterable of row batches as returned by DBClient.stream_query
+    :return: Generator of UTF-8 encoded chunks
+    """
+    for batch in batches:
+        rows = _encode_rows(columns, batch)
+        if rows:
+            yield b'\n'.join(rows) + b'\n'
+
+
+def iter_columnar(columns, batches):
+    """
+    Encode row batches as column-major JSON: {"columns": [...], "data": [[...], ...]}
+    where data[i] holds every value of columns[i]. Column names are written once
+    and rows are transposed straight into per-column lists without building dicts.
+    :param columns: Column names of the result set
+    :param batches: Iterable of row batches as returned by DBClient.stream_query
+    :return: Generator with a single UTF-8 encoded chunk
+    """
+    data = [[] for _ in columns]
+    for batch in batches:
+        for values, column_values in zip(data, zip(*batch)):
+            values.extend(column_values)
+
+    response = {
+        'status': 'success',
+        'columns': columns,
+        'data': data
+    }
+    response.update(_envelope_fields(batches))
+    yield dumps(response)
+
+
+def iter_arrow(columns, batches):
+    """
+    Encode row batches as an Arrow IPC stream with one record batch per fetched batch.
+    Each batch's types are inferred on their own. Batches are held back while a
+    column has only been NULL, and the schema is written once every column has a
+    type, promoted across the held batches (int64 and double become double). Later
+    batches are cast to that schema; a cast that would lose data raises ValueError
+    instead of silently truncating.
+    :param columns: Column names of the result set
+    :param batches: Iterable of row batches as returned by DBClient.stream_query
+    :return: Generator of Arrow IPC encoded chunks
+    """
+    if not pa:
+        raise ValueError("The 'arrow' format requires the pyarrow package.")
+
+    sink = io.BytesIO()
+    schema = None
+    writer = None
+    held = []
+    for batch in batches:
+        if not batch:
+            continue
+        arrays = [pa.array(values) for values in zip(*batch)]
+        record_batch = pa.RecordBatch.from_arrays(arrays, names=columns)
+        if writer is not None:
+            writer.write_batch(_cast_batch(record_batch, schema))
+            yield _drain(sink)
+            continue
+        held.append(record_batch)
+        schema = record_batch.schema if schema is None else \
+            pa.unify_schemas([schema, record_batch.schema], promote_options='permissive')
+        if any(pa.types.is_null(field.type) for field in schema):
+            continue
+        writer = pa.ipc.new_stream(sink, schema)
+        for record_batch in held:
+            writer.write_batch(_cast_batch(record_batch, schema))
+        held = []
+        yield _drain(sink)
+
+    if writer is None:
+        # Columns that were NULL in every row keep the null type
+        writer = pa.ipc.new_stream(sink, schema or pa.schema([(name, pa.null()) for name in columns]))
+        for record_batch in held:
+            writer.write_batch(_cast_batch(record_batch, schema))
+    writer.close()
+    yield _drain(sink)
+
+
+def _cast_batch(record_batch, schema):
+    if record_batch.schema.equals(schema):
+        return record_batch
+    arrays = []
+    for array, field in zip(record_batch.columns, schema):
+        try:
+            arrays.append(array.cast(field.type, safe=True))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Column '{field.name}' changed type from {field.type} to {array.type} "
+                             f"after the Arrow schema was written: {e}") from None
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _drain(sink):
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return chunk
+
+
+FORMATS = {
+    'records': (iter_records, 'application/json'),
+    'columnar': (iter_columnar, 'application/json'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'arrow': (iter_arrow, 'application/vnd.apache.arrow.stream'),
+}
+
+
+def get_encoder(output_format):
+    """
+    Look up the encoder and mimetype for a response format.
+    :param output_format: One of FORMATS
+    :return: Tuple of (encoder, mimetype)
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unsupported format '{output_format}'. Expected one of: {', '.join(FORMATS)}.")
+    if output_format == 'arrow' and not pa:
+        raise ValueError("The 'arrow' format requires the pyarrow package.")
+    return FORMATS[output_format]
@@ -0,0 +1,154 @@
+# core/serialization.py
+import base64
+import datetime
+import decimal
+import gzip
+import json
+import os
+import uuid
+from .instrumentation import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', '4'))
+
+
+def encode_default(value):
+    """
+    Encode the values SQLAlchemy rows carry that JSON has no type for. Decimals
+    become strings so no precision is lost; dates and times become ISO 8601.
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode('ascii')
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_dumps(obj):
+    # orjson writes datetime, date, time, UUID and numpy values itself
+    return orjson.dumps(obj, default=encode_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=encode_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+if orjson is not None:
+    ENCODER = 'orjson'
+    _dumps = _orjson_dumps
+elif msgspec is not None:  # pragma: no cover - exercised only without orjson
+    ENCODER = 'msgspec'
+    _dumps = msgspec.json.Encoder(enc_hook=encode_default, decimal_format='string').encode
+else:  # pragma: no cover - exercised only without orjson and msgspec
+    ENCODER = 'json'
+    _dumps = _json_dumps
+
+
+def dumps(obj):
+    """
+    Serialize obj to compact UTF-8 JSON bytes with the fastest available encoder
+    (orjson, msgspec, then the standard library). Decimal, datetime, date, time,
+    UUID and bytes values from database rows are encoded as by encode_default.
+    """
+    return _dumps(obj)
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, parameters = part.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith('q='):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the response Content-Encoding from an Accept-Encoding header.
+    Brotli (when the brotli package is installed) is preferred over gzip at equal quality.
+    :return: 'br', 'gzip' or None for an uncompressed response
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def encode_response(body, accept_encoding=None, headers=None):
+    """
+    Compress a response body as negotiated from the request's Accept-Encoding.
+    :param body: Response body; str bodies are encoded as UTF-8
+    :param accept_encoding: Accept-Encoding request header (optional)
+    :param headers: Response headers to extend (optional)
+    :return: (body, headers) with Content-Encoding and Vary set when compressed
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    headers = dict(headers or {})
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        with span('http.compress', encoding=encoding, bytes=len(body)):
+            body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    headers['Vary'] = 'Accept-Encoding'
+    return body, headers
+
+
+def http_response(req, body, status_code=200, mimetype='application/json', headers=None):
+    """
+    Build a func.HttpResponse, serializing body with dumps unless it is already
+    bytes or str, and compressing it as the request accepts.
+    :param req: func.HttpRequest being answered
+    """
+    import azure.functions as func
+    if not isinstance(body, (bytes, str)):
+        body = dumps(body)
+    body, headers = encode_response(body, req.headers.get('Accept-Encoding'), headers)
+    return func.HttpResponse(body, status_code=status_code, mimetype=mimetype, headers=headers)
@@ -0,0 +1,53 @@
+# core/single_flight.py
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesce concurrent calls for the same key: the first caller runs the function
+        and every caller that arrives while it is running waits for and shares its
+        result (or exception) instead of repeating the work.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.run_count = 0
+        self.shared_count = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        :param key: Hashable identity of the work, e.g. the inputs' versions
+        :return: func(*args, **kwargs), from this call or the one in flight for key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.run_count += 1
+            else:
+                self.shared_count += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -1,12 +1,20 @@
-# function_app/__init__.py
+# dbqueryfunction/__init__.py
 import azure.functions as func
+import asyncio
 import logging
-import json
-import os
-from core.db_client import DBClient
-from core.query_manager import QueryManager
+from core.batch_executor import BatchExecutor
+from core.db_client import DBClient, DEFAULT_BATCH_SIZE, QueryTimeoutError
+from core.instrumentation import count, span
+from core.keyset import DEFAULT_PAGE_SIZE, KeysetError
+from core.query_manager import QueryManager, QueryParamsError
+from core.result_cache import DEFAULT_TTL, ResultCache
+from core.result_encoder import get_encoder
+from core.serialization import dumps, encode_response
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+# Request fields that ask for a keyset page instead of the whole result
+PAGE_FIELDS = ('page_size', 'continuation', 'key_from', 'key_to')
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Received request for database query execution in function1.')
 
     try:
@@ -15,31 +23,88 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.error("Invalid JSON in request body.")
         return func.HttpResponse("Invalid JSON in request body.", status_code=400)
 
+    if 'batch' in req_body:
+        return await batch_response(req, req_body['batch'])
+
     dbid = req_body.get('dbid')
     query_key = req_body.get('query_key')
     params = req_body.get('params', {})
+    output_format = req_body.get('format', 'records')
 
     if not dbid or not query_key:
         logging.error("Missing 'dbid' or 'query_key' in request.")
         return func.HttpResponse("Missing 'dbid' or 'query_key' in request.", status_code=400)
 
     try:
-        # Get the path to the query_config.json specific to this function
-        query_config_path = os.path.join(os.path.dirname(__file__), 'query_config.json')
+        encoder, mimetype = get_encoder(output_format)
+    except ValueError as e:
+        logging.error(str(e))
+        return func.HttpResponse(str(e), status_code=400)
 
-        query_manager = QueryManager(query_config_path)
-        sql = query_manager.get_query(dbid, query_key)
+    try:
+        paged = any(field in req_body for field in PAGE_FIELDS)
+        query, cache, cache_key, body = await asyncio.to_thread(prepare_query, dbid, query_key, params,
+                                                                output_format, paged)
 
-        db_client = DBClient(dbid=dbid)
-        results = db_client.execute_query(sql, params)
+        if paged:
+            return await page_response(req, req_body, query, params, encoder, mimetype)
 
-        response = {
-            'status': 'success',
-            'data': results
-        }
+        if cache is not None:
+            count('query.cache', result='miss' if body is None else 'hit', dbid=dbid)
+            if body is not None:
+                body, headers = encode_response(body, req.headers.get('Accept-Encoding'), {'X-Cache': 'HIT'})
+                return func.HttpResponse(body, status_code=200, mimetype=mimetype, headers=headers)
+
+        db_client = await DBClient.get_async(dbid)
+
+        if output_format != 'records' or req_body.get('stream', query.config.get('stream', False)):
+            body, truncated = await db_client.run_sync(stream_body, db_client, query, params, encoder)
+        else:
+            results = await db_client.execute_query_async(query.bounded_statement, params, query.limits)
+            truncated = results.truncated
+
+            response = {
+                'status': 'success',
+                'data': results
+            }
+            if truncated:
+                response['truncated'] = True
+            with span('json.encode', rows=len(results)):
+                body = dumps(response)
+
+        headers = {}
+        if truncated:
+            # Also marks formats without an envelope (ndjson, arrow); not cached, as a cache hit would drop the header
+            headers['X-Result-Truncated'] = 'true'
+            count('query.truncated', dbid=dbid)
+            logging.warning(f"Result of '{query_key}' on '{dbid}' truncated to max_rows={query.limits.max_rows}.")
+        elif cache is not None:
+            await asyncio.to_thread(cache.set, cache_key, body, query.config.get('cache_ttl', DEFAULT_TTL))
+            headers['X-Cache'] = 'MISS'
+            logging.info(f"Query result cache stats: {cache.stats()}")
+
+        # The cache holds the uncompressed body; each response is compressed for its own Accept-Encoding
+        body, headers = encode_response(body, req.headers.get('Accept-Encoding'), headers)
         return func.HttpResponse(
-            json.dumps(response),
+            body,
             status_code=200,
+            mimetype=mimetype,
+            headers=headers
+        )
+
+    except QueryParamsError as e:
+        logging.error(str(e))
+        return func.HttpResponse(
+            dumps({'status': 'error', 'message': str(e)}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    except QueryTimeoutError as e:
+        logging.error(str(e))
+        return func.HttpResponse(
+            dumps({'status': 'error', 'message': str(e)}),
+            status_code=504,
             mimetype="application/json"
         )
 
@@ -50,8 +115,122 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             'message': str(e)
         }
         return func.HttpResponse(
-            json.dumps(response),
+            dumps(response),
             status_code=500,
             mimetype="application/json"
         )
 
+
+def prepare_query(dbid, query_key, params, output_format, paged):
+    """
+    The blocking steps before a query runs, for a worker thread: the registry lookup,
+    which may reload query_config.json, and the result cache read of cacheable queries.
+    :return: Tuple of (CompiledQuery, ResultCache or None, cache key, cached body or None)
+    """
+    query_manager = QueryManager()
+    query = query_manager.get_compiled_query(dbid, query_key)
+    query.validate_params(params)
+    if paged or not query.config.get('cacheable', False):
+        return query, None, None, None
+    cache = ResultCache.default()
+    cache_key = cache.make_key(dbid, query_key, params, output_format, query_manager.config_version)
+    return query, cache, cache_key, cache.get(cache_key)
+
+
+def stream_body(db_client, query, params, encoder):
+    """
+    Execute a query on a server-side cursor and encode each fetched batch as it
+    arrives, so only the encoded body is held in memory instead of the row list,
+    the row dicts and the serialized string at once.
+    :return: Tuple of (body, whether max_rows truncated the result)
+    """
+    batch_size = query.config.get('batch_size', DEFAULT_BATCH_SIZE)
+
+    with span('db.stream', dbid=db_client.dbid), \
+            db_client.stream_query(query.bounded_statement, params, batch_size=batch_size,
+                                   limits=query.limits) as (columns, batches):
+        body = b''.join(encoder(columns, batches))
+        return body, getattr(batches, 'truncated', False)
+
+
+def page_body(db_client, query, page, encoder):
+    """
+    Fetch one keyset page (page_size + 1 rows, the extra row only showing that
+    another page follows) and encode it with its continuation token.
+    :return: Tuple of (body, continuation token or None)
+    """
+    limits = query.limits._replace(max_rows=None)  # The page size bounds the rows instead
+
+    with span('db.page', dbid=db_client.dbid, rows=page.page_size), \
+            db_client.stream_query(page.statement, page.params, batch_size=page.page_size + 1,
+                                   limits=limits) as (columns, batches):
+        rows = [row for batch in batches for row in batch]
+    batches = page.batches(columns, rows)
+    return b''.join(encoder(columns, batches)), batches.continuation
+
+
+async def page_response(req, req_body, query, params, encoder, mimetype):
+    """
+    Answer one keyset page of a query that declares a 'keyset' sort key. The request
+    gives page_size (default the query's page_size, capped at its max_rows) and either
+    the continuation token of the previous page or optional key_from / key_to bounds.
+    The next page's token is returned in the JSON envelope ("continuation", null on
+    the last page) and the X-Continuation-Token header.
+    """
+    if query.keyset is None:
+        raise QueryParamsError(f"Query '{query.key}' on database '{query.dbid}' does not support keyset pagination.")
+    page_size = req_body.get('page_size', query.config.get('page_size', DEFAULT_PAGE_SIZE))
+    if query.limits.max_rows and isinstance(page_size, int):
+        page_size = min(page_size, query.limits.max_rows)
+    try:
+        page = query.keyset.page(params, page_size, req_body.get('continuation'),
+                                 req_body.get('key_from'), req_body.get('key_to'))
+    except KeysetError as e:
+        raise QueryParamsError(str(e)) from None
+
+    db_client = await DBClient.get_async(query.dbid)
+    body, continuation = await db_client.run_sync(page_body, db_client, query, page, encoder)
+    headers = {'X-Continuation-Token': continuation} if continuation else {}
+    body, headers = encode_response(body, req.headers.get('Accept-Encoding'), headers)
+    return func.HttpResponse(
+        body,
+        status_code=200,
+        mimetype=mimetype,
+        headers=headers
+    )
+
+
+async def batch_response(req, items):
+    """
+    Execute a list of {dbid, query_key, params} items and return their results in order.
+    """
+    if not isinstance(items, list) or not items:
+        logging.error("'batch' must be a non-empty list.")
+        return func.HttpResponse("'batch' must be a non-empty list.", status_code=400)
+
+    try:
+        executor = BatchExecutor(QueryManager(), db_client_factory=lambda dbid: DBClient(dbid=dbid))
+        results = await asyncio.to_thread(executor.execute, items)
+        response = {
+            'status': 'success',
+            'results': results
+        }
+        body, headers = encode_response(dumps(response), req.headers.get('Accept-Encoding'))
+        return func.HttpResponse(
+            body,
+            status_code=200,
+            mimetype="application/json",
+            headers=headers
+        )
+
+    except Exception as e:
+        logging.exception("Error processing batch request.")
+        response = {
+            'status': 'error',
+            'message': str(e)
+        }
+        return func.HttpResponse(
+            dumps(response),
+            status_code=500,
+            mimetype="application/json"
+        )
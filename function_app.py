@@ -1,6 +1,30 @@
 import azure.functions as func
-import datetime
-import json
-import logging
+from core import app_context
 
-app = func.FunctionApp()
\ No newline at end of file
+app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
+
+# Function modules are imported on their first invocation, not while the host indexes
+# the app, so each function only loads its own dependencies (SQLAlchemy or pandas).
+# The shared clients are initialized in the background in the meantime.
+app_context.start_warm_up()
+
+
+@app.function_name(name='dbqueryfunction')
+@app.route(route='dbqueryfunction', methods=['POST'])
+async def db_query_function(req: func.HttpRequest) -> func.HttpResponse:
+    import dbqueryfunction
+    return await dbqueryfunction.main(req)
+
+
+@app.function_name(name='wfFunction1')
+@app.route(route='wfFunction1', methods=['GET', 'POST'])
+def wf_function1(req: func.HttpRequest) -> func.HttpResponse:
+    import wfFunction1
+    return wfFunction1.main(req)
+
+
+@app.function_name(name='wfFunction2')
+@app.route(route='wfFunction2', methods=['GET', 'POST'])
+def wf_function2(req: func.HttpRequest) -> func.HttpResponse:
+    import wfFunction2
+    return wfFunction2.main(req)
@@ -0,0 +1,74 @@
+import json
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from core.batch_executor import BatchExecutor
+from core.db_client import DBClient
+from core.query_manager import QueryManager
+
+@pytest.fixture
+def query_manager(tmp_path):
+    config = {
+        'db1': {'queries': [
+            {'key': 'getUserById', 'sql': 'SELECT id, name FROM users WHERE id = :id',
+             'coalesce': {'param': 'id', 'column': 'id'}},
+            {'key': 'countUsers', 'sql': 'SELECT COUNT(*) AS total FROM users'},
+            {'key': 'listUsers', 'sql': 'SELECT id FROM users ORDER BY id', 'max_rows': 2}
+        ]},
+        'db2': {'queries': [
+            {'key': 'getOrder', 'sql': 'SELECT order_id FROM orders WHERE order_id = :order_id'}
+        ]}
+    }
+    path = tmp_path / 'batch_query_config.json'
+    path.write_text(json.dumps(config))
+    return QueryManager(str(path))
+
+@pytest.fixture
+def db_clients():
+    clients = {}
+    for dbid, ddl, rows in [
+        ('db1', "CREATE TABLE users (id INTEGER, name TEXT)", "INSERT INTO users VALUES (1, 'a'), (2, 'b'), (3, 'c')"),
+        ('db2', "CREATE TABLE orders (order_id INTEGER)", "INSERT INTO orders VALUES (10)"),
+    ]:
+        client = DBClient.from_engine(dbid, create_engine('sqlite://', poolclass=StaticPool,
+                                                          connect_args={'check_same_thread': False}))
+        with client.engine.begin() as connection:
+            connection.execute(text(ddl))
+            connection.execute(text(rows))
+        clients[dbid] = client
+    return clients
+
+def test_coalesced_sql(query_manager):
+    query = query_manager.get_compiled_query('db1', 'getUserById')
+
+    assert 'id IN' in str(query.coalesced_statement)
+
+def test_batch_results_in_order(query_manager, db_clients, monkeypatch):
+    executed = []
+    original = DBClient.execute_queries
+    monkeypatch.setattr(DBClient, 'execute_queries', lambda self, queries: executed.append(len(queries)) or original(self, queries))
+
+    results = BatchExecutor(query_manager, db_client_factory=db_clients.get).execute([
+        {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 3}},
+        {'dbid': 'db2', 'query_key': 'getOrder', 'params': {'order_id': 10}},
+        {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 1}},
+        {'dbid': 'db1', 'query_key': 'missing'},
+        {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 99}},
+        {'dbid': 'db1', 'query_key': 'countUsers'},
+    ])
+
+    assert results[0] == {'status': 'success', 'data': [{'id': 3, 'name': 'c'}]}
+    assert results[1] == {'status': 'success', 'data': [{'order_id': 10}]}
+    assert results[2] == {'status': 'success', 'data': [{'id': 1, 'name': 'a'}]}
+    assert results[3]['status'] == 'error'
+    assert results[4] == {'status': 'success', 'data': []}
+    assert results[5] == {'status': 'success', 'data': [{'total': 3}]}
+    # db1: one coalesced lookup plus the count; db2: one lookup
+    assert sorted(executed) == [1, 2]
+
+def test_batch_marks_truncated_results(query_manager, db_clients):
+    results = BatchExecutor(query_manager, db_client_factory=db_clients.get).execute([
+        {'dbid': 'db1', 'query_key': 'listUsers'},
+    ])
+
+    assert results[0] == {'status': 'success', 'data': [{'id': 1}, {'id': 2}], 'truncated': True}
@@ -1,6 +1,9 @@
+import asyncio
+import httpx
 import pytest
 from unittest.mock import patch
 from core.coupa_client import CoupaClient
+from core.http_client import HttpClient
 from core.models import ExpenseReport
 import json
 import os
@@ -10,7 +13,7 @@ def sample_expense_reports():
     with open(os.path.join(os.path.dirname(__file__), 'sample_expense_reports.json')) as f:
         return json.load(f)
 
-@patch('core.coupa_client.requests.get')
+@patch('core.coupa_client.requests.Session.get')
 def test_get_expense_reports(mock_get, sample_expense_reports):
     mock_response = mock_get.return_value
     mock_response.raise_for_status.return_value = None
@@ -25,3 +28,64 @@ def test_get_expense_reports(mock_get, sample_expense_reports):
     assert reports[0].amount == 150.75
     assert reports[1].description == "Flight to NYC"
     assert reports[2].date == "2024-04-17"
+    assert mock_get.call_args.kwargs['timeout'] == (5.0, 30.0)  # A hung call must not hold the sync lock
+
+@patch('core.coupa_client.requests.Session.get')
+def test_pages_resume_from_last_updated_at(mock_get):
+    reports = [
+        {'id': 1, 'amount': 1, 'description': 'a', 'date': '2024-04-15', 'updated_at': '2024-04-15T10:00:00Z'},
+        {'id': 2, 'amount': 2, 'description': 'b', 'date': '2024-04-16', 'updated_at': '2024-04-16T10:00:00Z'},
+        {'id': 3, 'amount': 3, 'description': 'c', 'date': '2024-04-16', 'updated_at': '2024-04-16T10:00:00Z'},
+    ]
+    mock_get.return_value.json.side_effect = [reports[:2], reports[2:]]
+
+    client = CoupaClient(api_key="test_key", base_url="https://api.coupa.com", page_size=2)
+    pages = list(client.iter_expense_report_pages(updated_since='2024-04-01T00:00:00Z'))
+
+    assert [[report.id for report in page] for page in pages] == [[1, 2], [3]]
+    first, second = [call.kwargs['params'] for call in mock_get.call_args_list]
+    assert first['updated_at[gt_or_eq]'] == '2024-04-01T00:00:00Z' and first['offset'] == 0
+    # The second page filters on the last timestamp seen and skips the one report already received with it
+    assert second['updated_at[gt_or_eq]'] == '2024-04-16T10:00:00Z' and second['offset'] == 1
+
+def make_async_client(handler):
+    return CoupaClient(api_key="test_key", base_url="https://api.coupa.com", page_size=2,
+                       http_client=HttpClient(transport=httpx.MockTransport(handler)))
+
+def test_async_pages_and_details():
+    reports = [{'id': i, 'amount': i, 'description': 'r', 'date': '2024-04-15',
+                'updated_at': f'2024-04-15T10:00:0{i}Z'} for i in range(1, 4)]
+    state = {'in_flight': 0, 'peak': 0}
+
+    async def handler(request):
+        assert request.headers['Authorization'] == 'Bearer test_key'
+        if request.url.path == '/expense_reports':
+            since = request.url.params.get('updated_at[gt_or_eq]', '')
+            newer = [report for report in reports if report['updated_at'] >= since]
+            offset = int(request.url.params['offset'])
+            return httpx.Response(200, json=newer[offset:offset + 2])
+        state['in_flight'] += 1
+        state['peak'] = max(state['peak'], state['in_flight'])
+        await asyncio.sleep(0.01)
+        state['in_flight'] -= 1
+        report_id = int(request.url.path.rsplit('/', 1)[1])
+        return httpx.Response(200, json=reports[report_id - 1]) if report_id <= 3 else httpx.Response(404)
+
+    client = make_async_client(handler)
+
+    async def run():
+        return (await client.get_expense_reports_async(),
+                await client.get_expense_report_details_async([3, 1, 2, 4]))
+
+    listed, details = asyncio.run(run())
+
+    assert [report.id for report in listed] == [1, 2, 3]
+    assert [detail and detail['id'] for detail in details] == [3, 1, 2, None]
+    assert state['peak'] > 1
+
+def test_session_shared_per_base_url():
+    first = CoupaClient(api_key="a", base_url="https://api.coupa.com")
+    second = CoupaClient(api_key="b", base_url="https://api.coupa.com")
+
+    assert first.session is second.session
+    assert first.session.get_adapter('https://api.coupa.com')._pool_maxsize >= 1
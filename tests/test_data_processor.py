@@ -1,3 +1,4 @@
+import json
 import pytest
 import pandas as pd
 from core.data_processor import DataProcessor
@@ -22,3 +23,48 @@ def test_join_data():
     assert len(joined) == 2
     assert joined[0].csv_field1 == 'A'
     assert joined[1].csv_field2 == 'Y'
+
+def test_join_json_matches_models():
+    expense_reports = [
+        ExpenseReport(id=3, amount=0.1, description="Caf\u00e9", date="2023-10-03"),
+        ExpenseReport(id=1, amount=100.0, description="Lunch", date="2023-10-01"),
+        ExpenseReport(id=2, amount=200.0, description="Travel", date="2023-10-02")
+    ]
+    csv_df = pd.DataFrame({'expense_id': [1, 3, 3], 'csv_field1': ['A', 'B', 'C'], 'csv_field2': ['X', 'Y', 'Z']})
+    processor = DataProcessor(csv_path='dummy_path')
+
+    expected = [data.model_dump() for data in processor.join_data(expense_reports, csv_df)]
+
+    assert json.loads(processor.join_json(expense_reports, csv_df)) == expected
+    assert [row['expense_id'] for row in expected] == [3, 3, 1]
+
+def test_join_rejects_invalid_schema():
+    processor = DataProcessor(csv_path='dummy_path')
+    expense_df = pd.DataFrame({'id': [1], 'amount': ['not a number'], 'description': ['Lunch'], 'date': ['2023-10-01']})
+    csv_df = pd.DataFrame({'expense_id': [1], 'csv_field1': ['A'], 'csv_field2': ['X']})
+
+    with pytest.raises(ValueError, match='Expense reports'):
+        processor.join_json(expense_df, csv_df)
+    with pytest.raises(ValueError, match='csv_field2'):
+        processor.join_json(expense_df.assign(amount=1.0), csv_df.drop(columns='csv_field2'))
+
+def test_streaming_join_batches(tmp_path):
+    batches = [
+        [ExpenseReport(id=1, amount=1.0, description="a", date="2023-10-01"),
+         ExpenseReport(id=9, amount=9.0, description="unmatched", date="2023-10-09")],
+        pd.DataFrame({'id': [3, 2], 'amount': [3.0, 2.0], 'description': ['c', 'b'], 'date': ['2023-10-03', '2023-10-02']}),
+    ]
+    csv_df = pd.DataFrame({'expense_id': [1, 2, 3], 'csv_field1': ['A', 'B', 'C'], 'csv_field2': ['X', 'Y', 'Z']})
+    processor = DataProcessor(csv_path='dummy_path')
+
+    chunks = list(processor.iter_join_ndjson(iter(batches), csv_df))
+    rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+
+    assert len(chunks) == 2
+    assert [row['expense_id'] for row in rows] == [1, 3, 2]
+    assert rows[1] == {'expense_id': 3, 'amount': 3.0, 'description': 'c', 'date': '2023-10-03',
+                       'csv_field1': 'C', 'csv_field2': 'Z'}
+
+    output_path = tmp_path / 'joined.ndjson'
+    assert processor.join_to_file(iter(batches), csv_df, str(output_path)) == 3
+    assert output_path.read_bytes() == b''.join(chunks)
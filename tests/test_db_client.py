@@ -0,0 +1,173 @@
+import asyncio
+import contextlib
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool, StaticPool
+from core import db_client as db_client_module
+from core.db_client import DBClient, QueryLimits, QueryTimeoutError, add_max_execution_time_hint
+
+@pytest.fixture
+def db_client():
+    client = DBClient.from_engine('test', create_engine('sqlite://', poolclass=StaticPool,
+                                                        connect_args={'check_same_thread': False}))
+    with client.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER, name TEXT)"))
+        connection.execute(
+            text("INSERT INTO users (id, name) VALUES (:id, :name)"),
+            [{'id': i, 'name': f'user{i}'} for i in range(1, 8)]
+        )
+    return client
+
+def test_execute_query(db_client):
+    rows = db_client.execute_query("SELECT id, name FROM users WHERE id = :id", {'id': 2})
+
+    assert rows == [{'id': 2, 'name': 'user2'}]
+
+def test_stream_query_batches(db_client):
+    with db_client.stream_query("SELECT id, name FROM users", batch_size=3) as (columns, batches):
+        batch_sizes = [len(batch) for batch in batches]
+
+    assert columns == ['id', 'name']
+    assert batch_sizes == [3, 3, 1]
+
+def test_refresh_swaps_engine(tmp_path, monkeypatch):
+    config_path = tmp_path / 'db_config.yaml'
+    config_template = (
+        "databases:\n"
+        "  - dbid: reload_db\n"
+        "    use_odbc: true\n"
+        "    dialect: mssql+pyodbc\n"
+        "    odbc_connection_string_env_var: {env_var}\n"
+    )
+    config_path.write_text(config_template.format(env_var='RELOAD_DB_CONN_A'))
+    monkeypatch.setenv('RELOAD_DB_CONN_A', 'conn-a')
+    monkeypatch.setenv('RELOAD_DB_CONN_B', 'conn-b')
+    monkeypatch.setattr(db_client_module, 'DB_CONFIG_PATH', str(config_path))
+    monkeypatch.setattr(DBClient, 'create_engine', lambda self: setattr(self, 'engine', create_engine('sqlite://')))
+    monkeypatch.setattr(DBClient, '_instances', {})
+
+    client = DBClient('reload_db')
+    old_engine = client.engine
+    config_path.write_text(config_template.format(env_var='RELOAD_DB_CONN_B'))
+
+    assert client.refresh(force=True) is True
+    assert client.engine is not old_engine
+    assert client.reload_count == 1
+    assert client.db_config['odbc_connection_string'] == 'conn-b'
+    assert client.execute_query("SELECT 1 AS one") == [{'one': 1}]
+
+def test_pool_options_and_warm_pool(tmp_path):
+    db_config = {'pool_size': 3, 'max_overflow': 0, 'pre_ping': True, 'warm_connections': 5}
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", poolclass=QueuePool, pool_size=3, max_overflow=0)
+    client = DBClient.from_engine('warm', engine, db_config)
+
+    assert client.pool_options() == {'pool_size': 3, 'max_overflow': 0, 'pool_pre_ping': True}
+    assert client.warm_pool() == 3
+    assert client.engine.pool.checkedin() == 3
+
+def test_execute_query_async_offloads_to_executor(db_client):
+    async def run_concurrently():
+        return await asyncio.gather(*[
+            db_client.execute_query_async("SELECT name FROM users WHERE id = :id", {'id': i}) for i in (1, 2, 3)
+        ])
+
+    results = asyncio.run(run_concurrently())
+
+    assert results == [[{'name': 'user1'}], [{'name': 'user2'}], [{'name': 'user3'}]]
+    assert db_client.executor._max_workers == 15
+
+def test_get_async_builds_clients_off_the_event_loop(monkeypatch):
+    built_on = []
+
+    def build(self, dbid):
+        built_on.append(threading.current_thread())
+        self.dbid = dbid
+        self.engine = create_engine('sqlite://')
+
+    monkeypatch.setattr(DBClient, '_instances', {})
+    monkeypatch.setattr(DBClient, '__init__', build)
+
+    async def get_twice():
+        return await DBClient.get_async('db9'), await DBClient.get_async('db9')
+
+    first, second = asyncio.run(get_twice())
+
+    assert first is second
+    assert built_on and built_on[0] is not threading.main_thread()
+    assert len(built_on) == 1  # The built client is returned without another thread hop
+
+def test_max_rows_truncates_results(db_client):
+    limits = QueryLimits(max_rows=5)
+    rows = db_client.execute_query("SELECT id FROM users ORDER BY id", limits=limits)
+    exact = db_client.execute_query("SELECT id FROM users ORDER BY id", limits=QueryLimits(max_rows=7))
+
+    assert [row['id'] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows.truncated is True
+    assert exact.truncated is False
+
+    with db_client.stream_query("SELECT id FROM users", batch_size=3, limits=limits) as (columns, batches):
+        batch_sizes = [len(batch) for batch in batches]
+    assert batch_sizes == [3, 2]
+    assert batches.truncated is True
+
+def test_timeout_cancels_query_client_side(db_client):
+    endless = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c LIMIT 1000000000) "
+               "SELECT COUNT(*) AS total FROM c")
+
+    with pytest.raises(QueryTimeoutError):
+        db_client.execute_query(endless, limits=QueryLimits(timeout_ms=100))
+    # The connection is usable again afterwards
+    assert db_client.execute_query("SELECT COUNT(*) AS total FROM users", limits=QueryLimits(timeout_ms=1000)) == [{'total': 7}]
+
+def test_watchdogs_share_one_thread():
+    fired = []
+    with contextlib.ExitStack() as stack:
+        for i in range(50):
+            stack.enter_context(db_client_module._Watchdog(60, lambda i=i: fired.append(i)))
+        with db_client_module._Watchdog(0.05, lambda: fired.append('late')):
+            time.sleep(0.3)
+        watchdog_threads = [thread for thread in threading.enumerate() if thread.name == 'db-query-watchdog']
+
+    assert len(watchdog_threads) == 1
+    assert fired == ['late']
+
+def test_mysql_max_execution_time_hint():
+    context = type('Context', (), {'execution_options': {'timeout_ms': 1500}})()
+    statement, _ = add_max_execution_time_hint(None, None, "SELECT id FROM users", {}, context, False)
+    update, _ = add_max_execution_time_hint(None, None, "UPDATE users SET name = 'x'", {}, context, False)
+
+    assert statement == "SELECT /*+ MAX_EXECUTION_TIME(1500) */ id FROM users"
+    assert update == "UPDATE users SET name = 'x'"
+
+def test_query_limits_from_config():
+    assert QueryLimits.from_config({'key': 'q', 'timeout_ms': 500}) == QueryLimits(timeout_ms=500)
+    with pytest.raises(ValueError, match="'max_rows' of query 'q'"):
+        QueryLimits.from_config({'key': 'q', 'max_rows': 0})
+
+def test_kill_query_bypasses_the_pool(tmp_path, monkeypatch):
+    client = DBClient.from_engine('kill', create_engine(f"sqlite:///{tmp_path / 'kill.db'}", poolclass=QueuePool,
+                                                       pool_size=1, max_overflow=0, pool_timeout=5))
+    statements = []
+
+    with client.engine.connect():  # The only pooled connection is checked out
+        monkeypatch.setattr(client.engine.dialect, 'connect', lambda *args, **kwargs: FakeConnection(statements))
+        started = time.perf_counter()
+        client.cancel(type('MySQLConnection', (), {'thread_id': lambda self: 42})())
+
+    assert statements == ['KILL QUERY 42']
+    assert time.perf_counter() - started < 1
+
+class FakeConnection:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def close(self):
+        pass
@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+import json
+import pytest
+import azure.functions as func
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+from core.db_client import DBClient, QueryLimits, QueryTimeoutError
+from core import serialization
+from core.result_cache import MemoryBackend, ResultCache
+import dbqueryfunction
+
+@pytest.fixture
+def db_client(monkeypatch):
+    client = DBClient.from_engine('db1', create_engine('sqlite://', poolclass=StaticPool,
+                                                       connect_args={'check_same_thread': False}))
+    with client.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER, name TEXT, email TEXT)"))
+        connection.execute(
+            text("INSERT INTO users (id, name, email) VALUES (:id, :name, :email)"),
+            [{'id': i, 'name': f'user{i}', 'email': f'user{i}@example.com'} for i in range(1, 4)]
+        )
+    monkeypatch.setitem(DBClient._instances, 'db1', client)
+    monkeypatch.setattr(ResultCache, '_instance', ResultCache(MemoryBackend()))
+    return client
+
+def run(req):
+    return asyncio.run(dbqueryfunction.main(req))
+
+def make_request(body):
+    return func.HttpRequest(method='POST', url='/api/dbqueryfunction', body=json.dumps(body).encode())
+
+def test_records_query(db_client):
+    resp = run(make_request({'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 2}}))
+
+    assert resp.status_code == 200
+    assert json.loads(resp.get_body())['data'] == [{'id': 2, 'name': 'user2', 'email': 'user2@example.com'}]
+
+def test_streamed_columnar_query(db_client):
+    resp = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers', 'format': 'columnar'}))
+
+    body = json.loads(resp.get_body())
+    assert body['columns'] == ['id', 'name', 'email']
+    assert body['data'][0] == [1, 2, 3]
+
+def test_invalid_params_rejected(db_client):
+    resp = run(make_request({'dbid': 'db1', 'query_key': 'getUserById', 'params': {}}))
+
+    assert resp.status_code == 400
+
+def test_cacheable_query_hits_cache(db_client):
+    request = {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 1}}
+    first = run(make_request(request))
+    second = run(make_request(request))
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert first.get_body() == second.get_body()
+
+def test_batch_request(db_client):
+    resp = run(make_request({'batch': [
+        {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 2}},
+        {'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 1}},
+    ]}))
+
+    results = json.loads(resp.get_body())['results']
+    assert [result['data'][0]['id'] for result in results] == [2, 1]
+
+def test_response_compressed_when_accepted(db_client, monkeypatch):
+    monkeypatch.setattr(serialization, 'COMPRESS_MIN_BYTES', 0)
+    request = func.HttpRequest(method='POST', url='/api/dbqueryfunction', headers={'Accept-Encoding': 'gzip'},
+                               body=json.dumps({'dbid': 'db1', 'query_key': 'getAllUsers'}).encode())
+
+    resp = run(request)
+
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(resp.get_body()))['data']) == 3
+
+def test_max_rows_marks_truncated_results(db_client, monkeypatch):
+    query_manager = dbqueryfunction.QueryManager()
+    query = query_manager.get_compiled_query('db1', 'getAllUsers')
+    monkeypatch.setattr(query_manager, 'registry', {
+        **query_manager.registry, ('db1', 'getAllUsers'): query._replace(
+            limits=QueryLimits(max_rows=2),
+            limited_statement=dbqueryfunction.QueryManager.compile_limited('db1', 'getAllUsers', query.sql, 2))
+    })
+    executed = []
+    event.listen(db_client.engine, 'before_cursor_execute', lambda *args: executed.append(args[2]))
+
+    records = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers'}))
+    ndjson = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers', 'format': 'ndjson'}))
+
+    body = json.loads(records.get_body())
+    assert [row['id'] for row in body['data']] == [1, 2]
+    assert body['truncated'] is True
+    assert records.headers['X-Result-Truncated'] == 'true'
+    assert len(ndjson.get_body().splitlines()) == 2
+    assert ndjson.headers['X-Result-Truncated'] == 'true'
+    # The database stops after max_rows + 1 rows
+    assert all(sql.rstrip().endswith('LIMIT ? OFFSET ?') for sql in executed)
+
+def test_query_timeout_returns_504(db_client, monkeypatch):
+    def timeout(*args, **kwargs):
+        raise QueryTimeoutError("Query on 'db1' exceeded its timeout of 100 ms and was cancelled.")
+    monkeypatch.setattr(db_client, 'execute_query', timeout)
+
+    resp = run(make_request({'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 5}}))
+
+    assert resp.status_code == 504
+    assert json.loads(resp.get_body())['status'] == 'error'
+
+def test_keyset_pages(db_client):
+    first = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers', 'page_size': 2}))
+    token = json.loads(first.get_body())['continuation']
+    second = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers', 'continuation': token}))
+
+    assert [row['id'] for row in json.loads(first.get_body())['data']] == [1, 2]
+    assert first.headers['X-Continuation-Token'] == token
+    assert json.loads(second.get_body()) == {
+        'status': 'success', 'data': [{'id': 3, 'name': 'user3', 'email': 'user3@example.com'}], 'continuation': None
+    }
+
+def test_keyset_rejects_unpaged_query_and_bad_token(db_client):
+    unpaged = run(make_request({'dbid': 'db1', 'query_key': 'getUserById', 'params': {'id': 1}, 'page_size': 2}))
+    bad_token = run(make_request({'dbid': 'db1', 'query_key': 'getAllUsers', 'continuation': 'garbage'}))
+
+    assert unpaged.status_code == 400
+    assert bad_token.status_code == 400
@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import threading
+import time
+import azure.functions as func
+import pytest
+from core import expense_pipeline, serialization
+from core.data_processor import DataProcessor
+from core.expense_pipeline import ExpensePipeline
+from core.expense_store import ExpenseReportStore
+from core.models import ExpenseReport
+from core.reference_table import ReferenceTable
+
+class FakeCoupaClient:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def iter_expense_report_pages(self, updated_since=None):
+        pages, self.pages = self.pages, []
+        return iter(pages)
+
+def report(id, updated_at):
+    return ExpenseReport(id=id, amount=10.0, description=f'Expense {id}', date='2024-04-15', updated_at=updated_at)
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setenv('COUPA_SYNC_INTERVAL', '0')
+    monkeypatch.setenv('REFERENCE_CACHE_DIR', str(tmp_path))
+    csv_path = tmp_path / 'reference.csv'
+    csv_path.write_text("expense_id,csv_field1,csv_field2\n1,A,X\n2,B,Y\n")
+    client = FakeCoupaClient([[report(1, '2024-04-15T10:00:00Z'), report(2, '2024-04-15T11:00:00Z')]])
+    yield ExpensePipeline(client, DataProcessor(str(csv_path)), ExpenseReportStore(str(tmp_path / 'store.sqlite')))
+    ReferenceTable._instances.pop(os.path.realpath(csv_path), None)
+
+def test_result_cached_until_inputs_change(pipeline):
+    first = pipeline.respond()
+    second = pipeline.respond()
+
+    assert first.status_code == second.status_code == 200
+    assert [row['expense_id'] for row in json.loads(first.body)] == [1, 2]
+    assert second.body is first.body
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert pipeline.build_count == 1
+
+    pipeline.coupa_client.pages = [[report(2, '2024-04-16T09:00:00Z')]]
+    assert pipeline.respond().headers['ETag'] != first.headers['ETag']
+    assert pipeline.build_count == 2
+
+def test_reports_without_updated_at_invalidate(pipeline):
+    pipeline.coupa_client.pages = [[report(1, None)]]
+    first = pipeline.respond()
+    pipeline.coupa_client.pages = [[report(1, None)]]
+    unchanged = pipeline.respond()
+    pipeline.coupa_client.pages = [[report(2, None)]]
+    changed = pipeline.respond(if_none_match=first.headers['ETag'])
+
+    assert unchanged.headers['ETag'] == first.headers['ETag']
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != first.headers['ETag']
+    assert [row['expense_id'] for row in json.loads(changed.body)] == [1, 2]
+
+def test_csv_change_invalidates(pipeline):
+    etag = pipeline.respond().headers['ETag']
+    with open(pipeline.data_processor.csv_path, 'a') as f:
+        f.write("3,C,Z\n")
+
+    assert pipeline.respond().headers['ETag'] != etag
+
+def test_not_modified(pipeline):
+    etag = pipeline.respond().headers['ETag']
+
+    response = pipeline.respond(if_none_match=f'W/{etag}')
+
+    assert response.status_code == 304
+    assert response.body == b''
+    assert response.headers['ETag'] == etag
+    assert pipeline.respond(if_none_match='"other"').status_code == 200
+
+def test_formats_cached_separately(pipeline):
+    json_response = pipeline.respond('json')
+    ndjson_response = pipeline.respond('ndjson')
+
+    assert ndjson_response.mimetype == 'application/x-ndjson'
+    assert len(ndjson_response.body.splitlines()) == 2
+    assert ndjson_response.headers['ETag'] != json_response.headers['ETag']
+    assert pipeline.build_count == 2
+
+def test_compressed_variant_encoded_once(pipeline, monkeypatch):
+    monkeypatch.setattr(serialization, 'COMPRESS_MIN_BYTES', 0)
+
+    first = pipeline.respond(accept_encoding='gzip')
+    second = pipeline.respond(accept_encoding='gzip')
+
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['ETag'].endswith('-gzip"')
+    assert second.body is first.body
+    assert json.loads(gzip.decompress(first.body)) == json.loads(pipeline.respond().body)
+
+def test_concurrent_requests_build_once(pipeline, monkeypatch):
+    build = pipeline.build
+
+    def slow_build(output_format):
+        time.sleep(0.2)
+        return build(output_format)
+    monkeypatch.setattr(pipeline, 'build', slow_build)
+    pipeline.store.sync(pipeline.coupa_client)
+    monkeypatch.setenv('COUPA_SYNC_INTERVAL', '3600')
+
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(pipeline.respond())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({response.body for response in responses}) == 1
+    assert pipeline.build_count == 1
+
+def test_handle(pipeline):
+    req = func.HttpRequest(method='GET', url='/api/wfFunction1', params={'format': 'ndjson'}, body=b'')
+
+    resp = expense_pipeline.handle(req, pipeline)
+
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/x-ndjson'
+    assert 'ETag' in resp.headers
@@ -0,0 +1,82 @@
+import pytest
+from core.expense_store import ExpenseReportStore, SyncBackoffError
+from core.models import ExpenseReport
+
+class FakeCoupaClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def iter_expense_report_pages(self, updated_since=None):
+        self.calls.append(updated_since)
+        return iter(self.pages)
+
+def report(id, updated_at, description='report'):
+    return ExpenseReport(id=id, amount=10.0, description=description, date='2024-04-15', updated_at=updated_at)
+
+def test_sync_checkpoint_and_upsert(tmp_path):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+    client = FakeCoupaClient([[report(1, '2024-04-15T10:00:00-07:00'), report(2, '2024-04-15T18:00:00Z')]])
+
+    assert store.sync(client) == 2
+    # 17:00Z is earlier than 18:00Z, so the checkpoint follows the timestamps, not the strings
+    assert store.checkpoint == '2024-04-15T18:00:00Z'
+
+    client.pages = [[report(1, '2024-04-16T00:00:00Z', description='edited')]]
+    store.sync(client)
+
+    assert client.calls == [None, '2024-04-15T18:00:00Z']
+    assert [(r.id, r.description) for r in store.load()] == [(1, 'edited'), (2, 'report')]
+    # A second store on the same file sees the synced reports and checkpoint
+    assert ExpenseReportStore(store.path).checkpoint == '2024-04-16T00:00:00Z'
+
+def test_sync_if_stale(tmp_path):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+    client = FakeCoupaClient([[report(1, '2024-04-15T10:00:00Z')]])
+
+    assert store.sync_if_stale(client, min_interval=60) == 1
+    assert store.sync_if_stale(client, min_interval=60) is None
+    assert store.sync_if_stale(client, min_interval=0) == 1
+    assert store.sync_count == 2
+
+def test_failed_sync_backs_off(tmp_path):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+
+    class FailingCoupaClient(FakeCoupaClient):
+        def iter_expense_report_pages(self, updated_since=None):
+            self.calls.append(updated_since)
+            raise ConnectionError('Coupa is down')
+
+    failing = FailingCoupaClient([])
+    with pytest.raises(ConnectionError):
+        store.sync_if_stale(failing, min_interval=60)
+    # Later requests fail fast instead of each starting a blocking sync
+    with pytest.raises(SyncBackoffError):
+        store.sync_if_stale(failing, min_interval=60)
+    assert len(failing.calls) == 1
+
+    assert store.sync_if_stale(FakeCoupaClient([[report(1, '2024-04-15T10:00:00Z')]]), min_interval=0) == 1
+    assert store.last_failed_at is None
+
+def test_load_frame(tmp_path):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+    store.save_page([report(2, '2024-04-15T10:00:00Z'), report(1, None)])
+
+    frame = store.load_frame()
+
+    assert list(frame['id']) == [1, 2]
+    assert list(frame.columns) == ['id', 'amount', 'description', 'date', 'updated_at']
+
+def test_iter_frames(tmp_path):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+    store.save_page([report(id, None) for id in (5, 1, 3, 2, 4)])
+
+    assert [list(frame['id']) for frame in store.iter_frames(batch_size=2)] == [[1, 2], [3, 4], [5]]
+
+def test_sync_warns_without_updated_at(tmp_path, caplog):
+    store = ExpenseReportStore(str(tmp_path / 'store.sqlite'))
+
+    store.sync(FakeCoupaClient([[report(1, None), report(2, None)]]))
+
+    assert store.checkpoint is None
+    assert 'every sync downloads all expense reports again' in caplog.text
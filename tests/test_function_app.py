@@ -0,0 +1,51 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+import pytest
+from core import app_context
+
+def imported_packages(module):
+    probe = f"import json, sys, {module}; print(json.dumps(sorted(name for name in ('pandas', 'sqlalchemy', 'httpx') if name in sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', probe], env=dict(os.environ, APP_WARM_UP=''), capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output)
+
+def test_functions_registered(monkeypatch):
+    monkeypatch.setenv('APP_WARM_UP', '')
+    function_app = importlib.import_module('function_app')
+
+    names = [function.get_function_name() for function in function_app.app.get_functions()]
+    assert names == ['dbqueryfunction', 'wfFunction1', 'wfFunction2']
+
+def test_function_imports_only_its_dependencies():
+    assert imported_packages('function_app') == []
+    assert imported_packages('dbqueryfunction') == ['sqlalchemy']
+    assert 'sqlalchemy' not in imported_packages('wfFunction1')
+
+def test_shared_clients(monkeypatch):
+    monkeypatch.setattr(app_context, '_shared', {})
+
+    assert app_context.coupa_client() is app_context.coupa_client()
+    assert app_context.data_processor() is app_context.data_processor()
+
+def test_warm_up_disabled(monkeypatch):
+    monkeypatch.setenv('APP_WARM_UP', '')
+
+    assert app_context.start_warm_up() is None
+
+def test_warm_up_rejects_unknown_group(monkeypatch):
+    monkeypatch.setenv('APP_WARM_UP', 'database,cache')
+
+    with pytest.raises(ValueError):
+        app_context.start_warm_up()
+
+def test_warm_up_logs_failures(monkeypatch, caplog):
+    def fail():
+        raise RuntimeError('unreachable')
+    monkeypatch.setitem(app_context.WARM_UPS, 'database', fail)
+
+    app_context.warm_up(['database'])
+
+    assert "Could not warm up 'database': unreachable" in caplog.text
@@ -1,26 +1,47 @@
 import json
 import azure.functions as func
-from unittest.mock import patch, MagicMock
-from HttpTriggerFunction1 import __init__ as func1
-from HttpTriggerFunction2 import __init__ as func2
+from unittest.mock import patch
+import wfFunction1 as func1
+import wfFunction2 as func2
+from core import app_context
+from core.coupa_client import CoupaClient
+from core.data_processor import DataProcessor
+from core.expense_pipeline import ExpensePipeline
+from core.expense_store import ExpenseReportStore
+from core.models import ExpenseReport
+from core.reference_table import ReferenceTable
 import pandas as pd
 import os
+import pytest
 
-@patch('core.coupa_client.CoupaClient.get_expense_reports')
-@patch('core.data_processor.DataProcessor.read_csv')
-def test_http_trigger_function1(mock_read_csv, mock_get_expense_reports):
-    with open(os.path.join(os.path.dirname(__file__), 'sample_expense_reports.json')) as f:
-        sample_expense_reports = json.load(f)
-    mock_get_expense_reports.return_value = [ExpenseReport(**item) for item in sample_expense_reports]
-    
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / 'local_data.csv')
     csv_data = {
         'expense_id': [1, 2, 3],
         'csv_field1': ['A', 'B', 'C'],
         'csv_field2': ['X', 'Y', 'Z']
     }
-    mock_read_csv.return_value = pd.DataFrame(csv_data)
+    pd.DataFrame(csv_data).to_csv(csv_path, index=False)
+    monkeypatch.setenv('REFERENCE_CACHE_DIR', str(tmp_path))
+
+    coupa_client = CoupaClient(api_key='test', base_url='https://coupa.test/api')
+    store = ExpenseReportStore(str(tmp_path / 'expense_reports.sqlite'))
+    pipeline = ExpensePipeline(coupa_client, DataProcessor(csv_path=csv_path), store)
+    monkeypatch.setattr(app_context, '_shared', {'expense_pipeline': pipeline})
+    yield pipeline
+    ReferenceTable._instances.pop(os.path.realpath(csv_path), None)
+
+def sample_pages():
+    with open(os.path.join(os.path.dirname(__file__), 'sample_expense_reports.json')) as f:
+        sample_expense_reports = json.load(f)
+    return iter([[ExpenseReport(**item) for item in sample_expense_reports]])
+
+@patch('core.coupa_client.CoupaClient.iter_expense_report_pages')
+def test_http_trigger_function1(mock_iter_expense_report_pages, pipeline):
+    mock_iter_expense_report_pages.return_value = sample_pages()
 
-    req = func.HttpRequest(method='GET', url='/api/HttpTriggerFunction1')
+    req = func.HttpRequest(method='GET', url='/api/wfFunction1', body=b'')
     resp = func1.main(req)
 
     assert resp.status_code == 200
@@ -30,21 +51,11 @@ def test_http_trigger_function1(mock_read_csv, mock_get_expense_reports):
     assert response_data[1]['csv_field1'] == 'B'
     assert response_data[2]['csv_field2'] == 'Z'
 
-@patch('core.coupa_client.CoupaClient.get_expense_reports')
-@patch('core.data_processor.DataProcessor.read_csv')
-def test_http_trigger_function2(mock_read_csv, mock_get_expense_reports):
-    with open(os.path.join(os.path.dirname(__file__), 'sample_expense_reports.json')) as f:
-        sample_expense_reports = json.load(f)
-    mock_get_expense_reports.return_value = [ExpenseReport(**item) for item in sample_expense_reports]
-    
-    csv_data = {
-        'expense_id': [1, 2, 3],
-        'csv_field1': ['A', 'B', 'C'],
-        'csv_field2': ['X', 'Y', 'Z']
-    }
-    mock_read_csv.return_value = pd.DataFrame(csv_data)
+@patch('core.coupa_client.CoupaClient.iter_expense_report_pages')
+def test_http_trigger_function2(mock_iter_expense_report_pages, pipeline):
+    mock_iter_expense_report_pages.return_value = sample_pages()
 
-    req = func.HttpRequest(method='GET', url='/api/HttpTriggerFunction2')
+    req = func.HttpRequest(method='GET', url='/api/wfFunction2', body=b'')
     resp = func2.main(req)
 
     assert resp.status_code == 200
@@ -53,3 +64,23 @@ def test_http_trigger_function2(mock_read_csv, mock_get_expense_reports):
     assert response_data[0]['expense_id'] == 1
     assert response_data[1]['csv_field1'] == 'B'
     assert response_data[2]['csv_field2'] == 'Z'
+
+@patch('core.coupa_client.CoupaClient.iter_expense_report_pages')
+def test_functions_share_cached_response(mock_iter_expense_report_pages, pipeline):
+    mock_iter_expense_report_pages.return_value = sample_pages()
+
+    first = func1.main(func.HttpRequest(method='GET', url='/api/wfFunction1', body=b''))
+    etag = first.headers['ETag']
+    second = func2.main(func.HttpRequest(method='GET', url='/api/wfFunction2', body=b'',
+                                         headers={'If-None-Match': etag}))
+
+    assert second.status_code == 304
+    assert pipeline.build_count == 1
+
+@patch('core.coupa_client.CoupaClient.iter_expense_report_pages')
+def test_sync_failure_without_stored_reports(mock_iter_expense_report_pages, pipeline):
+    mock_iter_expense_report_pages.side_effect = RuntimeError('Coupa unavailable')
+
+    resp = func1.main(func.HttpRequest(method='GET', url='/api/wfFunction1', body=b''))
+
+    assert resp.status_code == 500
@@ -0,0 +1,174 @@
+import asyncio
+import time
+import httpx
+import pytest
+from core.http_client import HttpClient
+from core.models import InputDataItem, RequestConfig
+from core.rate_limit import CircuitBreaker, CircuitOpenError, HostRegistry, TokenBucket
+
+def make_transport(state, delay=0.01):
+    async def handler(request):
+        state['in_flight'] += 1
+        state['peak'] = max(state['peak'], state['in_flight'])
+        await asyncio.sleep(delay)
+        state['in_flight'] -= 1
+        return httpx.Response(200, json={'path': request.url.path, 'query': dict(request.url.params)})
+    return httpx.MockTransport(handler)
+
+def make_request_config(count, **kwargs):
+    return RequestConfig(
+        baseUrl='https://api.example.com/items/{id}',
+        headers={},
+        id='items',
+        inputData=[InputDataItem(placeholders={'id': i}, params={'page': i}) for i in range(count)],
+        **kwargs
+    )
+
+def test_get_parallel_data_respects_max_in_flight():
+    state = {'in_flight': 0, 'peak': 0}
+    client = HttpClient(transport=make_transport(state))
+
+    results = asyncio.run(client.get_parallel_data(make_request_config(20, maxInFlight=3)))
+
+    assert [result['path'] for result in results] == [f'/items/{i}' for i in range(20)]
+    assert state['peak'] == 3
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+def test_iter_parallel_data_yields_as_completed():
+    async def handler(request):
+        page = int(request.url.params['page'])
+        await asyncio.sleep(0.05 if page == 0 else 0)
+        return httpx.Response(200, json={'page': page})
+
+    client = HttpClient(transport=httpx.MockTransport(handler))
+
+    unordered = asyncio.run(collect(client.iter_parallel_data(make_request_config(4))))
+    ordered = asyncio.run(collect(client.iter_parallel_data(make_request_config(4), ordered=True)))
+
+    assert unordered[-1] == ('items-0', {'page': 0})
+    assert [identifier for identifier, _ in ordered] == ['items-0', 'items-1', 'items-2', 'items-3']
+
+def test_iter_fetch_window_bounds_in_flight():
+    state = {'in_flight': 0, 'peak': 0}
+    client = HttpClient(transport=make_transport(state))
+
+    results = asyncio.run(collect(client.iter_parallel_data(make_request_config(10, maxInFlight=2), ordered=True)))
+
+    assert len(results) == 10
+    assert state['peak'] == 2
+
+def make_retry_client(handler):
+    return HttpClient(
+        transport=httpx.MockTransport(handler), backoff_base=0.001, backoff_cap=0.01,
+        rate_limiters=HostRegistry(TokenBucket), circuit_breakers=HostRegistry(CircuitBreaker)
+    )
+
+async def fetch_once(client, request_config):
+    async with client.create_async_client() as async_client:
+        return await client.fetch(async_client, request_config)
+
+def test_fetch_retries_429_and_honours_retry_after():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={'Retry-After': '0.05'})
+        return httpx.Response(200, json={'ok': True})
+
+    client = make_retry_client(handler)
+    result = asyncio.run(fetch_once(client, {'method': 'POST', 'url': 'https://api.example.com/items'}))
+
+    assert result == {'ok': True}
+    assert len(calls) == 2
+    assert client.rate_limiters.get('api.example.com').rate < 50
+
+def test_fetch_does_not_retry_client_errors_or_unsafe_methods():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(400 if request.method == 'GET' else 503)
+
+    client = make_retry_client(handler)
+    for method in ('GET', 'POST'):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(fetch_once(client, {'method': method, 'url': 'https://api.example.com/items'}))
+
+    assert calls == ['GET', 'POST']
+
+def test_fetch_retries_server_errors_until_success():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503) if len(calls) < 3 else httpx.Response(200, json={'ok': True})
+
+    result = asyncio.run(fetch_once(make_retry_client(handler), {'url': 'https://api.example.com/items'}))
+
+    assert result == {'ok': True}
+    assert len(calls) == 3
+
+def test_circuit_breaker_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = make_retry_client(handler)
+    client.circuit_breakers = HostRegistry(lambda: CircuitBreaker(failure_threshold=2))
+    # The circuit opens after the second failed attempt, before the third is sent
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(fetch_once(client, {'url': 'https://api.example.com/items'}))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(fetch_once(client, {'url': 'https://api.example.com/items'}))
+
+    assert len(calls) == 2
+
+def test_throttled_trial_does_not_leave_circuit_half_open():
+    statuses = [503, 503, 429, 200]
+
+    def handler(request):
+        return httpx.Response(statuses.pop(0), json={'ok': True})
+
+    client = make_retry_client(handler)
+    client.circuit_breakers = HostRegistry(lambda: CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(fetch_once(client, {'url': 'https://api.example.com/items'}))
+    time.sleep(0.06)
+
+    # The trial gets a 429; its retry is the next trial and closes the circuit
+    assert asyncio.run(fetch_once(client, {'url': 'https://api.example.com/items'})) == {'ok': True}
+    assert client.circuit_breakers.get('api.example.com').state == CircuitBreaker.CLOSED
+
+def test_cancelled_trial_releases_circuit():
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200, json={'ok': True})
+
+    client = make_retry_client(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client.circuit_breakers = HostRegistry(lambda: breaker)
+
+    async def cancel_trial():
+        task = asyncio.create_task(fetch_once(client, {'url': 'https://api.example.com/items'}))
+        await asyncio.sleep(0.01)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.before_request('api.example.com') is True
+
+def test_request_config_http2_defaults_to_client_setting():
+    client = HttpClient(http2=True)
+
+    assert client.client_options(make_request_config(1))['http2'] is None
+    assert client.client_options(make_request_config(1, http2=False))['http2'] is False
@@ -0,0 +1,114 @@
+import logging
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from core import instrumentation
+from core.db_client import DBClient
+from core.instrumentation import NOOP_SPAN, Recorder
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = Recorder(enabled=True, otel=False)
+    monkeypatch.setattr(instrumentation, '_recorder', recorder)
+    return recorder
+
+class FakeMeter:
+    def __init__(self):
+        self.recorded = []
+
+    def create_histogram(self, name, unit=None, description=None):
+        return FakeInstrument(self.recorded, name)
+
+    def create_counter(self, name):
+        return FakeInstrument(self.recorded, name)
+
+class FakeInstrument:
+    def __init__(self, recorded, name):
+        self.recorded = recorded
+        self.name = name
+
+    def record(self, value, attributes):
+        self.recorded.append((self.name, value, attributes))
+
+    add = record
+
+class FakeMetrics:
+    def __init__(self):
+        self.meter = FakeMeter()
+
+    def get_meter(self, name):
+        return self.meter
+
+def test_disabled_span_is_shared_noop():
+    recorder = Recorder(enabled=False)
+
+    with recorder.span('db.execute', dbid='db1') as span:
+        span.set(rows=3)
+    recorder.count('http.retry')
+
+    assert span is NOOP_SPAN
+    assert recorder.stats() == {}
+
+def test_span_logged_with_custom_dimensions(recorder, caplog):
+    caplog.set_level(logging.INFO, logger='core.instrumentation')
+
+    with instrumentation.span('db.execute', dbid='db1') as span:
+        span.set(rows=3)
+
+    record = caplog.records[-1]
+    assert record.custom_dimensions['stage'] == 'db.execute'
+    assert record.custom_dimensions['dbid'] == 'db1'
+    assert record.custom_dimensions['rows'] == 3
+    assert recorder.stats()['db.execute']['count'] == 1
+
+def test_span_records_errors(recorder, caplog):
+    caplog.set_level(logging.INFO, logger='core.instrumentation')
+
+    with pytest.raises(ValueError):
+        with instrumentation.span('join'):
+            raise ValueError('bad frame')
+
+    assert caplog.records[-1].custom_dimensions['error'] == 'ValueError'
+
+def test_opentelemetry_export(monkeypatch):
+    metrics = FakeMetrics()
+    monkeypatch.setattr(instrumentation, 'otel_metrics', metrics)
+    recorder = Recorder(enabled=True)
+
+    with recorder.span('http.request', host='example.com') as span:
+        span.set(status_code=200)
+    recorder.count('http.retry', host='example.com')
+
+    (histogram, duration, attributes), counter = metrics.meter.recorded
+    assert histogram == 'core.stage.duration'
+    assert attributes == {'stage': 'http.request', 'host': 'example.com'}
+    assert counter == ('http.retry', 1, {'host': 'example.com'})
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv('INSTRUMENTATION_ENABLED', 'true')
+    monkeypatch.setenv('INSTRUMENTATION_LOG_LEVEL', 'debug')
+
+    recorder = Recorder.from_env()
+
+    assert recorder.enabled
+    assert recorder.log_level == logging.DEBUG
+
+    monkeypatch.setenv('INSTRUMENTATION_LOG_LEVEL', 'loud')
+    with pytest.raises(ValueError):
+        Recorder.from_env()
+
+def test_db_client_stages(recorder):
+    client = DBClient.from_engine('test', create_engine('sqlite://', poolclass=StaticPool))
+    with client.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER)"))
+        connection.execute(text("INSERT INTO users (id) VALUES (1), (2), (3)"))
+
+    client.execute_query("SELECT id FROM users")
+    with client.stream_query("SELECT id FROM users", batch_size=2) as (_, batches):
+        list(batches)
+
+    stats = recorder.stats()
+    assert stats['db.pool_checkout']['count'] == 2
+    assert stats['db.execute']['count'] == 2
+    assert stats['db.fetch']['count'] == 1 + 3  # One fetchall, then two batches and the empty end
+    assert stats['db.materialize']['count'] == 1
@@ -0,0 +1,73 @@
+import datetime
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import mssql
+from core.keyset import KeysetError, KeysetQuery, decode_token, encode_token
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE orders (customer_id INTEGER, order_id INTEGER, region TEXT)"))
+        connection.execute(
+            text("INSERT INTO orders VALUES (:customer_id, :order_id, :region)"),
+            [{'customer_id': i % 3, 'order_id': i, 'region': 'eu' if i % 2 else 'us'} for i in range(1, 21)]
+        )
+    return engine
+
+def read_all(engine, keyset, params, page_size, **bounds):
+    pages = []
+    continuation = None
+    with engine.connect() as connection:
+        while True:
+            page = keyset.page(params, page_size, continuation, **({} if continuation else bounds))
+            result = connection.execute(page.statement, page.params)
+            batches = page.batches(list(result.keys()), result.fetchall())
+            pages.append([tuple(row) for batch in batches for row in batch])
+            continuation = batches.continuation
+            if continuation is None:
+                return pages
+
+def test_pages_follow_composite_key(engine):
+    keyset = KeysetQuery('db2', 'ordersByRegion', "SELECT customer_id, order_id FROM orders WHERE region = :region",
+                         ['customer_id', 'order_id'])
+
+    pages = read_all(engine, keyset, {'region': 'eu'}, 4)
+
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert rows == sorted((i % 3, i) for i in range(1, 21, 2))
+
+def test_key_ranges_partition_the_table(engine):
+    keyset = KeysetQuery('db2', 'allOrders', "SELECT order_id FROM orders", 'order_id')
+
+    ranges = [read_all(engine, keyset, {}, 3, key_from=start, key_to=start + 10) for start in (1, 11)]
+
+    assert [[row[0] for page in pages for row in page] for pages in ranges] == [list(range(1, 11)), list(range(11, 21))]
+
+def test_token_round_trip_and_validation():
+    token = encode_token([datetime.date(2024, 4, 15), 7], None, 'abc')
+
+    assert decode_token(token, 'abc') == ([datetime.date(2024, 4, 15), 7], None)
+    with pytest.raises(KeysetError, match='different query'):
+        decode_token(token, 'other')
+    with pytest.raises(KeysetError, match='Invalid continuation token'):
+        decode_token('not-a-token', 'abc')
+
+def test_invalid_page_input():
+    keyset = KeysetQuery('db2', 'allOrders', "SELECT order_id FROM orders", ['order_id'])
+
+    with pytest.raises(KeysetError, match='page_size'):
+        keyset.page({}, 0)
+    with pytest.raises(KeysetError, match='key_from'):
+        keyset.page({}, 10, key_from=[1, 2])
+    with pytest.raises(ValueError, match="'keyset' of query 'bad'"):
+        KeysetQuery('db2', 'bad', "SELECT order_id FROM orders", [])
+
+def test_sql_server_page_uses_top():
+    keyset = KeysetQuery('db2', 'allOrders', "SELECT order_id FROM orders", ['order_id'])
+
+    sql = str(keyset.page({}, 100, key_from=5).statement.compile(dialect=mssql.dialect()))
+
+    assert sql.startswith('SELECT TOP')
+    assert 'OFFSET' not in sql and 'ROW_NUMBER' not in sql
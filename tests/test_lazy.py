@@ -0,0 +1,22 @@
+import sys
+import pytest
+from core.lazy import LazyModule
+
+def test_imported_on_first_use(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    colorsys = LazyModule('colorsys')
+
+    assert 'colorsys' not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert 'colorsys' in sys.modules
+
+def test_missing_optional_module_is_falsy():
+    module = LazyModule('no_such_module_installed', optional=True)
+
+    assert not module
+    with pytest.raises(ImportError):
+        module.anything
+
+def test_missing_required_module_raises():
+    with pytest.raises(ImportError):
+        LazyModule('no_such_module_installed').anything
@@ -0,0 +1,82 @@
+import asyncio
+import httpx
+import pytest
+from core.http_client import HttpClient
+from core.pagination import CursorPagination, OffsetPagination, PageNumberPagination, Paginator
+from core.rate_limit import CircuitBreaker, HostRegistry, TokenBucket
+
+ITEMS = list(range(23))
+
+def make_client(handler, max_in_flight=4):
+    return HttpClient(transport=httpx.MockTransport(handler), max_in_flight=max_in_flight)
+
+def test_page_number_with_total_pages():
+    requested = []
+
+    def handler(request):
+        page = int(request.url.params['page'])
+        requested.append(page)
+        return httpx.Response(200, json={'total_pages': 3, 'results': ITEMS[(page - 1) * 10:page * 10]})
+
+    paginator = Paginator(PageNumberPagination(total_pages_key='total_pages'), make_client(handler))
+    items = asyncio.run(paginator.fetch_all('https://api.example.com/data'))
+
+    assert items == ITEMS
+    assert sorted(requested) == [1, 2, 3]
+
+def test_offset_without_total_probes_until_short_page():
+    requested = []
+
+    def handler(request):
+        offset = int(request.url.params['offset'])
+        limit = int(request.url.params['limit'])
+        requested.append(offset)
+        return httpx.Response(200, json=ITEMS[offset:offset + limit])
+
+    paginator = Paginator(OffsetPagination(limit=5, items_key=None), make_client(handler, max_in_flight=2))
+    items = asyncio.run(paginator.fetch_all('https://api.example.com/data'))
+
+    assert items == ITEMS
+    assert sorted(requested) == [0, 5, 10, 15, 20]
+
+def test_failed_page_raises_instead_of_ending_pagination():
+    def handler(request):
+        offset = int(request.url.params['offset'])
+        if offset == 10:
+            return httpx.Response(503)
+        return httpx.Response(200, json=list(range(40))[offset:offset + 10])
+
+    client = HttpClient(
+        transport=httpx.MockTransport(handler), max_in_flight=2, backoff_base=0.001, backoff_cap=0.01,
+        rate_limiters=HostRegistry(TokenBucket), circuit_breakers=HostRegistry(CircuitBreaker)
+    )
+    paginator = Paginator(OffsetPagination(limit=10, items_key=None), client)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(paginator.fetch_all('https://api.example.com/data'))  # Probing without a total
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(paginator.fetch_all('https://api.example.com/data', max_pages=4))
+
+def test_cursor_and_next_link():
+    def handler(request):
+        cursor = int(request.url.params.get('cursor', 0))
+        body = {'results': ITEMS[cursor:cursor + 10]}
+        if cursor + 10 < len(ITEMS):
+            body['next_cursor'] = str(cursor + 10)
+            body['next'] = f'/data?cursor={cursor + 10}'
+        return httpx.Response(200, json=body)
+
+    client = make_client(handler)
+    by_cursor = asyncio.run(Paginator(CursorPagination(), client).fetch_all('https://api.example.com/data'))
+    by_link = asyncio.run(Paginator(CursorPagination(next_link_key='next'), client).fetch_all('https://api.example.com/data'))
+
+    assert by_cursor == ITEMS
+    assert by_link == ITEMS
+
+def test_create_batches_and_input_data_items():
+    batches = HttpClient.create_batches(120, 50)
+    items = HttpClient.create_input_data_items(batches, params={'lookup_id': '19'})
+
+    assert batches == [{'limit': 50, 'offset': 0}, {'limit': 50, 'offset': 50}, {'limit': 50, 'offset': 100}]
+    assert items[2].placeholders == {'limit': 50, 'offset': 100}
+    assert items[0].params == {'lookup_id': '19'}
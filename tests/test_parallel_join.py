@@ -0,0 +1,39 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from core import parallel_join
+from core.data_processor import DataProcessor
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(1)
+    expense_df = pd.DataFrame({
+        'id': rng.integers(0, 300, 1000),
+        'amount': rng.random(1000),
+        'description': [f'Expense "{i}"\n' for i in range(1000)],
+        'date': '2024-04-15',
+    })
+    csv_df = pd.DataFrame({
+        'expense_id': np.concatenate([np.arange(250), np.arange(0, 250, 7)]),  # Some ids repeat, some are missing
+        'csv_field1': [f'A{i}' for i in range(286)],
+        'csv_field2': [f'B{i}' for i in range(286)],
+    })
+    return expense_df, csv_df
+
+@pytest.mark.parametrize('use_shared_memory', [True, False])
+def test_parallel_join_matches_single_process(frames, monkeypatch, use_shared_memory):
+    if use_shared_memory:
+        pytest.importorskip('pyarrow')
+    else:
+        monkeypatch.setattr(parallel_join, 'pa', None)
+    expense_df, csv_df = frames
+    processor = DataProcessor(csv_path='dummy_path')
+    expected = processor.join_json(expense_df, csv_df)
+
+    monkeypatch.setattr(parallel_join, 'PARALLEL_JOIN_THRESHOLD', 100)
+    monkeypatch.setattr(parallel_join, 'PARALLEL_JOIN_WORKERS', 3)
+    parallel = processor.join_json(expense_df, csv_df)
+
+    assert json.loads(parallel) == json.loads(expected)
+    assert parallel == expected
@@ -0,0 +1,88 @@
+import json
+import os
+import pytest
+from core.query_manager import QueryManager, QueryParamsError
+
+@pytest.fixture
+def query_manager(tmp_path):
+    config = {
+        'db1': {
+            'queries': [
+                {'key': 'getUserById', 'desc': 'Get user', 'sql': 'SELECT id, name FROM users WHERE id = :id'},
+                {'key': 'getAllUsers', 'desc': 'Get all users', 'sql': 'SELECT id, name FROM users'}
+            ]
+        }
+    }
+    path = tmp_path / 'query_config.json'
+    path.write_text(json.dumps(config))
+    return QueryManager(str(path))
+
+def test_compiled_query_lookup(query_manager):
+    query = query_manager.get_compiled_query('db1', 'getUserById')
+
+    assert query.param_names == {'id'}
+    assert query_manager.get_query('db1', 'getAllUsers') == 'SELECT id, name FROM users'
+
+def test_unknown_query_raises(query_manager):
+    with pytest.raises(ValueError):
+        query_manager.get_compiled_query('db1', 'missing')
+
+def test_validate_params(query_manager):
+    query = query_manager.get_compiled_query('db1', 'getUserById')
+    query.validate_params({'id': 1})
+
+    with pytest.raises(QueryParamsError, match='missing: id'):
+        query.validate_params({})
+    with pytest.raises(QueryParamsError, match='unexpected: name'):
+        query.validate_params({'id': 1, 'name': 'x'})
+
+def test_default_config_is_canonical():
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'query_config.json')
+    assert QueryManager() is QueryManager(config_path)
+
+def test_refresh_swaps_registry(tmp_path):
+    path = tmp_path / 'reload_config.json'
+    path.write_text(json.dumps({'db1': {'queries': [{'key': 'q', 'sql': 'SELECT 1'}]}}))
+    query_manager = QueryManager(str(path))
+    version = query_manager.config_version
+
+    assert query_manager.refresh(force=True) is False
+
+    path.write_text(json.dumps({'db1': {'queries': [{'key': 'q', 'sql': 'SELECT :a'}]}}))
+    assert query_manager.refresh(force=True) is True
+    assert query_manager.reload_count == 1
+    assert query_manager.config_version != version
+    assert query_manager.registry[('db1', 'q')].param_names == {'a'}
+
+    path.write_text('{not json')
+    assert query_manager.refresh(force=True) is False
+    assert query_manager.registry[('db1', 'q')].param_names == {'a'}
+
+def test_max_rows_limits_the_statement():
+    from sqlalchemy.dialects import mssql, mysql
+    registry = QueryManager.compile_queries({'db2': {'queries': [
+        {'key': 'getAllOrders', 'sql': 'SELECT order_id FROM orders', 'max_rows': 100},
+        {'key': 'getSortedOrders', 'sql': 'SELECT order_id FROM orders ORDER BY order_id', 'max_rows': 100},
+    ]}})
+    limited = registry[('db2', 'getAllOrders')].bounded_statement
+    sorted_query = registry[('db2', 'getSortedOrders')]
+
+    assert str(limited.compile(dialect=mysql.dialect())).rstrip().endswith('LIMIT %s')
+    assert str(limited.compile(dialect=mssql.dialect())).startswith('SELECT TOP')
+    assert sorted_query.bounded_statement is sorted_query.statement
+
+def test_max_rows_strips_trailing_semicolon():
+    from sqlalchemy import create_engine, text
+    registry = QueryManager.compile_queries({'db2': {'queries': [
+        {'key': 'getAllOrders', 'sql': 'SELECT order_id FROM orders;\n', 'max_rows': 2},
+        {'key': 'getOrdersCommented', 'sql': 'SELECT order_id FROM orders -- every order', 'max_rows': 2},
+    ]}})
+    engine = create_engine('sqlite://')
+    with engine.connect() as connection:
+        connection.execute(text('CREATE TABLE orders (order_id INTEGER)'))
+        connection.execute(text('INSERT INTO orders VALUES (1), (2), (3), (4)'))
+        rows = connection.execute(registry[('db2', 'getAllOrders')].bounded_statement).fetchall()
+    commented = registry[('db2', 'getOrdersCommented')]
+
+    assert len(rows) == 3  # max_rows + 1
+    assert commented.bounded_statement is commented.statement
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from core.rate_limit import CircuitBreaker, CircuitOpenError, RetryBudget, TokenBucket, decorrelated_jitter, parse_retry_after
+
+def test_decorrelated_jitter_bounds():
+    delays = [decorrelated_jitter(2.0, 0.5, 4.0) for _ in range(100)]
+
+    assert all(0.5 <= delay <= 4.0 for delay in delays)
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+def test_token_bucket_halves_rate_on_throttle():
+    bucket = TokenBucket(rate=10, min_rate=4)
+    bucket.on_throttle()
+    assert bucket.rate == 5
+    bucket.on_throttle()
+    assert bucket.rate == 4
+    bucket.on_success()
+    assert bucket.rate == 5
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=20)
+    bucket.tokens = 0
+
+    async def acquire_two():
+        start = asyncio.get_running_loop().time()
+        await bucket.acquire()
+        await bucket.acquire()
+        return asyncio.get_running_loop().time() - start
+
+    assert asyncio.run(acquire_two()) >= 0.09
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('core.rate_limit.time.monotonic', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('api.example.com')
+
+    now[0] = 111.0
+    breaker.before_request('api.example.com')  # trial request
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('api.example.com')
+    breaker.record_success()
+    breaker.before_request('api.example.com')
+
+def test_circuit_breaker_trial_released_or_replaced(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('core.rate_limit.time.monotonic', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    now[0] = 111.0
+    assert breaker.before_request('api.example.com') is True
+    breaker.release_trial()  # e.g. the trial got a 429
+    assert breaker.before_request('api.example.com') is True
+
+    # A trial that never reports back is replaced after another reset_timeout
+    now[0] = 115.0
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('api.example.com')
+    now[0] = 121.0
+    assert breaker.before_request('api.example.com') is True
@@ -0,0 +1,48 @@
+import os
+import pandas as pd
+import pytest
+from core.reference_table import ReferenceTable
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'reference.csv'
+    path.write_text("expense_id,csv_field1,csv_field2\n2,B,Y\n1,A,X\n")
+    yield str(path)
+    ReferenceTable._instances.pop(os.path.realpath(path), None)
+
+def test_parsed_once_and_indexed(csv_path, tmp_path):
+    table = ReferenceTable(csv_path, cache_dir=str(tmp_path))
+    frame = table.frame()
+
+    assert ReferenceTable(csv_path).frame() is frame
+    assert table.load_count == 1
+    assert frame.index.name == 'expense_id'
+    assert frame.loc[1, 'csv_field1'] == 'A'
+
+def test_reloaded_when_csv_changes(csv_path, tmp_path):
+    table = ReferenceTable(csv_path, cache_dir=str(tmp_path))
+    table.frame()
+    with open(csv_path, 'a') as f:
+        f.write("3,C,Z\n")
+
+    assert list(table.frame().index) == [2, 1, 3]
+    assert table.load_count == 2
+
+def test_new_worker_reads_feather_cache(csv_path, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    expected = ReferenceTable(csv_path, cache_dir=str(tmp_path)).frame()
+    ReferenceTable._instances.clear()
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: pytest.fail('CSV parsed again'))
+
+    pd.testing.assert_frame_equal(ReferenceTable(csv_path, cache_dir=str(tmp_path)).frame(), expected)
+
+def test_warns_on_repeated_expense_ids(tmp_path, caplog):
+    path = tmp_path / 'repeated.csv'
+    path.write_text("expense_id,csv_field1,csv_field2\n1,A,X\n1,B,Y\n2,C,Z\n")
+    try:
+        frame = ReferenceTable(str(path), cache_dir=str(tmp_path)).frame()
+    finally:
+        ReferenceTable._instances.pop(os.path.realpath(path), None)
+
+    assert len(frame) == 3
+    assert 'repeats 1 expense_id values (e.g. 1)' in caplog.text
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import patch
+from core.result_cache import CacheBackend, MemoryBackend, ResultCache, SqliteBackend
+
+def test_make_key_ignores_param_order():
+    key1 = ResultCache.make_key('db1', 'getUserById', {'a': 1, 'b': 2}, 'records')
+    key2 = ResultCache.make_key('db1', 'getUserById', {'b': 2, 'a': 1}, 'records')
+
+    assert key1 == key2
+    assert key1 != ResultCache.make_key('db1', 'getUserById', {'a': 1, 'b': 2}, 'columnar')
+
+def test_memory_backend_lru_eviction():
+    cache = ResultCache(MemoryBackend(max_bytes=10))
+    cache.set('a', b'1234', 60)
+    cache.set('b', b'1234', 60)
+    assert cache.get('a') == b'1234'  # 'a' becomes most recently used
+    cache.set('c', b'1234', 60)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == b'1234'
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 1}
+
+def test_memory_backend_ttl():
+    backend = MemoryBackend()
+    with patch('core.result_cache.time.monotonic', return_value=100.0):
+        backend.set('a', b'value', 5)
+    with patch('core.result_cache.time.monotonic', return_value=106.0):
+        assert backend.get('a') is None
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    SqliteBackend(path).set('a', b'value', 60)
+
+    other = SqliteBackend(path, max_bytes=8)
+    assert other.get('a') == b'value'
+    other.set('b', b'value', 60)
+    assert other.get('a') is None
+    assert other.evictions == 1
+
+def test_incomplete_backend_fails_on_creation():
+    class GetOnlyBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
@@ -0,0 +1,50 @@
+import json
+import pytest
+from core.result_encoder import get_encoder, iter_arrow, iter_columnar, iter_records, iter_ndjson
+
+COLUMNS = ['id', 'name']
+BATCHES = [[(1, 'a'), (2, 'b')], [], [(3, 'c')]]
+
+def test_iter_records_matches_envelope():
+    body = b''.join(iter_records(COLUMNS, BATCHES))
+
+    assert json.loads(body) == ({
+        'status': 'success',
+        'data': [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'c'}]
+    })
+
+def test_iter_ndjson():
+    lines = b''.join(iter_ndjson(COLUMNS, BATCHES)).decode().splitlines()
+
+    assert [json.loads(line)['id'] for line in lines] == [1, 2, 3]
+
+def test_iter_columnar():
+    body = json.loads(b''.join(iter_columnar(COLUMNS, BATCHES)))
+
+    assert body['columns'] == COLUMNS
+    assert body['data'] == [[1, 2, 3], ['a', 'b', 'c']]
+
+def test_get_encoder_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        get_encoder('xml')
+
+def test_iter_arrow_round_trip():
+    pa = pytest.importorskip('pyarrow')
+    body = b''.join(iter_arrow(COLUMNS, BATCHES))
+
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.to_pydict() == {'id': [1, 2, 3], 'name': ['a', 'b', 'c']}
+
+def test_iter_arrow_promotes_null_and_numeric_columns():
+    pa = pytest.importorskip('pyarrow')
+    body = b''.join(iter_arrow(['id', 'value', 'amount'], [[(1, None, 1)], [(2, 'x', 2.5)]]))
+
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.schema.field('value').type == pa.string()
+    assert table.to_pydict() == {'id': [1, 2], 'value': [None, 'x'], 'amount': [1.0, 2.5]}
+
+def test_iter_arrow_rejects_lossy_cast():
+    pytest.importorskip('pyarrow')
+
+    with pytest.raises(ValueError, match="Column 'amount' changed type from int64 to double"):
+        b''.join(iter_arrow(['amount'], [[(1,)], [(2.5,)]]))
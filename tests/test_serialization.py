@@ -0,0 +1,62 @@
+import datetime
+import decimal
+import gzip
+import json
+import uuid
+import numpy as np
+import pytest
+from core import serialization
+from core.serialization import dumps, encode_response, negotiate_encoding
+
+def test_dumps_database_types():
+    row = {
+        'price': decimal.Decimal('12345678901234567890.01'),
+        'created': datetime.datetime(2024, 4, 15, 9, 30, 5),
+        'day': datetime.date(2024, 4, 15),
+        'token': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'raw': b'\x00\x01',
+        'count': np.int64(3),
+    }
+
+    assert json.loads(dumps(row)) == {
+        'price': '12345678901234567890.01',
+        'created': '2024-04-15T09:30:05',
+        'day': '2024-04-15',
+        'token': '12345678-1234-5678-1234-567812345678',
+        'raw': 'AAE=',
+        'count': 3,
+    }
+
+def test_dumps_matches_standard_library_encoder():
+    rows = [{'id': i, 'amount': decimal.Decimal(f'{i}.50'), 'name': f'näme {i}', 'at': datetime.date(2024, 1, i)} for i in range(1, 4)]
+
+    assert dumps(rows) == serialization._json_dumps(rows)
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('identity', None),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0', None),
+    ('*', 'br' if serialization.brotli is not None else 'gzip'),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+def test_encode_response_compresses_large_bodies():
+    body = dumps([{'id': i, 'name': f'user{i}'} for i in range(1000)])
+
+    compressed, headers = encode_response(body, 'gzip')
+
+    assert headers == {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) < len(body)
+
+def test_encode_response_leaves_small_bodies():
+    body, headers = encode_response('{"status":"success"}', 'gzip', {'X-Cache': 'HIT'})
+
+    assert body == b'{"status":"success"}'
+    assert headers == {'X-Cache': 'HIT', 'Vary': 'Accept-Encoding'}
@@ -0,0 +1,46 @@
+import threading
+import time
+import pytest
+from core.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_run():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do('key', work)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(single_flight.do('key', work))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert results == ['result'] * 5
+    assert len(runs) == 1
+    assert single_flight.shared_count == 4
+
+def test_sequential_calls_run_again():
+    single_flight = SingleFlight()
+
+    assert single_flight.do('key', lambda: 1) == 1
+    assert single_flight.do('key', lambda: 2) == 2
+    assert single_flight.run_count == 2
+
+def test_error_is_raised_and_not_kept():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        single_flight.do('key', fail)
+    assert single_flight.do('key', lambda: 'ok') == 'ok'
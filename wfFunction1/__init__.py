@@ -0,0 +1,16 @@
+import logging
+import azure.functions as func
+from core import expense_pipeline
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('HttpTriggerFunction1 processed a request.')
+
+    try:
+        # Shared with the other wf function: one cached response per store revision and CSV version
+        return expense_pipeline.handle(req)
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return func.HttpResponse(
+            "Internal Server Error",
+            status_code=500
+        )